@@ -0,0 +1,80 @@
+import datetime
+import numpy as np
+from decimal import Decimal
+from Database.POPO.RealPropertyValues import RealPropertyValues, DepClass
+from Services.Depreciation.Model.DepreciationTaxation import DepreciationSchedule, DepreciationTaxation
+from Benchmarks.Timing import time_call
+
+
+########################################################################################################################
+# Benchmark of multi-year depreciation projection for synthetic depreciation items: one item and year at a time with
+# DepreciationTaxation.calculate_depreciation_for_year() vs DepreciationSchedule.project() in exact (Decimal) and float
+# modes. Depreciation is assumed to be taken on schedule every year from the purchase year.
+#
+# Run from the repository root: python -m Benchmarks.DepreciationScheduleBenchmark
+########################################################################################################################
+
+DEP_CLASSES = [DepClass.GDS_RRP_SL_MM, DepClass.GDS_YEAR5_SL_MM, DepClass.NONE]
+
+
+# num_items items purchased 1990 - 2019. about 10% are disposed
+def synthetic_items(num_items, seed=0):
+    rng = np.random.default_rng(seed)
+    rpv_list = []
+    for i in range(num_items):
+        purchase_date = datetime.date(int(rng.integers(1990, 2020)), int(rng.integers(1, 13)), int(rng.integers(1, 29)))
+        disposal_date = None
+        if rng.random() < 0.1:
+            disposal_date = datetime.date(purchase_date.year + int(rng.integers(0, 10)), int(rng.integers(1, 13)), 1)
+        rpv = RealPropertyValues(None, "item" + str(i), purchase_date,
+                                 Decimal(int(rng.integers(10000, 50000000))) / Decimal(100),
+                                 DEP_CLASSES[int(rng.integers(0, len(DEP_CLASSES)))], disposal_date=disposal_date)
+        rpv.id = i
+        rpv_list.append(rpv)
+    return rpv_list
+
+
+# previous approach: calculate_depreciation_for_year() for each item and year with running accumulated depreciation
+def one_at_a_time(rpv_list, start_year, end_year):
+    dep_tax = DepreciationTaxation()
+    res = {}
+    for rpv in rpv_list:
+        accum_dep = Decimal(0)
+        for year in range(min(start_year, rpv.purchase_date.year), end_year + 1):
+            dep = Decimal(0) if year < rpv.purchase_date.year else \
+                dep_tax.calculate_depreciation_for_year(rpv, year, accum_dep=accum_dep)[0]
+            accum_dep += dep
+            if year >= start_year:
+                res[(rpv.id, year)] = dep
+    return res
+
+
+# returns list of dict with items, years, one_at_a_time_seconds, exact_seconds, float_seconds, speedup (one at a time
+# vs float) and float_mismatches (yearly values that differ from exact mode)
+def run(item_counts=(100, 1000, 5000), start_year=1990, end_year=None):
+    # calculate_depreciation_for_year() only accepts previous years
+    end_year = datetime.date.today().year - 1 if end_year is None else end_year
+    results = []
+    for num_items in item_counts:
+        rpv_list = synthetic_items(num_items)
+
+        scalar_seconds, expected = time_call(lambda: one_at_a_time(rpv_list, start_year, end_year))
+        exact_seconds, exact_df = time_call(lambda: DepreciationSchedule(exact=True).project(rpv_list, start_year,
+                                                                                             end_year))
+        float_seconds, float_df = time_call(lambda: DepreciationSchedule().project(rpv_list, start_year, end_year))
+
+        for (rpv_id, year), dep in expected.items():
+            assert exact_df.at[rpv_id, year] == dep, (rpv_id, year, exact_df.at[rpv_id, year], dep)
+
+        results.append({"items": num_items, "years": end_year - start_year + 1,
+                        "one_at_a_time_seconds": scalar_seconds, "exact_seconds": exact_seconds,
+                        "float_seconds": float_seconds, "speedup": scalar_seconds / float_seconds,
+                        "float_mismatches": int((exact_df.astype(float) != float_df).to_numpy().sum())})
+    return results
+
+
+if __name__ == "__main__":
+    for r in run():
+        print("items: {items:>5}  years: {years}  one at a time: {one_at_a_time_seconds:7.3f}s  "
+              "exact: {exact_seconds:7.3f}s  float: {float_seconds:7.3f}s  speedup: {speedup:6.1f}x  "
+              "float mismatches: {float_mismatches}".format(**r))
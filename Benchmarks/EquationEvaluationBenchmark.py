@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+from Statistics.Equation import Equation
+from Statistics.ExpressionDAG import ExpressionDAG
+from Benchmarks.Timing import time_call
+
+
+########################################################################################################################
+# Benchmark of Equation evaluation on long synthetic 5 minute series: postfix interpreter
+# (evaluate_equation(compiled=False), new Series and inf/nan checks per operator) vs compiled numpy closure
+# (evaluate_equation(compiled=True), in place ufuncs on arrays and one inf/nan check of the result). Then a set
+# of interaction equations with shared subexpressions evaluated one at a time (compiled) vs with shared subexpressions
+# memoized in an ExpressionDAG (new ExpressionDAG each repeat, as for the first apply interactions click).
+#
+# Run from the repository root: python -m Benchmarks.EquationEvaluationBenchmark
+########################################################################################################################
+
+EQUATIONS = ["r1*r2", "(r1-r2)/(r1+r2)", "LN[r1]*LN[r2]+r3^2", "((r1*r2)-(r2*r3))/(r1+r2+r3+0.5)*2.5",
+             "LN[r1/r2]^2+LN[r2/r3]^2+LN[r3/r1]^2"]
+# interaction equations with shared subexpressions (LN[r1], LN[r2], LN[r3], LN[r1]*LN[r2], ...)
+SHARED_EQUATIONS = ["LN[r1]", "LN[r2]", "LN[r3]", "LN[r1]*LN[r2]", "LN[r1]*LN[r3]", "LN[r2]*LN[r3]", "LN[r1]^2",
+                    "LN[r2]^2", "LN[r3]^2", "LN[r1]*LN[r2]*LN[r3]", "(LN[r1]*LN[r2])^2", "LN[r1]^2*LN[r2]"]
+
+
+# num_series strictly positive 5 minute series with num_rows rows each
+def synthetic_series(num_rows, num_series=3, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2020-01-01", periods=num_rows, freq="5min")
+    return [pd.Series(rng.random(num_rows) + 0.5, index=index, name="s" + str(i + 1)) for i in range(num_series)]
+
+
+# returns list of dict with rows, equation, interpreted_seconds, compiled_seconds and speedup
+def run(rows=(10000, 100000, 1000000), repeat=3):
+    results = []
+    for num_rows in rows:
+        variable_value_list = synthetic_series(num_rows)
+        for infix_str in EQUATIONS:
+            eq = Equation(r0_allowed=False)
+            eq.infix_str_to_postfix_list(infix_str)
+
+            interpreted_seconds, error_msg_list = time_call(
+                lambda: eq.evaluate_equation(variable_value_list, False, False, compiled=False), repeat)
+            assert len(error_msg_list) == 0, error_msg_list
+            expected = eq.evaluated_result
+            compiled_seconds, error_msg_list = time_call(
+                lambda: eq.evaluate_equation(variable_value_list, False, False, compiled=True), repeat)
+            assert len(error_msg_list) == 0, error_msg_list
+            actual = eq.evaluated_result
+            pd.testing.assert_series_equal(expected, actual, check_names=False)
+
+            results.append({"rows": num_rows, "equation": infix_str, "interpreted_seconds": interpreted_seconds,
+                            "compiled_seconds": compiled_seconds, "speedup": interpreted_seconds / compiled_seconds})
+    return results
+
+
+# returns list of dict with rows, compiled_seconds, dag_seconds and speedup for evaluating all of equations
+def run_equation_set(rows=(10000, 100000, 1000000), equations=SHARED_EQUATIONS, repeat=3):
+    results = []
+    for num_rows in rows:
+        variable_value_list = synthetic_series(num_rows)
+        eq_list = []
+        for i, infix_str in enumerate(equations):
+            eq_list.append(Equation("eq" + str(i), r0_allowed=False))
+            eq_list[-1].infix_str_to_postfix_list(infix_str)
+
+        def evaluate_all(dag_per_call):
+            expression_dag = None
+            if dag_per_call:
+                expression_dag = ExpressionDAG()
+                for eq in eq_list:
+                    expression_dag.add_equation(eq, variable_value_list)
+            for eq in eq_list:
+                eq.evaluate_equation(variable_value_list, False, False, expression_dag=expression_dag)
+            return [eq.evaluated_result for eq in eq_list]
+
+        compiled_seconds, expected = time_call(lambda: evaluate_all(False), repeat)
+        dag_seconds, actual = time_call(lambda: evaluate_all(True), repeat)
+        for exp, act in zip(expected, actual):
+            pd.testing.assert_series_equal(exp, act)
+
+        results.append({"rows": num_rows, "compiled_seconds": compiled_seconds, "dag_seconds": dag_seconds,
+                        "speedup": compiled_seconds / dag_seconds})
+    return results
+
+
+if __name__ == "__main__":
+    for r in run():
+        print("rows: {rows:>7}  interpreted: {interpreted_seconds:7.4f}s  compiled: {compiled_seconds:7.4f}s  "
+              "speedup: {speedup:5.1f}x  {equation}".format(**r))
+    for r in run_equation_set():
+        print("rows: {rows:>7}  all equations compiled: {compiled_seconds:7.4f}s  expression DAG: {dag_seconds:7.4f}s  "
+              "speedup: {speedup:5.1f}x".format(**r))
@@ -0,0 +1,72 @@
+import json
+import numpy as np
+from DataProvider.IEXCloud import Base
+from Benchmarks.Timing import time_call
+
+
+########################################################################################################################
+# Benchmark of IEX Cloud response normalization: per dictionary path (clean_keys() then ms_epoch_to_datetime_str()) vs
+# columnar path (normalize_frame()), starting from the same JSON response body.
+#
+# Run from the repository root: python -m Benchmarks.IEXCloudNormalizationBenchmark
+########################################################################################################################
+
+CLEAN_KEYS = ["label", "change", "changePercent", "changeOverTime"]
+MS_EPOCH_KEYS = ["date", "updated"]
+
+
+# synthetic minute bar response with num_rows rows. about 1% of updated values are null
+def synthetic_body(num_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    start_ms = 1577836800000
+    close = 100 + rng.standard_normal(num_rows).cumsum()
+    updated = [None if rng.random() < 0.01 else start_ms + i * 60000 + 5000 for i in range(num_rows)]
+    rows = [{"date": start_ms + i * 60000, "updated": updated[i], "open": float(close[i]), "high": float(close[i] + 1),
+             "low": float(close[i] - 1), "close": float(close[i]), "volume": int(i), "label": "09:30 AM",
+             "change": 0.1, "changePercent": 0.001, "changeOverTime": 0.01} for i in range(num_rows)]
+    return json.dumps(rows)
+
+
+def per_dict(dict_list):
+    return Base.ms_epoch_to_datetime_str(Base.clean_keys(dict_list, CLEAN_KEYS), MS_EPOCH_KEYS)
+
+
+def columnar(dict_list):
+    return Base.normalize_frame(dict_list, CLEAN_KEYS, MS_EPOCH_KEYS)
+
+
+def columnar_str(dict_list):
+    return Base.normalize_frame(dict_list, CLEAN_KEYS, MS_EPOCH_KEYS, as_str=True)
+
+
+# returns list of dict with rows, parse_seconds (json.loads, common to all paths) and normalization seconds for each
+# path: per_dict_seconds, columnar_seconds (datetime64 columns), columnar_str_seconds (string columns)
+def run(row_counts=(1000, 10000, 100000), repeat=3):
+    results = []
+    for num_rows in row_counts:
+        body = synthetic_body(num_rows)
+
+        def setup():
+            return json.loads(body)
+
+        # both paths must produce the same values
+        expected = per_dict(setup())
+        actual = columnar_str(setup()).to_dict("records")
+        for exp, act in zip(expected, actual):
+            act = {k: None if isinstance(v, float) and np.isnan(v) else v for k, v in act.items()}
+            assert exp == act, (exp, act)
+
+        res = {"rows": num_rows, "parse_seconds": time_call(json.loads, repeat, lambda: body)[0],
+               "per_dict_seconds": time_call(per_dict, repeat, setup)[0],
+               "columnar_seconds": time_call(columnar, repeat, setup)[0],
+               "columnar_str_seconds": time_call(columnar_str, repeat, setup)[0]}
+        res["speedup"] = res["per_dict_seconds"] / res["columnar_seconds"]
+        results.append(res)
+    return results
+
+
+if __name__ == "__main__":
+    for r in run():
+        print("rows: {rows:>7}  json parse: {parse_seconds:7.4f}s  per dict: {per_dict_seconds:7.4f}s  "
+              "columnar: {columnar_seconds:7.4f}s  columnar (str): {columnar_str_seconds:7.4f}s  "
+              "speedup: {speedup:5.1f}x".format(**r))
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+from Statistics.Regression import RegrType
+from Statistics.LeastSquaresReg.LSRegression import LSRegression
+from Benchmarks.Timing import time_call
+
+
+########################################################################################################################
+# Benchmark of rolling and expanding OLS / WLS on synthetic daily data: sm.OLS / sm.WLS fit of each window in a python
+# loop (naive) vs LSRegression.fit_rolling_sm_model() (statsmodels RollingWLS, X'X and X'y updated as the window
+# moves). Coefficients, standard errors and R squared of both are checked to match.
+#
+# Run from the repository root: python -m Benchmarks.RollingRegressionBenchmark
+########################################################################################################################
+
+
+# endog series y and exog dataframe with a constant and num_vars variables, num_obs daily observations
+def synthetic_data(num_obs, num_vars=3, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2000-01-01", periods=num_obs, freq="D")
+    exog = pd.DataFrame(rng.normal(size=(num_obs, num_vars)), index=index,
+                        columns=["x" + str(i + 1) for i in range(num_vars)])
+    y = exog @ rng.normal(size=num_vars) + 0.5 + rng.normal(size=num_obs)
+    return pd.Series(y, index=index, name="y"), sm.add_constant(exog), rng.uniform(0.5, 2, num_obs)
+
+
+# returns dict of params, bse and rsquared like fit_rolling_sm_model(). window None for expanding
+def naive_fit(endog, exog, weights, window, min_nobs):
+    params = pd.DataFrame(np.nan, index=exog.index, columns=exog.columns)
+    bse = params.copy()
+    rsquared = pd.Series(np.nan, index=exog.index, name="rsquared")
+    for end in range(min_nobs, len(endog) + 1):
+        start = 0 if window is None else max(0, end - window)
+        if window is not None and end - start < window:
+            continue
+        if weights is None:
+            res = sm.OLS(endog.iloc[start:end], exog.iloc[start:end]).fit()
+        else:
+            res = sm.WLS(endog.iloc[start:end], exog.iloc[start:end], weights[start:end]).fit()
+        params.iloc[end - 1] = res.params
+        bse.iloc[end - 1] = res.bse
+        rsquared.iloc[end - 1] = res.rsquared
+    return {"params": params, "bse": bse, "rsquared": rsquared}
+
+
+def rolling_fit(endog, exog, weights, window, min_nobs):
+    lsr = LSRegression(RegrType.OLS if weights is None else RegrType.WLS)
+    if weights is not None:
+        lsr.model_params.set_value("weights", weights)
+    lsr.prepare_sm_model(endog, exog)
+    return lsr.fit_rolling_sm_model(window, window is None, min_nobs)
+
+
+# returns list of dict with obs, regr (OLS or WLS), window (None for expanding), windows (number of fits),
+# naive_seconds, rolling_seconds and speedup
+def run(obs=(500, 2000), windows=(60, 250, None), repeat=1):
+    results = []
+    for num_obs in obs:
+        endog, exog, weights = synthetic_data(num_obs)
+        min_nobs = exog.shape[1] + 1
+        for regr_weights in [None, weights]:
+            for window in windows:
+                naive_seconds, expected = time_call(
+                    lambda: naive_fit(endog, exog, regr_weights, window, min_nobs), repeat)
+                rolling_seconds, actual = time_call(
+                    lambda: rolling_fit(endog, exog, regr_weights, window, min_nobs), repeat)
+                for key in ["params", "bse", "rsquared"]:
+                    np.testing.assert_allclose(actual[key].to_numpy(dtype=float), expected[key].to_numpy(dtype=float),
+                                               rtol=1e-6, atol=1e-10)
+
+                results.append({"obs": num_obs, "regr": "OLS" if regr_weights is None else "WLS", "window": window,
+                                "windows": int(expected["rsquared"].notna().sum()), "naive_seconds": naive_seconds,
+                                "rolling_seconds": rolling_seconds, "speedup": naive_seconds / rolling_seconds})
+    return results
+
+
+if __name__ == "__main__":
+    for r in run():
+        r["window"] = "expanding" if r["window"] is None else r["window"]
+        print("obs: {obs:>5}  {regr}  window: {window:>9}  fits: {windows:>5}  naive: {naive_seconds:7.3f}s  "
+              "rolling: {rolling_seconds:7.4f}s  speedup: {speedup:6.1f}x".format(**r))
@@ -0,0 +1,97 @@
+import datetime
+import os
+import pathlib
+import tempfile
+import numpy as np
+import pandas as pd
+from Services.Electric.Model.Solar import Solar
+from Benchmarks.Timing import time_call
+
+
+########################################################################################################################
+# Benchmark of mySunpower hourly file processing on synthetic multi-year files: Period parsing with
+# str.split().map(lambda) (previous implementation) vs Solar.parse_sunpower_hourly_frame() (regex str.extract), and
+# whole file (process_sunpower_hourly_file()) vs streaming (iter_sunpower_hourly_file()) reads of .csv and .xlsx files.
+#
+# Run from the repository root: python -m Benchmarks.SunpowerHourlyFileBenchmark
+########################################################################################################################
+
+
+# synthetic mySunpower hourly export with 24 rows per day for num_days days
+def synthetic_frame(num_days, seed=0):
+    rng = np.random.default_rng(seed)
+    dts = pd.date_range(datetime.datetime(2020, 1, 1), periods=num_days * 24, freq="H")
+    period = (dts.strftime("%a ") + dts.month.astype(str) + "/" + dts.day.astype(str) + dts.strftime("/%Y - ") +
+              ((dts.hour + 11) % 12 + 1).astype(str) + dts.strftime(":%M%p").str.lower())
+    return pd.DataFrame({"Period": period, "Solar Production (kWh)": rng.random(len(dts)).round(2),
+                         "Home Usage (kWh)": rng.random(len(dts)).round(2)})
+
+
+# previous Solar.process_sunpower_hourly_file() parsing and check
+def split_map_parse(df):
+    df = df.rename(columns={"Period": "dt", "Solar Production (kWh)": "solar_kwh", "Home Usage (kWh)": "home_kwh"})
+    df["dt"] = df["dt"].str.split(" ").map(lambda x: x[1] + " " + x[3])
+    df["dt"] = pd.to_datetime(df["dt"], format="%m/%d/%Y %I:%M%p")
+    df["date"] = df["dt"].dt.date
+
+    v_df = df.groupby(by=["date"], as_index=False).agg({"dt": "count"})
+    v_df = v_df[v_df["dt"] != 24]
+    if len(v_df) > 0:
+        raise ValueError("mySunpower file has issues")
+
+    return df[["dt", "solar_kwh", "home_kwh"]]
+
+
+def vectorized_parse(df):
+    df = Solar.parse_sunpower_hourly_frame(df)
+    Solar.check_sunpower_hourly_frame(df)
+    return df
+
+
+# returns list of dict with years, rows, split_map_seconds, vectorized_seconds and speedup for parsing an in memory
+# frame, then whole_<ext>_seconds and stream_<ext>_seconds for reading and parsing files. file read timings use
+# repeat 1 and xlsx files are only written for years in excel_years since writing them is slow
+def run(years=(1, 5, 10), excel_years=(1, 5), repeat=3):
+    results = []
+    solar = Solar()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Solar reads files relative to the repository root from FI_SUNPOWER_DIR
+        os.environ["FI_SUNPOWER_DIR"] = os.path.relpath(tmp_dir, pathlib.Path(__file__).parent.parent) + "/"
+        for num_years in years:
+            raw_df = synthetic_frame(num_years * 365)
+
+            split_map_seconds, expected = time_call(lambda: split_map_parse(raw_df), repeat)
+            vectorized_seconds, actual = time_call(lambda: vectorized_parse(raw_df), repeat)
+            pd.testing.assert_frame_equal(expected.reset_index(drop=True), actual)
+
+            res = {"years": num_years, "rows": len(raw_df), "split_map_seconds": split_map_seconds,
+                   "vectorized_seconds": vectorized_seconds, "speedup": split_map_seconds / vectorized_seconds}
+
+            exts = ["csv", "xlsx"] if num_years in excel_years else ["csv"]
+            for ext in exts:
+                filename = "hourly_" + str(num_years) + "." + ext
+                path = pathlib.Path(tmp_dir) / filename
+                if ext == "csv":
+                    raw_df.to_csv(path, index=False)
+                else:
+                    raw_df.to_excel(path, index=False)
+
+                res["whole_" + ext + "_seconds"], whole_df = \
+                    time_call(lambda: solar.process_sunpower_hourly_file(filename), 1)
+                res["stream_" + ext + "_seconds"], stream_rows = \
+                    time_call(lambda: sum(len(df) for df in solar.iter_sunpower_hourly_file(filename)), 1)
+                assert stream_rows == len(whole_df)
+            results.append(res)
+    return results
+
+
+if __name__ == "__main__":
+    def fmt(v):
+        return "      -" if v is None else "{:7.3f}s".format(v)
+
+    for r in run():
+        print("years: {years:>2}  rows: {rows:>6}  split/map: {split_map_seconds:6.3f}s  "
+              "vectorized: {vectorized_seconds:6.3f}s  speedup: {speedup:5.1f}x".format(**r) +
+              "  csv whole: " + fmt(r.get("whole_csv_seconds")) + "  csv stream: " + fmt(r.get("stream_csv_seconds")) +
+              "  xlsx whole: " + fmt(r.get("whole_xlsx_seconds")) +
+              "  xlsx stream: " + fmt(r.get("stream_xlsx_seconds")))
@@ -0,0 +1,19 @@
+import time
+
+
+########################################################################################################################
+# Timing helpers shared by the benchmarks in this directory
+########################################################################################################################
+
+
+# returns (best seconds, result of the last call) of repeat calls of func
+# setup: if not None, called before each call of func (not timed) and its return value is passed to func
+def time_call(func, repeat=1, setup=None):
+    best, res = None, None
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        res = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, res
@@ -1,5 +1,89 @@
-import requests
+import asyncio
+import contextlib
 import datetime
+import json
+import os
+import pathlib
+import random
+import re
+import threading
+import time
+import aiohttp
+import dateutil.tz
+import pandas as pd
+import requests
+import requests.adapters
+from DataProvider.IEXCloudCache import ResponseCache
+
+
+########################################################################################################################
+# class RequestScheduler
+# Rate limits and retries requests to one IEX Cloud environment (see Base.ENV_URL_DICT). One scheduler is shared by all
+# Base instances for the same environment (see Base.scheduler()).
+#
+# Rate limit is a token bucket refilled at rate tokens per second up to capacity tokens. Every request attempt takes
+# one token. reserve() always succeeds and returns how long the caller must wait before sending. Reservations past the
+# available tokens are queued in call order (tokens go negative), so concurrent callers are released one at a time at
+# the refill rate instead of all retrying at once.
+#
+# Requests that fail with a retry status (429 or 5xx) or a connection error are retried up to max_retries times after
+# an exponential backoff with full jitter: uniform(0, min(backoff_max, backoff_base * 2 ** attempt)) seconds, or the
+# server's Retry-After value if it is larger.
+#
+# Counters: requests (request attempts), retries, throttled_seconds (time spent waiting for a token) and
+# backoff_seconds (time spent waiting before a retry).
+########################################################################################################################
+class RequestScheduler:
+
+    RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+    def __init__(self, rate, capacity, max_retries=5, backoff_base=0.5, backoff_max=30.0):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.requests = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+        self.backoff_seconds = 0.0
+
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    # take one token. returns the number of seconds the caller must wait before sending the request
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            self._tokens -= 1
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            self.requests += 1
+            self.throttled_seconds += wait
+            return wait
+
+    def is_retry(self, attempt, status_code):
+        return attempt < self.max_retries and (status_code is None or status_code in self.RETRY_STATUS_CODES)
+
+    # attempt starts at 0 for the first retry. retry_after is the Retry-After header value or None
+    def backoff(self, attempt, retry_after=None):
+        wait = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        try:
+            wait = max(wait, min(self.backoff_max, float(retry_after)))
+        except (TypeError, ValueError):
+            pass
+        with self._lock:
+            self.retries += 1
+            self.backoff_seconds += wait
+        return wait
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "retries": self.retries, "throttled_seconds": self.throttled_seconds,
+                    "backoff_seconds": self.backoff_seconds, "rate": self.rate, "capacity": self.capacity}
 
 
 ########################################################################################################################
@@ -36,6 +120,10 @@ import datetime
 # IEX cloud. APISystemMetadata and Account endpoint functions return a dictionary or a single string. All other endpoint
 # functions will always return either a list of dictionary(ies), list of string(s), a list of number(s) or a single
 # string. Lists are valid data. A single string is an error string, and should not be considered as valid data.
+#
+# do_request(), stock_price_base_request() and time_series_endpoint() take as_frame=True to return dictionary and list
+# of dictionary data as a DataFrame built column-wise by normalize_frame() instead of by clean_keys() and
+# ms_epoch_to_datetime_str() per dictionary. Use it for large responses (e.g. minute bars, options).
 ########################################################################################################################
 class Base:
     ENV_URL_DICT = {
@@ -63,7 +151,45 @@ class Base:
     MAJOR_ENDPOINTS = ["Stock", "Corporate Actions", "Market Info", "Treasuries", "Commodities", "Economic Data",
                        "Reference Data"]
 
+    # Blocking requests share one requests.Session (see session()) so connections are kept alive and reused across
+    # requests and across Base instances. SESSION_POOL_SIZE is the number of connections kept per host.
+    # REQUEST_TIMEOUT is (connect timeout, read timeout) in seconds. Call configure_session() to change either.
+    SESSION_POOL_SIZE = 10
+    REQUEST_TIMEOUT = (5, 30)
+    _session = None
+    _session_lock = threading.Lock()
+
+    # Requests per second (rate) and burst size (capacity) allowed by IEX Cloud for each environment. See
+    # RequestScheduler. Call configure_scheduler() to change.
+    RATE_LIMITS = {
+        "Production": (100, 100),
+        "Sandbox": (10, 10)
+    }
+    _schedulers = {}
+    _schedulers_lock = threading.Lock()
+
+    # Per endpoint request statistics. See record_request_stats() and endpoint_stats()
+    _endpoint_stats = {}
+    _endpoint_stats_lock = threading.Lock()
+
+    # Optional local cache of successful publishable key GET responses shared by all Base instances. See
+    # enable_response_cache(). Enabled on first use if environment variable IEX_CACHE_PATH is set.
+    # Cache entry time to live in seconds comes from the first regex in CACHE_TTL_ENDPOINT_PATTERNS that matches the
+    # endpoint, else from the endpoint info_params note (first matching keyword in CACHE_TTL_NOTE_KEYWORDS, else
+    # DEFAULT_CACHE_TTL) when the request is made through call_endpoint() or a *_many function. Requests for a date
+    # (/chart/date/YYYYMMDD or exactDate) before the last completed trading day never expire. The number in the
+    # info_params cost is counted as saved credits on each cache hit.
+    # Historical Daily (/chart with optional range and /previous) is keyed by endpoint since its note has no keyword
+    CACHE_TTL_ENDPOINT_PATTERNS = [(r"^/stock/[^/]+/(chart(/[0-9a-z]+)?|previous)$", 6 * 3600)]
+    CACHE_TTL_NOTE_KEYWORDS = [("minute", 60), ("weekly", 86400), ("monthly", 86400), ("quarterly", 86400),
+                               ("daily", 6 * 3600)]
+    DEFAULT_CACHE_TTL = 3600
+    _response_cache = None
+    _response_cache_checked_env = False
+    _cache_info = None
+
     def __init__(self, env_url_key, version_key, secret_key, publishable_key):
+        self.env_url_key = env_url_key
         self.env_version_str = self.ENV_URL_DICT[env_url_key] + self.VERSION_DICT[version_key]
         self.secret_key = secret_key
         self.publishable_key = publishable_key
@@ -92,6 +218,22 @@ class Base:
                     d[k] = datetime.datetime.fromtimestamp(d[k]/1000).strftime("%Y-%m-%d %H:%M:%S.%f")
         return dict_list
 
+    # Columnar alternative to clean_keys() and ms_epoch_to_datetime_str(). dict_list (or a single dict) is loaded into a
+    # DataFrame, clean_keys columns are dropped and ms_epoch_keys columns are converted with one vectorized
+    # pd.to_datetime call per column to local time (the same wall clock time ms_epoch_to_datetime_str() gives).
+    # Converted columns are datetime64 unless as_str is True, in which case they have the ms_epoch_to_datetime_str()
+    # string format
+    @staticmethod
+    def normalize_frame(dict_list, clean_keys=(), ms_epoch_keys=(), as_str=False):
+        df = pd.DataFrame.from_records([dict_list] if isinstance(dict_list, dict) else dict_list)
+        df = df.drop(columns=[k for k in clean_keys if k in df.columns])
+
+        for k in ms_epoch_keys:
+            if k in df.columns:
+                col = pd.to_datetime(df[k], unit="ms", utc=True).dt.tz_convert(dateutil.tz.gettz()).dt.tz_localize(None)
+                df[k] = col.dt.strftime("%Y-%m-%d %H:%M:%S.%f").where(col.notna(), None) if as_str else col
+        return df
+
     @staticmethod
     def num_str_list(start, end):
         nums = list(range(start, end))
@@ -125,7 +267,8 @@ class Base:
         else:
             self.__class__ = Base
 
-    def time_series_endpoint(self, endpoint, param_dict, symbol_key="symbol", require_sk=False, is_get=True):
+    def time_series_endpoint(self, endpoint, param_dict, symbol_key="symbol", require_sk=False, is_get=True,
+                             as_frame=False):
         from_date = param_dict["date-1"]
         to_date = param_dict["date-2"]
 
@@ -138,7 +281,7 @@ class Base:
         param_str = "from=" + from_date + "&to=" + to_date
 
         return self.do_request("/time-series/" + endpoint + symbol, param_str, require_sk, is_get,
-                               ms_epoch_time_keys=["date", "updated"])
+                               ms_epoch_time_keys=["date", "updated"], as_frame=as_frame)
 
     # data_points endpoints return a single string from IEX Cloud.
     # This function will return a list of that string if the request was successful. Otherwise will return the error
@@ -152,7 +295,7 @@ class Base:
         else:
             return [res]
 
-    def do_request(self, endpoint, param_str, require_sk, is_get, clean_keys=(), ms_epoch_time_keys=()):
+    def full_query_str(self, endpoint, param_str, require_sk):
         full_query = self.env_version_str + endpoint
 
         if require_sk is not None:
@@ -163,20 +306,357 @@ class Base:
                 full_query += "&"
                 full_query += param_str
 
-        response = requests.get(full_query) if is_get else requests.post(full_query)
-        error_str = self._IEXCloudHTTPErrorCodes.get(response.status_code)
+        return full_query
+
+    # returns None if status_code is not an error. 5xx status codes not in _IEXCloudHTTPErrorCodes are system errors
+    def error_str(self, status_code):
+        error_str = self._IEXCloudHTTPErrorCodes.get(status_code)
+        if error_str is None and status_code >= 500:
+            error_str = self._IEXCloudHTTPErrorCodes[500]
+        return error_str
+
+    # status_code and res (json decoded response data) from an http request to full_query. res is ignored if
+    # status_code is in _IEXCloudHTTPErrorCodes. as_frame True to return list or dictionary data as a DataFrame (see
+    # normalize_frame()) instead of a list of dictionaries or a dictionary
+    def process_response(self, full_query, status_code, res, clean_keys=(), ms_epoch_time_keys=(), as_frame=False):
+        error_str = self.error_str(status_code)
         if error_str is None:
-            res = response.json()
-            if isinstance(res, list):
+            if as_frame and (isinstance(res, dict) or isinstance(res, list) and
+                             (len(res) == 0 or isinstance(res[0], dict))):
+                return self.normalize_frame(res, clean_keys, ms_epoch_time_keys)
+            elif isinstance(res, list):
                 res = self.clean_keys(res, clean_keys)
                 return self.ms_epoch_to_datetime_str(res, ms_epoch_time_keys)
             else:
                 res = self.clean_keys([res], clean_keys)[0]
                 return self.ms_epoch_to_datetime_str([res], ms_epoch_time_keys)[0]
         else:
-            return "Full Request: " + full_query + "\n\nStatus Code Error: " + str(response.status_code) + \
+            return "Full Request: " + full_query + "\n\nStatus Code Error: " + str(status_code) + \
                    " indicates one or more of the following issues with the request: " + error_str
 
+    @classmethod
+    def session(cls):
+        with Base._session_lock:
+            if Base._session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=len(Base.ENV_URL_DICT),
+                                                        pool_maxsize=Base.SESSION_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"Accept-Encoding": "gzip, deflate"})
+                Base._session = session
+            return Base._session
+
+    # None values keep the current setting. The shared session is closed and recreated on next use
+    @staticmethod
+    def configure_session(pool_size=None, timeout=None):
+        with Base._session_lock:
+            if pool_size is not None:
+                Base.SESSION_POOL_SIZE = pool_size
+            if timeout is not None:
+                Base.REQUEST_TIMEOUT = timeout
+            if Base._session is not None:
+                Base._session.close()
+                Base._session = None
+
+    # stats are grouped by endpoint with symbol and date path segments (any segment without a lowercase letter)
+    # replaced by "*", e.g. "/stock/AAPL/chart/5y" and "/stock/MSFT/chart/5y" are both "/stock/*/chart/5y"
+    @staticmethod
+    def endpoint_stats_key(endpoint):
+        return "/".join(["*" if seg != "" and not any(c.islower() for c in seg) else seg
+                         for seg in endpoint.split("/")])
+
+    # seconds: request latency including reading the response body
+    # wire_bytes: bytes received over the network (compressed size if gzip). None if not known
+    # body_bytes: bytes of the decoded response body
+    @staticmethod
+    def record_request_stats(endpoint, seconds, wire_bytes, body_bytes, is_error):
+        key = Base.endpoint_stats_key(endpoint)
+        with Base._endpoint_stats_lock:
+            stats = Base._endpoint_stats.get(key)
+            if stats is None:
+                stats = {"requests": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0, "wire_bytes": 0,
+                         "body_bytes": 0}
+                Base._endpoint_stats[key] = stats
+            stats["requests"] += 1
+            stats["errors"] += 1 if is_error else 0
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["wire_bytes"] += body_bytes if wire_bytes is None else wire_bytes
+            stats["body_bytes"] += body_bytes
+
+    # returns dictionary with endpoint_stats_key() keys and dictionary values with keys requests, errors, seconds,
+    # max_seconds, mean_seconds, wire_bytes, body_bytes
+    @staticmethod
+    def endpoint_stats():
+        with Base._endpoint_stats_lock:
+            return {key: dict(stats, mean_seconds=stats["seconds"] / stats["requests"])
+                    for key, stats in Base._endpoint_stats.items()}
+
+    @staticmethod
+    def reset_endpoint_stats():
+        with Base._endpoint_stats_lock:
+            Base._endpoint_stats.clear()
+
+    # path to SQLite file. offline True to only return cached responses and never send requests
+    @staticmethod
+    def enable_response_cache(path, offline=False):
+        Base.disable_response_cache()
+        Base._response_cache = ResponseCache(path, offline=offline)
+        return Base._response_cache
+
+    @staticmethod
+    def disable_response_cache():
+        if Base._response_cache is not None:
+            Base._response_cache.close()
+        Base._response_cache = None
+        Base._response_cache_checked_env = True
+
+    @staticmethod
+    def response_cache():
+        if Base._response_cache is None and not Base._response_cache_checked_env:
+            Base._response_cache_checked_env = True
+            path = os.getenv("IEX_CACHE_PATH")
+            if path is not None:
+                Base._response_cache = ResponseCache(pathlib.Path(__file__).parent.parent / path)
+        return Base._response_cache
+
+    # returns dictionary with ResponseCache.stats() or empty dictionary if there is no cache
+    @staticmethod
+    def response_cache_stats():
+        cache = Base.response_cache()
+        return {} if cache is None else cache.stats()
+
+    # endpoint_dict is an element of endpoints(). call endpoint_dict["api_func"](*args) with the endpoint info_params
+    # note and cost used for response caching
+    def call_endpoint(self, endpoint_dict, *args):
+        with self.cache_info_context(endpoint_dict["param_func"]()[0]):
+            return endpoint_dict["api_func"](*args)
+
+    @contextlib.contextmanager
+    def cache_info_context(self, info):
+        prev_info = self._cache_info
+        self._cache_info = info
+        try:
+            yield
+        finally:
+            self._cache_info = prev_info
+
+    def cache_ttl(self, endpoint, param_str):
+        date = self.cache_request_date(endpoint, param_str)
+        if date is not None and date < self.last_completed_trading_day():
+            return None
+
+        for pattern, ttl in self.CACHE_TTL_ENDPOINT_PATTERNS:
+            if re.search(pattern, endpoint):
+                return ttl
+
+        note = "" if self._cache_info is None else self._cache_info["note"].lower()
+        for keyword, ttl in self.CACHE_TTL_NOTE_KEYWORDS:
+            if keyword in note:
+                return ttl
+        return self.DEFAULT_CACHE_TTL
+
+    # date (datetime.date) the request is for, from the /chart/date/YYYYMMDD path segment or the exactDate parameter.
+    # None if neither is in the request or the value is not a valid date
+    @staticmethod
+    def cache_request_date(endpoint, param_str):
+        match = re.search(r"/chart/date/([0-9]{8})$", endpoint)
+        if match is None and param_str is not None:
+            match = re.search(r"(?:^|&)exactDate=([0-9]{8})(?:&|$)", param_str)
+        if match is None:
+            return None
+        try:
+            return datetime.datetime.strptime(match.group(1), "%Y%m%d").date()
+        except ValueError:
+            return None
+
+    # last weekday before today. market holidays are not excluded, so after a holiday this is the holiday and the
+    # actual last trading day (then at least a day old) is cached without expiry
+    @staticmethod
+    def last_completed_trading_day():
+        day = datetime.date.today() - datetime.timedelta(days=1)
+        while day.weekday() >= 5:
+            day -= datetime.timedelta(days=1)
+        return day
+
+    def cache_cost(self):
+        match = None if self._cache_info is None else re.search(r"([0-9]+) per", self._cache_info["cost"])
+        return 0 if match is None else int(match.group(1))
+
+    # returns (ResponseCache, key, cached body or None). (None, None, None) if there is no cache or the request is not
+    # cacheable (secret key, no key or POST)
+    def cache_lookup(self, endpoint, param_str, require_sk, is_get):
+        cache = self.response_cache()
+        if cache is None or require_sk is not False or not is_get:
+            return None, None, None
+        key = ResponseCache.key(self.env_version_str, endpoint, param_str)
+        return cache, key, cache.get(key)
+
+    def cache_store(self, cache, key, endpoint, param_str, body):
+        url = self.env_version_str + endpoint + ("" if param_str is None else "?" + param_str)
+        cache.put(key, url, body, self.cache_ttl(endpoint, param_str), self.cache_cost())
+
+    @staticmethod
+    def offline_error_str(full_query):
+        return "Full Request: " + full_query + "\n\nCache Error: response not cached and offline mode is on"
+
+    def scheduler(self):
+        with Base._schedulers_lock:
+            scheduler = Base._schedulers.get(self.env_url_key)
+            if scheduler is None:
+                rate, capacity = Base.RATE_LIMITS[self.env_url_key]
+                scheduler = RequestScheduler(rate, capacity)
+                Base._schedulers[self.env_url_key] = scheduler
+            return scheduler
+
+    # change rate limit and retry settings for env_url_key. None values keep the current setting
+    @staticmethod
+    def configure_scheduler(env_url_key, rate=None, capacity=None, max_retries=None, backoff_base=None,
+                            backoff_max=None):
+        with Base._schedulers_lock:
+            old_rate, old_capacity = Base.RATE_LIMITS[env_url_key]
+            Base.RATE_LIMITS[env_url_key] = (old_rate if rate is None else rate,
+                                             old_capacity if capacity is None else capacity)
+            old = Base._schedulers.get(env_url_key)
+            scheduler = RequestScheduler(*Base.RATE_LIMITS[env_url_key])
+            for key, val in [("max_retries", max_retries), ("backoff_base", backoff_base),
+                             ("backoff_max", backoff_max)]:
+                if val is not None:
+                    setattr(scheduler, key, val)
+                elif old is not None:
+                    setattr(scheduler, key, getattr(old, key))
+            Base._schedulers[env_url_key] = scheduler
+
+    # returns dictionary with env_url_key keys and RequestScheduler.stats() values
+    @staticmethod
+    def scheduler_stats():
+        with Base._schedulers_lock:
+            return {key: scheduler.stats() for key, scheduler in Base._schedulers.items()}
+
+    def do_request(self, endpoint, param_str, require_sk, is_get, clean_keys=(), ms_epoch_time_keys=(),
+                   as_frame=False):
+        full_query = self.full_query_str(endpoint, param_str, require_sk)
+
+        cache, cache_key, cached_body = self.cache_lookup(endpoint, param_str, require_sk, is_get)
+        if cached_body is not None:
+            return self.process_response(full_query, 200, json.loads(cached_body), clean_keys=clean_keys,
+                                         ms_epoch_time_keys=ms_epoch_time_keys, as_frame=as_frame)
+        elif cache is not None and cache.offline:
+            return self.offline_error_str(full_query)
+
+        session = self.session()
+        scheduler = self.scheduler()
+        attempt = 0
+        while True:
+            time.sleep(scheduler.reserve())
+            start = time.perf_counter()
+            try:
+                if is_get:
+                    response = session.get(full_query, timeout=Base.REQUEST_TIMEOUT)
+                else:
+                    response = session.post(full_query, timeout=Base.REQUEST_TIMEOUT)
+                body = response.content
+            except requests.RequestException as ex:
+                self.record_request_stats(endpoint, time.perf_counter() - start, 0, 0, True)
+                if scheduler.is_retry(attempt, None):
+                    time.sleep(scheduler.backoff(attempt))
+                    attempt += 1
+                    continue
+                return "Full Request: " + full_query + "\n\nRequest Error: " + str(ex)
+
+            try:
+                wire_bytes = response.raw.tell()
+            except (AttributeError, OSError):
+                wire_bytes = None
+            is_error = self.error_str(response.status_code) is not None
+            self.record_request_stats(endpoint, time.perf_counter() - start, wire_bytes, len(body), is_error)
+
+            if not scheduler.is_retry(attempt, response.status_code):
+                break
+            time.sleep(scheduler.backoff(attempt, response.headers.get("Retry-After")))
+            attempt += 1
+
+        res = None if is_error else response.json()
+        if cache is not None and not is_error:
+            self.cache_store(cache, cache_key, endpoint, param_str, response.text)
+        return self.process_response(full_query, response.status_code, res, clean_keys=clean_keys,
+                                     ms_epoch_time_keys=ms_epoch_time_keys, as_frame=as_frame)
+
+    ####################################################################################################################
+    # Concurrent requests
+    #
+    # do_request_async() is the asyncio version of do_request() and returns the same result or error string.
+    # request_many() runs many requests concurrently on one aiohttp session (shared connection pool) with at most
+    # max_concurrency requests in flight. Each request is a dictionary of do_request() keyword arguments
+    # (endpoint, param_str, require_sk, is_get and optionally clean_keys, ms_epoch_time_keys, as_frame). Results are
+    # returned in the same order as the requests. Batch endpoint functions (e.g. Stock.historical_daily_many) are built
+    # on request_many().
+    ####################################################################################################################
+    DEFAULT_MAX_CONCURRENCY = 8
+
+    async def do_request_async(self, session, endpoint, param_str, require_sk, is_get, clean_keys=(),
+                               ms_epoch_time_keys=(), as_frame=False):
+        full_query = self.full_query_str(endpoint, param_str, require_sk)
+
+        cache, cache_key, cached_body = self.cache_lookup(endpoint, param_str, require_sk, is_get)
+        if cached_body is not None:
+            return self.process_response(full_query, 200, json.loads(cached_body), clean_keys=clean_keys,
+                                         ms_epoch_time_keys=ms_epoch_time_keys, as_frame=as_frame)
+        elif cache is not None and cache.offline:
+            return self.offline_error_str(full_query)
+
+        method = session.get if is_get else session.post
+        scheduler = self.scheduler()
+        attempt = 0
+        while True:
+            await asyncio.sleep(scheduler.reserve())
+            start = time.perf_counter()
+            try:
+                async with method(full_query) as response:
+                    status_code = response.status
+                    body = await response.read()
+                    is_error = self.error_str(status_code) is not None
+                    res = None if is_error else await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as ex:
+                self.record_request_stats(endpoint, time.perf_counter() - start, 0, 0, True)
+                if scheduler.is_retry(attempt, None):
+                    await asyncio.sleep(scheduler.backoff(attempt))
+                    attempt += 1
+                    continue
+                return "Full Request: " + full_query + "\n\nRequest Error: " + str(ex)
+
+            self.record_request_stats(endpoint, time.perf_counter() - start, response.content_length, len(body),
+                                      is_error)
+            if not scheduler.is_retry(attempt, status_code):
+                break
+            await asyncio.sleep(scheduler.backoff(attempt, response.headers.get("Retry-After")))
+            attempt += 1
+
+        if cache is not None and not is_error:
+            self.cache_store(cache, cache_key, endpoint, param_str, body.decode("utf-8"))
+        return self.process_response(full_query, status_code, res, clean_keys=clean_keys,
+                                     ms_epoch_time_keys=ms_epoch_time_keys, as_frame=as_frame)
+
+    async def request_many_async(self, request_list, max_concurrency=None):
+        max_concurrency = self.DEFAULT_MAX_CONCURRENCY if max_concurrency is None else max_concurrency
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def bounded_request(session, request):
+            async with semaphore:
+                return await self.do_request_async(session, **request)
+
+        connector = aiohttp.TCPConnector(limit=max_concurrency)
+        timeout = aiohttp.ClientTimeout(sock_connect=Base.REQUEST_TIMEOUT[0], sock_read=Base.REQUEST_TIMEOUT[1])
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            return await asyncio.gather(*[bounded_request(session, request) for request in request_list])
+
+    # blocking call. must not be called from a running event loop (use request_many_async() instead)
+    def request_many(self, request_list, max_concurrency=None):
+        if len(request_list) == 0:
+            return []
+        return asyncio.run(self.request_many_async(request_list, max_concurrency=max_concurrency))
+
 
 class APISystemMetadata(Base):
 
@@ -245,9 +725,17 @@ class Account(Base):
 ########################################################################################################################
 class Stock(Base):
 
-    def stock_price_base_request(self, endpoint, param_str, clean_keys=(), ms_epoch_time_keys=()):
+    HISTORICAL_DAILY_CLEAN_KEYS = ["changeOverTime", "label", "change", "changePercent", "symbol"]
+
+    def stock_price_base_request(self, endpoint, param_str, clean_keys=(), ms_epoch_time_keys=(), as_frame=False):
         return super().do_request("/stock/" + endpoint, param_str, False, True, clean_keys=clean_keys,
-                                  ms_epoch_time_keys=ms_epoch_time_keys)
+                                  ms_epoch_time_keys=ms_epoch_time_keys, as_frame=as_frame)
+
+    # stock_price_base_request() arguments as a request for request_many()
+    @staticmethod
+    def stock_request_kwargs(endpoint, param_str, clean_keys=(), ms_epoch_time_keys=(), as_frame=False):
+        return {"endpoint": "/stock/" + endpoint, "param_str": param_str, "require_sk": False, "is_get": True,
+                "clean_keys": clean_keys, "ms_epoch_time_keys": ms_epoch_time_keys, "as_frame": as_frame}
 
     def endpoints(self):
         return [
@@ -328,18 +816,33 @@ class Stock(Base):
     def historical_daily(self, *args):
         param_dict = args[0]
         symbol = param_dict.get("ticker-1")
-        rng = param_dict.get("range")
-        if rng == "1d":
-            endpoint = symbol + "/previous"
-        else:
-            rng = "" if rng is None else "/" + rng
-            endpoint = symbol + "/chart" + rng
 
-        res = self.stock_price_base_request(endpoint, None, ["changeOverTime", "label", "change", "changePercent", "symbol"])
+        res = self.stock_price_base_request(self.historical_daily_endpoint(symbol, param_dict.get("range")), None,
+                                            self.HISTORICAL_DAILY_CLEAN_KEYS)
         if isinstance(res, dict):
             res = [res]
         return res
 
+    @staticmethod
+    def historical_daily_endpoint(symbol, rng):
+        if rng == "1d":
+            return symbol + "/previous"
+        else:
+            rng = "" if rng is None else "/" + rng
+            return symbol + "/chart" + rng
+
+    # concurrent version of historical_daily() for many symbols. param_dict is the same as for historical_daily()
+    # except "ticker-1" is ignored.
+    # returns dictionary with symbols as keys and historical_daily() results (list of dictionaries or error string) as
+    # values
+    def historical_daily_many(self, symbols, param_dict, max_concurrency=None):
+        request_list = [self.stock_request_kwargs(self.historical_daily_endpoint(symbol, param_dict.get("range")),
+                                                  None, clean_keys=self.HISTORICAL_DAILY_CLEAN_KEYS)
+                        for symbol in symbols]
+        with self.cache_info_context(self.historical_daily_params()[0]):
+            res_list = self.request_many(request_list, max_concurrency=max_concurrency)
+        return {symbol: [res] if isinstance(res, dict) else res for symbol, res in zip(symbols, res_list)}
+
     ####################################################################################################################
     # Historical Minute 1 Day
     ####################################################################################################################
@@ -513,6 +1016,15 @@ class Stock(Base):
         else:
             return [res]
 
+    # concurrent version of company() for many symbols. param_dict is ignored (company() has no other parameters) but
+    # kept for the same signature as other *_many functions
+    # returns dictionary with symbols as keys and company() results (list of dictionary or error string) as values
+    def company_many(self, symbols, param_dict=None, max_concurrency=None):
+        request_list = [self.stock_request_kwargs(symbol + "/company", None) for symbol in symbols]
+        with self.cache_info_context(self.company_params()[0]):
+            res_list = self.request_many(request_list, max_concurrency=max_concurrency)
+        return {symbol: res if isinstance(res, str) else [res] for symbol, res in zip(symbols, res_list)}
+
     ####################################################################################################################
     # Top 10 Insider Roster
     ####################################################################################################################
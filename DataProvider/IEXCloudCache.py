@@ -0,0 +1,91 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+
+########################################################################################################################
+# class ResponseCache
+# Local SQLite cache of successful IEX Cloud responses. See IEXCloud.Base.enable_response_cache().
+#
+# Entries are keyed by a hash of the request (environment url, endpoint, parameter string). Tokens are not part of the
+# key and are not stored. The raw response body is stored so cached responses go through the same processing as new
+# responses. Each entry has an expiry time (None for immutable data, e.g. a date range entirely in the past) and the
+# message cost of the request, which is counted as saved credits on every hit.
+#
+# In offline mode, get() returns expired entries instead of treating them as misses and IEXCloud.Base does not send any
+# request on a miss.
+#
+# Counters: hits, misses, expired (misses because the entry expired) and credits_saved.
+########################################################################################################################
+class ResponseCache:
+
+    def __init__(self, path, offline=False):
+        self.path = str(path)
+        self.offline = offline
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.credits_saved = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS response (key TEXT PRIMARY KEY, url TEXT NOT NULL, "
+                           "body TEXT NOT NULL, stored_at REAL NOT NULL, expires_at REAL, cost INTEGER NOT NULL)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(env_version_str, endpoint, param_str):
+        request_str = env_version_str + endpoint + "?" + ("" if param_str is None else param_str)
+        return hashlib.sha256(request_str.encode("utf-8")).hexdigest()
+
+    # returns cached response body string or None
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT body, expires_at, cost FROM response WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            body, expires_at, cost = row
+            if not self.offline and expires_at is not None and expires_at < time.time():
+                self.misses += 1
+                self.expired += 1
+                return None
+
+            self.hits += 1
+            self.credits_saved += cost
+            return body
+
+    # ttl is seconds until the entry expires. None for never
+    def put(self, key, url, body, ttl, cost):
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        with self._lock:
+            self._conn.execute("REPLACE INTO response (key, url, body, stored_at, expires_at, cost) "
+                               "VALUES (?, ?, ?, ?, ?, ?)", (key, url, body, now, expires_at, cost))
+            self._conn.commit()
+
+    # remove expired entries. returns number of entries removed
+    def purge_expired(self):
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM response WHERE expires_at IS NOT NULL AND expires_at < ?",
+                                     (time.time(),))
+            self._conn.commit()
+            return cur.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM response")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM response").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "expired": self.expired,
+                    "credits_saved": self.credits_saved, "entries": entries, "offline": self.offline}
@@ -0,0 +1,192 @@
+import datetime
+from Database.MySQLAM import MySQLAM
+from Database.MySQLException import MySQLException
+from DataProvider import IEXCloud
+
+
+########################################################################################################################
+# class SEIPriceSync
+# Incremental sync of daily prices from IEX Cloud (Stock.historical_daily) into the SEI price tables
+# (e.g. stocks_price_1D, etfs_price_1D).
+#
+# For each security, the dates already in the price table (read_data_data_table_min_max_date) and the security's
+# high-water mark (iex_price_sync table, last date stored by a previous sync) decide which dates are missing:
+#   - forward gap: every date after the latest stored date up to the last complete trading day
+#   - backward gap: if begin_date is given, every date from begin_date to the day before the earliest stored date
+# Securities without a gap are skipped without any request. For the rest, the smallest historical_daily range that
+# covers the gap is requested (securities with the same range are fetched concurrently with historical_daily_many),
+# only rows inside the gap are kept and they are upserted with MySQLAM.insert_or_update_sei_price. The high-water mark
+# is then set to the latest stored date.
+#
+# Interior gaps (missing dates between the earliest and latest stored dates) are not detected. Rows already stored are
+# not re-downloaded, so adj_close values stored before a later dividend or split are not restated.
+#
+# Price mapping (IEX chart -> table): uOpen, uHigh, uLow, uClose, uVolume (unadjusted) -> open, high, low, close,
+# volume. close (adjusted) -> adj_close.
+########################################################################################################################
+class SEIPriceSync:
+
+    FREQ = "1D"
+    SECURITIES_TYPES = ["Stocks", "ETFs"]
+
+    # historical_daily ranges and the number of calendar days each covers, from smallest to largest
+    RANGE_DAYS = [("5d", 7), ("1m", 30), ("3m", 91), ("6m", 182), ("1y", 365), ("2y", 730), ("5y", 1826),
+                  ("max", None)]
+
+    # db: MySQLAM. iex_base: IEXCloud.Base (or subclass) initialized with environment and tokens
+    def __init__(self, db, iex_base, max_concurrency=None):
+        self.db = db
+        self.stock = IEXCloud.Stock(iex_base.env_url_key, "Stable", iex_base.secret_key, iex_base.publishable_key)
+        self.stock.env_version_str = iex_base.env_version_str
+        self.max_concurrency = max_concurrency
+
+    # weekday before today. holidays are not considered, so a sync run the day after a holiday requests a range that
+    # returns no new rows
+    @staticmethod
+    def last_complete_trading_day(today=None):
+        day = (datetime.date.today() if today is None else today) - datetime.timedelta(days=1)
+        while day.weekday() >= 5:
+            day -= datetime.timedelta(days=1)
+        return day
+
+    @classmethod
+    def covering_range(cls, start_date, today):
+        days = (today - start_date).days
+        for rng, rng_days in cls.RANGE_DAYS:
+            if rng_days is None or days <= rng_days:
+                return rng
+
+    @staticmethod
+    def _to_date(val):
+        if val is None or isinstance(val, datetime.date) and not isinstance(val, datetime.datetime):
+            return val
+        if isinstance(val, datetime.datetime):
+            return val.date()
+        return datetime.date.fromisoformat(str(val)[0:10])
+
+    def read_securities(self, securities_type):
+        if securities_type == "Stocks":
+            return self.db.read_stocks()
+        elif securities_type == "ETFs":
+            return self.db.read_etfs()
+        else:
+            raise ValueError("Securities type not supported by IEX Cloud price sync: " + str(securities_type))
+
+    def stored_date_range(self, securities_type, securities_id):
+        prefix = self.db.read_data_subtypes(
+            MySQLAM.data_subtypes_db_dict([None, securities_type]))[0]["db_data_table_prefix"]
+        midfix = self.db.read_data_types(MySQLAM.data_types_db_dict([None, "Security"]))[0]["db_data_table_midfix"]
+        db_dict = MySQLAM.data_data_table_db_dict([prefix, midfix, self.FREQ, "close",
+                                                   {"securities_id": securities_id}, True, "securities"])
+        min_date, max_date = self.db.read_data_data_table_min_max_date(db_dict)
+        return self._to_date(min_date), self._to_date(max_date)
+
+    # returns list of (first missing date, last missing date) for each gap that needs to be fetched. first missing date
+    # is None if there are no stored prices and no begin_date
+    def missing_ranges(self, min_date, max_date, hwm_date, begin_date, end_date):
+        ranges = []
+        latest = max([d for d in [max_date, hwm_date] if d is not None], default=None)
+
+        if latest is None:
+            ranges.append((begin_date, end_date))
+        else:
+            if latest < end_date:
+                ranges.append((latest + datetime.timedelta(days=1), end_date))
+            if begin_date is not None and min_date is not None and begin_date < min_date:
+                ranges.append((begin_date, min_date - datetime.timedelta(days=1)))
+
+        return ranges
+
+    @staticmethod
+    def chart_row_to_price(row):
+        return {"date_time": row["date"][0:10],
+                "open": row.get("uOpen", row.get("open")),
+                "high": row.get("uHigh", row.get("high")),
+                "low": row.get("uLow", row.get("low")),
+                "close": row.get("uClose", row.get("close")),
+                "adj_close": row.get("close"),
+                "volume": row.get("uVolume", row.get("volume"))}
+
+    def sync(self, securities_type, tickers=None, begin_date=None, today=None):
+        """ Fetch and store missing daily prices for every security of securities_type
+
+        Args:
+            securities_type (str): one of SECURITIES_TYPES
+            tickers (Optional[list[str]]): only sync these tickers. Default None for all securities of securities_type
+            begin_date (Optional[datetime.date]): earliest date to backfill to. Default None to only fetch dates after
+                the latest stored date. Securities with no stored prices and no begin_date are fetched with range max
+            today (Optional[datetime.date]): Default None for datetime.date.today()
+
+        Returns:
+            dict: ticker keys and dict values with keys securities_id, ranges (list of (from date, to date)),
+                requested_range (historical_daily range or None if skipped), fetched_rows, stored_rows and error
+                (error string or None)
+        """
+        today = datetime.date.today() if today is None else today
+        end_date = self.last_complete_trading_day(today)
+
+        securities = self.read_securities(securities_type)
+        if tickers is not None:
+            securities = [sec for sec in securities if sec["ticker"] in tickers]
+
+        hwm_dict = {d["securities_id"]: self._to_date(d["last_date_time"])
+                    for d in self.db.read_iex_price_sync(self.FREQ)}
+
+        report = {}
+        range_groups = {}
+        for sec in securities:
+            min_date, max_date = self.stored_date_range(securities_type, sec["securities_id"])
+            ranges = self.missing_ranges(min_date, max_date, hwm_dict.get(sec["securities_id"]), begin_date,
+                                         end_date)
+            sec_report = {"securities_id": sec["securities_id"], "ranges": ranges, "requested_range": None,
+                          "fetched_rows": 0, "stored_rows": 0, "error": None, "max_date": max_date}
+            report[sec["ticker"]] = sec_report
+
+            if len(ranges) > 0:
+                if any(r[0] is None for r in ranges):
+                    rng = "max"
+                else:
+                    rng = self.covering_range(min([r[0] for r in ranges]), today)
+                sec_report["requested_range"] = rng
+                range_groups.setdefault(rng, []).append(sec["ticker"])
+
+        sync_dict_list = []
+        for rng, group_tickers in range_groups.items():
+            res_dict = self.stock.historical_daily_many(group_tickers, {"range": rng},
+                                                        max_concurrency=self.max_concurrency)
+            for ticker, res in res_dict.items():
+                sec_report = report[ticker]
+                if isinstance(res, str):
+                    sec_report["error"] = res
+                    continue
+
+                rows = []
+                for row in res:
+                    date = self._to_date(row["date"])
+                    if any((r_from is None or r_from <= date) and date <= r_to for r_from, r_to in
+                           sec_report["ranges"]):
+                        rows.append(self.chart_row_to_price(row))
+                sec_report["fetched_rows"] = len(res)
+
+                if len(rows) > 0:
+                    try:
+                        chunk_list = self.db.insert_or_update_sei_price(rows, self.FREQ, securities_type,
+                                                                        sec_report["securities_id"])
+                    except MySQLException as ex:
+                        sec_report["error"] = str(ex)
+                        continue
+                    sec_report["stored_rows"] = sum(chunk["rows"] for chunk in chunk_list)
+
+                hwm_date = max([self._to_date(r["date_time"]) for r in rows] +
+                               [d for d in [sec_report["max_date"], hwm_dict.get(sec_report["securities_id"])]
+                                if d is not None], default=None)
+                if hwm_date is not None:
+                    sync_dict_list.append({"securities_id": sec_report["securities_id"], "freq": self.FREQ,
+                                           "last_date_time": hwm_date, "last_sync": datetime.datetime.now()})
+
+        if len(sync_dict_list) > 0:
+            self.db.insert_or_update_iex_price_sync(sync_dict_list)
+
+        for sec_report in report.values():
+            sec_report.pop("max_date")
+        return report
@@ -1,10 +1,13 @@
 import datetime
 import os
+import threading
+import time
 import pandas as pd
 from enum import Enum
 from typing import Union, Optional
 from decimal import Decimal
 from Database.MySQLBase import MySQLBase, FetchCursor
+from Database.MySQLException import MySQLException
 from Database.DBDict import DBDict
 from Database.QueryWriter import QueryWriter
 from Database.POPO.RealEstate import RealEstate
@@ -36,6 +39,128 @@ class ETFDataTypes(Enum):
         self.db_table = db_table
 
 
+class MetadataCache:
+    """ Process wide TTL cache for small, rarely changed metadata tables
+
+    Results are keyed by query, parameters and fetch cursor and tagged with the tables they were read from so that
+    writes to a table can invalidate every cached result that depends on it.
+
+    Attributes:
+        ttl (float): seconds a cached result is valid
+        hits (int): number of get() calls that found a valid result
+        misses (int): number of get() calls that did not find a valid result
+    """
+    def __init__(self, ttl=None):
+        """ init MetadataCache
+
+        Args:
+            ttl (Optional[float]): Default None for MYSQL_METADATA_CACHE_TTL in .env or 300 if not set
+        """
+        if ttl is None:
+            ttl = os.getenv("MYSQL_METADATA_CACHE_TTL", 300)
+        self.ttl = float(ttl)
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}  # key: (tables, expire time, result)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _copy(result):
+        """ Copy list[dict], list[list] and pd.DataFrame results so callers can't change cached values """
+        if isinstance(result, list):
+            return [dict(d) if isinstance(d, dict) else list(d) if isinstance(d, list) else d for d in result]
+        return result.copy() if isinstance(result, pd.DataFrame) else result
+
+    def get(self, key):
+        """ Get cached result
+
+        Args:
+            key (tuple): hashable cache key
+
+        Returns:
+            Optional: copy of cached result or None if not cached or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is None or entry[1] < time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._copy(entry[2])
+
+    def put(self, key, tables, result):
+        """ Cache result
+
+        Args:
+            key (tuple): hashable cache key
+            tables (tuple[str]): tables the result was read from
+            result: result to cache. a copy is cached
+        """
+        with self._lock:
+            self._entries[key] = (tables, time.monotonic() + self.ttl, self._copy(result))
+
+    def invalidate(self, *tables):
+        """ Remove cached results
+
+        Args:
+            *tables (str): remove results read from any of these tables. no tables to remove all results
+        """
+        with self._lock:
+            if len(tables) == 0:
+                self._entries.clear()
+            else:
+                self._entries = {k: v for k, v in self._entries.items() if set(v[0]).isdisjoint(tables)}
+
+
+class IdentityMap:
+    """ Process wide identity map for small, almost static tables referenced by foreign keys
+
+    Each table is read in full the first time it is needed and its instances are shared by every reader afterwards, so
+    foreign key resolution does not query the database. A table is read again after invalidate() or when an id that
+    is not in the map is requested.
+
+    Attributes:
+        loads (int): number of full table reads
+    """
+    def __init__(self):
+        """ init IdentityMap """
+        self.loads = 0
+        self._tables = {}  # table name: dict of id: instance
+        self._lock = threading.RLock()
+
+    def get_table(self, table, read_func, required_ids=()):
+        """ Get id to instance dict for table
+
+        Args:
+            table (str): table name
+            read_func (Callable[[], list]): reads all instances of the table. instances must have an id attribute
+            required_ids (Iterable[int]): read the table again if any of these ids are not in the map. Default ()
+
+        Returns:
+            dict: int id keys to instance values. shared by all callers and must not be changed
+        """
+        with self._lock:
+            id_dict = self._tables.get(table, None)
+            if id_dict is None or any([i not in id_dict for i in required_ids]):
+                id_dict = {inst.id: inst for inst in read_func()}
+                self._tables[table] = id_dict
+                self.loads += 1
+            return id_dict
+
+    def invalidate(self, *tables):
+        """ Remove tables from the map so they are read again on next use
+
+        Args:
+            *tables (str): tables to remove. no tables to remove all tables
+        """
+        with self._lock:
+            if len(tables) == 0:
+                self._tables.clear()
+            else:
+                for table in tables:
+                    self._tables.pop(table, None)
+
+
 ########################################################################################################################
 # class Database
 # Use id for Update where clause wherever possible. The front end will be programmed with this assumption for simplicity
@@ -47,12 +172,27 @@ class MySQLAM(MySQLBase):
 
     Inherits:
         MySQLBase
+
+    Attributes:
+        metadata_cache (MetadataCache): class attribute. shared cache for data_types, data_subtypes, data_freq,
+            price_freq and data_subtype_freq reads
+        identity_map (IdentityMap): class attribute. shared real_estate, service_provider and real_property_values
+            instances used for foreign key resolution
     """
-    def __init__(self, fetch_cursor=FetchCursor.LIST_DICT):
-        """Init MySQLAM """
+    metadata_cache = MetadataCache()
+    identity_map = IdentityMap()
+
+    def __init__(self, fetch_cursor=FetchCursor.LIST_DICT, use_pool=True):
+        """Init MySQLAM
+
+        Args:
+            fetch_cursor (FetchCursor): how data loaded from tables is returned. Default FetchCursor.LIST_DICT
+            use_pool (boolean): True to borrow the connection from the process wide connection pool and give it back
+                on db_close() (e.g. context manager exit). Default True. False to open and close a dedicated connection
+        """
         super(MySQLAM, self).__init__(host=os.getenv("MYSQL_HOST"), user=os.getenv("MYSQL_USER"),
                                       password=os.getenv("MYSQL_PASSWORD"), db_name=os.getenv("MYSQL_NAME"),
-                                      fetch_cursor=fetch_cursor)
+                                      fetch_cursor=fetch_cursor, use_pool=use_pool)
 
     @MySQLBase.fetch_cursor.setter
     def fetch_cursor(self, fetch_cursor):
@@ -63,6 +203,34 @@ class MySQLAM(MySQLBase):
         """
         MySQLBase.fetch_cursor.fset(self, fetch_cursor)
 
+    def _cached_fetch(self, tables, query, params=None):
+        """ execute_fetch() with results cached in MySQLAM.metadata_cache
+
+        Args:
+            tables (tuple[str]): tables read by query. used to invalidate the cached result
+            query (str): SQL query
+            params (Optional[dict]): query parameters. Default None
+
+        Returns:
+            see MySQLBase.execute_fetch()
+        """
+        key = (query, None if params is None else repr(sorted(params.items())), self._fetch_cursor)
+        res = MySQLAM.metadata_cache.get(key)
+        if res is None:
+            res = self.execute_fetch(query, params)
+            MySQLAM.metadata_cache.put(key, tables, res)
+        return res
+
+    @staticmethod
+    def invalidate_metadata_cache(*tables):
+        """ Remove cached metadata results. Call after writing to data_types, data_subtypes, data_freq, price_freq or
+        data_subtype_freq outside of this class
+
+        Args:
+            *tables (str): remove results read from any of these tables. no tables to remove all results
+        """
+        MySQLAM.metadata_cache.invalidate(*tables)
+
     @staticmethod
     def set_where_stmt(key, value, op):
         if value is None:
@@ -145,10 +313,11 @@ class MySQLAM(MySQLBase):
 
         query += " ORDER BY name"
 
-        return self.execute_fetch(query, data_types_db_dict.value_dict)
+        return self._cached_fetch(("data_types",), query, data_types_db_dict.value_dict)
 
     def read_data_subtype_id(self, subtype_name):
-        return self.execute_fetch("SELECT id FROM data_subtypes WHERE name = '" + subtype_name + "'")[0]['id']
+        return self._cached_fetch(("data_subtypes",), "SELECT id FROM data_subtypes WHERE name = %(name)s",
+                                  {"name": subtype_name})[0]['id']
 
     def read_data_subtypes(self, data_subtypes_db_dict=None):
         if data_subtypes_db_dict is None:
@@ -165,7 +334,7 @@ class MySQLAM(MySQLBase):
 
         query += " ORDER BY name"
 
-        return self.execute_fetch(query, data_subtypes_db_dict.value_dict)
+        return self._cached_fetch(("data_subtypes",), query, data_subtypes_db_dict.value_dict)
 
     def read_data_freq(self, data_freq_db_dict=None):
         if data_freq_db_dict is None:
@@ -178,7 +347,7 @@ class MySQLAM(MySQLBase):
 
         query += " ORDER BY freq"
 
-        return self.execute_fetch(query, data_freq_db_dict.value_dict)
+        return self._cached_fetch(("data_freq",), query, data_freq_db_dict.value_dict)
 
     def read_data_subtype_freq(self, data_subtype_freq_db_dict=None):
         query = "SELECT ds.id as subtype_id, ds.name, df.id as freq_id, df.freq, df.format_str " \
@@ -193,7 +362,8 @@ class MySQLAM(MySQLBase):
         elif data_subtype_freq_db_dict.value_dict["freq_id"] is not None:
             query += " WHERE dsf.freq_id = %(freq_id)s ORDER BY ds.name"
 
-        return self.execute_fetch(query, data_subtype_freq_db_dict.value_dict)
+        return self._cached_fetch(("data_subtype_freq", "data_subtypes", "data_freq"), query,
+                                  data_subtype_freq_db_dict.value_dict)
 
     def read_data_subtype_meta_table(self, data_meta_table_db_dict):
         meta_table = None if data_meta_table_db_dict is None else data_meta_table_db_dict.value_dict["meta_table"]
@@ -254,13 +424,15 @@ class MySQLAM(MySQLBase):
 
         return next(iter(res_dict_list[0].values()))
 
-    def read_data_data_table(self, data_data_table_db_dict):
+    # fetch_cursor: None to use self.fetch_cursor. FetchCursor.NUMPY_COLUMNS to return dict of date_time and column
+    #   arrays that can be passed directly to StatsData.set_data_series()
+    def read_data_data_table(self, data_data_table_db_dict, fetch_cursor=None):
         id_column, table, column = self.data_data_table_db_dict_query_data(data_data_table_db_dict)
 
         res_dict_list = self.execute_fetch("SELECT date_time, " + column + " FROM " + table +
                                            " WHERE " + id_column + " = %(data_id)s"
                                            " AND date_time >= %(begin_date)s AND date_time <= %(end_date)s",
-                                           data_data_table_db_dict.value_dict)
+                                           data_data_table_db_dict.value_dict, fetch_cursor=fetch_cursor)
         return res_dict_list
 
     ####################################################################################################################
@@ -278,7 +450,7 @@ class MySQLAM(MySQLBase):
     def read_security_subtypes(self):
         query = "SELECT ds.name, ds.db_table_meta, ds.db_data_table_prefix, ds.id FROM data_subtypes as ds " \
                 "INNER JOIN data_types as dt on dt.id = ds.type_id WHERE dt.name = 'Security' ORDER BY ds.name"
-        return self.execute_fetch(query)
+        return self._cached_fetch(("data_subtypes", "data_types"), query)
 
     def read_security_components(self, db_dict):
         return self.execute_fetch("SELECT sec_sec.sec_under_id AS securities_id, securities.ticker FROM securities "
@@ -688,32 +860,63 @@ class MySQLAM(MySQLBase):
         return prefix + "_" + midfix + "_" + freq, volume
 
     def read_price_frequency(self):
-        return self.execute_fetch("SELECT freq FROM price_freq")
+        return self._cached_fetch(("price_freq",), "SELECT freq FROM price_freq")
 
-    def read_sei_price(self, price_db_dict):
-        begin_time = price_db_dict.value_dict["begin_time"]
-        end_time = price_db_dict.value_dict["end_time"]
-        security_type = price_db_dict.value_dict["securities_type"]
-        table, volume = self.get_sei_table_volume(security_type, price_db_dict.value_dict["freq"])
+    def _sei_price_read_query(self, price_db_dict):
+        table, volume = self.get_sei_table_volume(price_db_dict.value_dict["securities_type"],
+                                                  price_db_dict.value_dict["freq"])
 
         if table is None or volume is None:
-            return []
+            return None
 
         query = "SELECT id, securities_id, date_time, open, high, low, close, adj_close" + volume + \
                 "FROM " + table + " WHERE securities_id = %(securities_id)s "
-        if begin_time is not None:
+        if price_db_dict.value_dict["begin_time"] is not None:
             query += "AND date_time >= %(begin_time)s "
-        if end_time is not None:
+        if price_db_dict.value_dict["end_time"] is not None:
             query += "AND date_time <= %(end_time)s "
         query += "ORDER BY date_time DESC"
 
-        dict_list = self.execute_fetch(query, price_db_dict.value_dict)
+        return query
+
+    # fetch_cursor: None to use self.fetch_cursor. FetchCursor.NUMPY_COLUMNS to return dict of column arrays (prices as
+    #   float64, date_time as datetime64) without the data keys list
+    def read_sei_price(self, price_db_dict, fetch_cursor=None):
+        query = self._sei_price_read_query(price_db_dict)
+
+        if query is None:
+            return []
+
+        if (self._fetch_cursor if fetch_cursor is None else fetch_cursor) == FetchCursor.NUMPY_COLUMNS:
+            return self.execute_fetch(query, price_db_dict.value_dict, fetch_cursor=FetchCursor.NUMPY_COLUMNS)
+
+        dict_list = self.execute_fetch(query, price_db_dict.value_dict, fetch_cursor=fetch_cursor)
         data_keys = ["date_time", "open", "high", "low", "close", "adj_close"]
-        if security_type not in ["Indices"]:
+        if price_db_dict.value_dict["securities_type"] not in ["Indices"]:
             data_keys.append("volume")
         dict_list.insert(0, data_keys)
         return dict_list
 
+    def read_sei_price_iter(self, price_db_dict, batch_size=None):
+        """ Read sei price rows in batches
+
+        Unlike read_sei_price(), the list of data keys is not included in the results
+
+        Args:
+            price_db_dict (DBDict): see sei_data_price_data_read_db_dict()
+            batch_size (Optional[int]): see MySQLBase.execute_fetch_iter()
+
+        Yields:
+            Union[list[dict], pd.DataFrame]: batch of rows ordered by date_time descending, depending on
+                self._fetch_cursor
+        """
+        query = self._sei_price_read_query(price_db_dict)
+
+        if query is None:
+            return
+
+        yield from self.execute_fetch_iter(query, price_db_dict.value_dict, batch_size=batch_size)
+
     def read_sei_data(self, data_db_dict):
         security_type = data_db_dict.value_dict["securities_type"]
 
@@ -745,18 +948,20 @@ class MySQLAM(MySQLBase):
     '''
     Special purpose function for "insert on duplicate key update" for possibly large amount of data
     Data common to all rows is passed as parameter instead of copied in each dict
+    Rows are sent chunk_size (default 1000) rows per statement. See MySQLBase.bulk_insert_or_update() for return value
     '''
     # TODO check for duplicate date_time
     # TODO check time intervals are appropriate. 1D and higher have database date types. Under 1D have datetime types
-    def insert_or_update_sei_price(self, dict_list, freq, securities_type, securities_id):
+    def insert_or_update_sei_price(self, dict_list, freq, securities_type, securities_id, chunk_size=None):
         table, volume = self.get_sei_table_volume(securities_type, freq)
-        vol_key = ")" if volume == " " else ", %(volume)s)"
 
-        return self.execute_commit(
-            "INSERT INTO " + table + " (securities_id, date_time, open, high, low, close, adj_close" + volume +
-            ") VALUES (" + str(securities_id) + ", %(date_time)s, %(open)s, %(high)s, %(low)s, %(close)s, %(adj_close)s"
-            + vol_key + " ON DUPLICATE KEY UPDATE open = %(open)s, high = %(high)s, low = %(low)s, close = %(close)s, "
-            "adj_close = %(adj_close)s", dict_list, execute_many=True)
+        fields = ["securities_id", "date_time", "open", "high", "low", "close", "adj_close"]
+        if volume != " ":
+            fields.append("volume")
+        rows = [[securities_id] + [d[f] for f in fields[1:]] for d in dict_list]
+
+        return self.bulk_insert_or_update(table, fields, rows, update_fields=["open", "high", "low", "close",
+                                                                              "adj_close"], chunk_size=chunk_size)
 
     def insert_sei_price(self, db_dict):
         freq = db_dict.value_dict["freq"]
@@ -798,6 +1003,87 @@ class MySQLAM(MySQLBase):
             "shares_outstanding = %(shares_outstanding)s, aum = %(aum)s WHERE id = %(id)s",
             DBDict.to_list_of_value_dict(db_dict_list), execute_many=True)
 
+    def read_sei_price_many(self, securities_type, freq, securities_id_list=None, begin_time=None, end_time=None,
+                            fields=("adj_close",)):
+        """ Read prices of many securities with one query
+
+        Args:
+            securities_type (str): "Stocks", "ETFs" or "Indices"
+            freq (str): price frequency (e.g. "1D")
+            securities_id_list (Optional[list[int]]): securities to read. Default None for all securities in the price
+                table
+            begin_time (Optional[Union[datetime.date, datetime.datetime]]): Default None for no lower limit
+            end_time (Optional[Union[datetime.date, datetime.datetime]]): Default None for no upper limit
+            fields (tuple[str]): price columns to read from open, high, low, close, adj_close and volume (not for
+                Indices). Default ("adj_close",)
+
+        Returns:
+            dict: FetchCursor.NUMPY_COLUMNS arrays for securities_id, date_time and each of fields, ordered by
+                securities_id then date_time ascending
+
+        Raises:
+            ValueError: if securities_type is not supported or a field is not a price column
+            MySQLException: if database read issue occurs
+        """
+        # checked first since get_sei_table_volume() raises IndexError for a securities type not in the database
+        if securities_type not in ["Stocks", "ETFs", "Indices"]:
+            raise ValueError("Securities type not supported: " + str(securities_type))
+        table, volume = self.get_sei_table_volume(securities_type, freq)
+
+        price_fields = ["open", "high", "low", "close", "adj_close"] + ([] if volume == " " else ["volume"])
+        bad_fields = [f for f in fields if f not in price_fields]
+        if len(bad_fields) > 0:
+            raise ValueError("Not price columns of " + table + ": " + str(bad_fields))
+
+        wheres = []
+        params = {"begin_time": begin_time, "end_time": end_time}
+        if securities_id_list is not None:
+            # one parameter per id. always false for an empty list
+            params.update({"sid" + str(i): sid for i, sid in enumerate(securities_id_list)})
+            wheres.append("securities_id IN (" + ", ".join(["%(sid" + str(i) + ")s" for i in
+                                                            range(len(securities_id_list))] + ["NULL"]) + ")")
+        if begin_time is not None:
+            wheres.append("date_time >= %(begin_time)s")
+        if end_time is not None:
+            wheres.append("date_time <= %(end_time)s")
+
+        query = "SELECT securities_id, date_time, " + ", ".join(fields) + " FROM " + table
+        if len(wheres) > 0:
+            query += " WHERE " + " AND ".join(wheres)
+        query += " ORDER BY securities_id, date_time"
+
+        return self.execute_fetch(query, params, fetch_cursor=FetchCursor.NUMPY_COLUMNS)
+
+    ####################################################################################################################
+    # Regression batch results
+    ####################################################################################################################
+    REGRESSION_BATCH_RESULTS_FIELDS = ["run_name", "securities_id", "regr_type", "run_time", "nobs", "rsquared",
+                                       "params", "bse", "tvalues", "summary", "fit_seconds", "error"]
+
+    def insert_or_update_regression_batch_results(self, dict_list, chunk_size=None):
+        """ Insert or update (same run_name and securities_id) regression batch results
+
+        Args:
+            dict_list (list[dict]): dicts with REGRESSION_BATCH_RESULTS_FIELDS keys. params, bse and tvalues are json
+                strings
+            chunk_size (Optional[int]): see MySQLBase.bulk_insert_or_update()
+
+        Returns:
+            list[dict]: see MySQLBase.bulk_insert_or_update()
+
+        Raises:
+            MySQLException: if database insert or update issue occurs
+        """
+        fields = self.REGRESSION_BATCH_RESULTS_FIELDS
+        rows = [[d[f] for f in fields] for d in dict_list]
+        return self.bulk_insert_or_update("regression_batch_results", fields, rows, update_fields=fields[2:],
+                                          chunk_size=chunk_size)
+
+    def read_regression_batch_results(self, run_name):
+        return self.execute_fetch("SELECT " + ", ".join(self.REGRESSION_BATCH_RESULTS_FIELDS) +
+                                  " FROM regression_batch_results WHERE run_name = %(run_name)s ORDER BY securities_id",
+                                  {"run_name": run_name})
+
     ####################################################################################################################
     # IEX Cloud
     ####################################################################################################################
@@ -816,6 +1102,22 @@ class MySQLAM(MySQLBase):
         return self.execute_commit("UPDATE iex_api_tokens SET token = %(token)s WHERE type = %(type)s AND env = %(env)s",
                                    DBDict.to_list_of_value_dict(db_dict_list), execute_many=True)
 
+    @staticmethod
+    def iex_price_sync_db_dict(data_list=None, reject_lol=None):
+        return DBDict(key_list=["securities_id", "freq", "last_date_time", "last_sync"], data_list=data_list,
+                      reject_lol=reject_lol)
+
+    # high-water marks of DataProvider.IEXCloudSync.SEIPriceSync
+    def read_iex_price_sync(self, freq):
+        return self.execute_fetch("SELECT securities_id, freq, last_date_time, last_sync FROM iex_price_sync "
+                                  "WHERE freq = %(freq)s", {"freq": freq})
+
+    # dict_list: dicts with iex_price_sync_db_dict() keys. See MySQLBase.bulk_insert_or_update() for return value
+    def insert_or_update_iex_price_sync(self, dict_list):
+        fields = ["securities_id", "freq", "last_date_time", "last_sync"]
+        return self.bulk_insert_or_update("iex_price_sync", fields, [[d[f] for f in fields] for d in dict_list],
+                                          update_fields=["last_date_time", "last_sync"])
+
     '''
         major_endpoints; ["Stock", "Corporate Actions", "Market Info", "Treasuries", "Commodities", "Economic Data",
          "Reference Data"] 
@@ -858,7 +1160,7 @@ class MySQLAM(MySQLBase):
         qw = QueryWriter("real_estate", fields=fields, wheres=wheres, order_bys=order_bys)
         query, params = qw.write_read_query()
 
-        dict_list = self.execute_fetch(query, params=params)
+        dict_list = self.execute_fetch(query, params=params, prepared=True)
 
         return [RealEstate(None, None, None, None, None, None, db_dict=d) for d in dict_list]
 
@@ -877,7 +1179,7 @@ class MySQLAM(MySQLBase):
         qw = QueryWriter("service_provider", fields=fields, wheres=wheres, order_bys=order_bys)
         query, params = qw.write_read_query()
 
-        dict_list = self.execute_fetch(query, params=params)
+        dict_list = self.execute_fetch(query, params=params, prepared=True)
 
         return [ServiceProvider(None, None, db_dict=d) for d in dict_list]
 
@@ -896,7 +1198,7 @@ class MySQLAM(MySQLBase):
         qw = QueryWriter("real_property_values", wheres=wheres, order_bys=order_bys)
         query, params = qw.write_read_query()
 
-        dict_list = self.execute_fetch(query, params=params)
+        dict_list = self.execute_fetch(query, params=params, prepared=True)
         dict_list = self._help_read_fk(dict_list)
 
         data_list = []
@@ -905,6 +1207,81 @@ class MySQLAM(MySQLBase):
 
         return data_list
 
+    def real_estate_map(self, required_ids=()):
+        """ All real estate from MySQLAM.identity_map. real_estate table is read only if not already mapped
+
+        Args:
+            required_ids (Iterable[int]): read the table again if any of these ids are not mapped. Default ()
+
+        Returns:
+            dict: int real estate id keys to RealEstate values. instances are shared and must not be changed
+        """
+        return MySQLAM.identity_map.get_table("real_estate", self.real_estate_read, required_ids=required_ids)
+
+    def service_provider_map(self, required_ids=()):
+        """ All service providers from MySQLAM.identity_map. service_provider table is read only if not already mapped
+
+        Args:
+            required_ids (Iterable[int]): read the table again if any of these ids are not mapped. Default ()
+
+        Returns:
+            dict: int service provider id keys to ServiceProvider values. instances are shared and must not be changed
+        """
+        return MySQLAM.identity_map.get_table("service_provider", self.service_provider_read,
+                                              required_ids=required_ids)
+
+    def real_property_values_map(self, required_ids=()):
+        """ All real property values from MySQLAM.identity_map. real_property_values table is read only if not already
+        mapped
+
+        Args:
+            required_ids (Iterable[int]): read the table again if any of these ids are not mapped. Default ()
+
+        Returns:
+            dict: int real property values id keys to RealPropertyValues values. instances are shared and must not be
+                changed
+        """
+        return MySQLAM.identity_map.get_table("real_property_values", self.real_property_values_read,
+                                              required_ids=required_ids)
+
+    def real_estate_by_address(self, address):
+        """ Get real estate by address from MySQLAM.identity_map
+
+        Args:
+            address (Address): address of the real estate
+
+        Returns:
+            Optional[RealEstate]: if a real estate record matches address, else None
+        """
+        for real_estate in self.real_estate_map().values():
+            if real_estate.address == address:
+                return real_estate
+        return None
+
+    def service_provider_by_enum(self, provider):
+        """ Get service provider by provider from MySQLAM.identity_map
+
+        Args:
+            provider (ServiceProviderEnum): provider of the service provider
+
+        Returns:
+            Optional[ServiceProvider]: if a service provider record matches provider, else None
+        """
+        for service_provider in self.service_provider_map().values():
+            if service_provider.provider == provider:
+                return service_provider
+        return None
+
+    @staticmethod
+    def invalidate_identity_map(*tables):
+        """ Remove tables from MySQLAM.identity_map. Call after writing to real_estate, service_provider or
+        real_property_values
+
+        Args:
+            *tables (str): tables to remove. no tables to remove all tables
+        """
+        MySQLAM.identity_map.invalidate(*tables)
+
     def mysunpower_hourly_data_read(self, distinct=False, wheres=(), order_bys=()):
         """ Read from mysunpower_hourly_data table
 
@@ -919,22 +1296,148 @@ class MySQLAM(MySQLBase):
 
         return self.execute_fetch(query, params=params)
 
-    def mysunpower_hourly_data_insert(self, data_list):
-        """ Insert into mysunpower_hourly_data table
+    def mysunpower_hourly_data_read_iter(self, distinct=False, wheres=(), order_bys=(), batch_size=None):
+        """ Read from mysunpower_hourly_data table in batches
 
         Args:
-            data_list (list[dict]): each dict in the list must have the same keys
+            see QueryWriter and MySQLBase.execute_fetch_iter()
+
+        Yields:
+            Union[list[dict], pd.DataFrame]: batch of rows depending on self._fetch_cursor. all fields as keys or columns
+        """
+        qw = QueryWriter("mysunpower_hourly_data", distinct=distinct, wheres=wheres, order_bys=order_bys)
+        query, params = qw.write_read_query()
+
+        yield from self.execute_fetch_iter(query, params=params, batch_size=batch_size)
+
+    def mysunpower_hourly_data_insert(self, data_list, continue_on_error=False):
+        """ Insert into mysunpower_hourly_data table and refresh the rollup tables
+
+        Rows are inserted in chunks with one commit per chunk. See MySQLBase.bulk_insert()
+        mysunpower_daily_data and mysunpower_monthly_data are refreshed (mysunpower_rollup_refresh()) for the dates in
+        data_list after the insert, also if the insert fails, since chunks committed before a failed chunk remain in
+        the table. If the insert fails, a refresh error is logged and the insert error is raised
+
+        Args:
+            data_list (list[dict]): each dict in the list must have the same keys, including dt (datetime.datetime)
+            continue_on_error (boolean): True to skip chunks that fail and continue. Default False to raise on the
+                first failed chunk (earlier chunks remain committed)
+
+        Returns:
+            dict: see MySQLBase.bulk_insert()
 
         Raises:
-            MySQLException: if data_list element dicts do not all have the same keys, or other issue occurs
+            ValueError: if data_list element dicts do not all have the same keys
+            MySQLException: if a chunk fails and continue_on_error is False, or other issue occurs, or issue with
+                rollup refresh after a successful insert
         """
-        if len(data_list) == 0:
-            return
+        try:
+            report = self.bulk_insert("mysunpower_hourly_data", data_list, continue_on_error=continue_on_error)
+        except MySQLException:
+            try:
+                self._mysunpower_rollup_refresh_data(data_list)
+            except MySQLException:
+                self.logger.exception("Rollup refresh after failed mysunpower hourly data insert exception: ")
+            raise
+
+        self._mysunpower_rollup_refresh_data(data_list)
+        return report
+
+    def _mysunpower_rollup_refresh_data(self, data_list):
+        if len(data_list) > 0:
+            dt_list = [d["dt"] for d in data_list]
+            self.mysunpower_rollup_refresh(min(dt_list).date(), max(dt_list).date())
+
+    def mysunpower_hourly_data_totals(self, start_date, end_date):
+        """ Total solar kwh, home kwh and hourly row count between dates summed on the server from
+        mysunpower_hourly_data
+
+        Args:
+            start_date (datetime.date): first date (inclusive)
+            end_date (datetime.date): last date (inclusive)
+
+        Returns:
+            dict: keys solar_kwh (Decimal), home_kwh (Decimal) and hours (int)
+        """
+        params = {"start_date": start_date, "end_dt": datetime.datetime.combine(end_date, datetime.time(23, 59, 59))}
+        res = self.execute_fetch("SELECT SUM(solar_kwh) AS solar_kwh, SUM(home_kwh) AS home_kwh, COUNT(*) AS hours "
+                                 "FROM mysunpower_hourly_data WHERE dt >= %(start_date)s AND dt <= %(end_dt)s", params,
+                                 fetch_cursor=FetchCursor.LIST_DICT)[0]
+        return {"solar_kwh": Decimal(0) if res["solar_kwh"] is None else res["solar_kwh"],
+                "home_kwh": Decimal(0) if res["home_kwh"] is None else res["home_kwh"], "hours": int(res["hours"])}
+
+    @staticmethod
+    def _first_of_next_month(date):
+        return (date.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
 
-        qw = QueryWriter("mysunpower_hourly_data", fields=list(data_list[0].keys()))
-        query, data_list = qw.write_insert_query(data_list)
+    def mysunpower_rollup_refresh(self, start_date=None, end_date=None):
+        """ Recompute mysunpower_daily_data and mysunpower_monthly_data rows from mysunpower_hourly_data
 
-        self.execute_commit(query, params_list=data_list, execute_many=True)
+        Daily rows for every date between the dates are recomputed from hourly rows and monthly rows for every month
+        touching the dates are recomputed from daily rows. Dates without hourly rows are removed. Recomputing from the
+        source tables makes the refresh safe to repeat, e.g. after a partially committed bulk insert. Executed in one
+        transaction.
+
+        Args:
+            start_date (Optional[datetime.date]): first date to refresh (inclusive). Default None for all dates
+            end_date (Optional[datetime.date]): last date to refresh (inclusive). Default None for all dates
+
+        Raises:
+            MySQLException: if database issue occurs
+        """
+        if start_date is None or end_date is None:
+            # mysql date range
+            start_date, end_date = datetime.date(1000, 1, 1), datetime.date(9998, 12, 31)
+        month_start = start_date.replace(day=1)
+        month_end = self._first_of_next_month(end_date)
+        end_dt = datetime.datetime.combine(end_date, datetime.time(23, 59, 59))
+        params = {"start_date": start_date, "end_date": end_date, "end_dt": end_dt, "month_start": month_start,
+                  "month_end": month_end}
+
+        query_list = [
+            "DELETE FROM mysunpower_daily_data WHERE date >= %(start_date)s AND date <= %(end_date)s",
+            "INSERT INTO mysunpower_daily_data (date, solar_kwh, home_kwh, hours) "
+            "SELECT DATE(dt), SUM(solar_kwh), SUM(home_kwh), COUNT(*) FROM mysunpower_hourly_data "
+            "WHERE dt >= %(start_date)s AND dt <= %(end_dt)s GROUP BY DATE(dt)",
+            "DELETE FROM mysunpower_monthly_data WHERE month >= %(month_start)s AND month < %(month_end)s",
+            "INSERT INTO mysunpower_monthly_data (month, solar_kwh, home_kwh, hours) "
+            "SELECT DATE_SUB(date, INTERVAL DAYOFMONTH(date) - 1 DAY), SUM(solar_kwh), SUM(home_kwh), SUM(hours) "
+            "FROM mysunpower_daily_data WHERE date >= %(month_start)s AND date < %(month_end)s "
+            "GROUP BY DATE_SUB(date, INTERVAL DAYOFMONTH(date) - 1 DAY)"]
+        self.execute_commit(query_list, [params] * len(query_list))
+
+    def mysunpower_rollup_totals(self, start_date, end_date):
+        """ Total solar kwh, home kwh and hourly row count between dates from the rollup tables
+
+        Months entirely between the dates are read from mysunpower_monthly_data and the remaining dates from
+        mysunpower_daily_data, so a multi-year period reads at most about 60 daily rows plus one row per month.
+
+        Args:
+            start_date (datetime.date): first date (inclusive)
+            end_date (datetime.date): last date (inclusive)
+
+        Returns:
+            dict: keys solar_kwh (Decimal), home_kwh (Decimal) and hours (int)
+        """
+        # first day of the first month and of the month after the last month entirely between the dates
+        full_start = start_date if start_date.day == 1 else self._first_of_next_month(start_date)
+        full_end = max(full_start, (end_date + datetime.timedelta(days=1)).replace(day=1))
+
+        params = {"start_date": start_date, "end_date": end_date, "full_start": full_start, "full_end": full_end}
+        res_dict_list = self.execute_fetch(
+            "SELECT SUM(solar_kwh) AS solar_kwh, SUM(home_kwh) AS home_kwh, SUM(hours) AS hours FROM ("
+            "SELECT solar_kwh, home_kwh, hours FROM mysunpower_monthly_data "
+            "WHERE month >= %(full_start)s AND month < %(full_end)s "
+            "UNION ALL "
+            "SELECT solar_kwh, home_kwh, hours FROM mysunpower_daily_data "
+            "WHERE date >= %(start_date)s AND date <= %(end_date)s "
+            "AND (date < %(full_start)s OR date >= %(full_end)s)) AS totals", params,
+            fetch_cursor=FetchCursor.LIST_DICT)
+
+        res = res_dict_list[0]
+        return {"solar_kwh": Decimal(0) if res["solar_kwh"] is None else res["solar_kwh"],
+                "home_kwh": Decimal(0) if res["home_kwh"] is None else res["home_kwh"],
+                "hours": 0 if res["hours"] is None else int(res["hours"])}
 
     def _help_read_fk(self, dict_list):
         """ Use this function to get foreign key table data
@@ -956,19 +1459,15 @@ class MySQLAM(MySQLBase):
         has_service_provider = "service_provider_id" in dict_list[0]
         has_real_property_values = "real_property_values_id" in dict_list[0]
 
+        # foreign key tables are small and almost static. resolve them from the identity map instead of reading them
         re_dict, sp_dict, rpv_dict = {}, {}, {}
         if has_real_estate:
-            re_dict = self.real_estate_read(
-                wheres=[["id", "in", list(set([d["real_estate_id"] for d in dict_list]))]])
-            re_dict = {real_estate.id: real_estate for real_estate in re_dict}
+            re_dict = self.real_estate_map(required_ids=set([d["real_estate_id"] for d in dict_list]))
         if has_service_provider:
-            sp_dict = self.service_provider_read(
-                wheres=[["id", "in", list(set([d["service_provider_id"] for d in dict_list]))]])
-            sp_dict = {service_provider.id: service_provider for service_provider in sp_dict}
+            sp_dict = self.service_provider_map(required_ids=set([d["service_provider_id"] for d in dict_list]))
         if has_real_property_values:
-            rpv_dict = self.real_property_values_read(
-                wheres=[["id", "in", list(set([d["real_property_values_id"] for d in dict_list]))]])
-            rpv_dict = {real_property_values.id: real_property_values for real_property_values in rpv_dict}
+            rpv_dict = self.real_property_values_map(
+                required_ids=set([d["real_property_values_id"] for d in dict_list]))
 
         if has_real_estate or has_service_provider or has_real_property_values:
             for d in dict_list:
@@ -996,7 +1495,7 @@ class MySQLAM(MySQLBase):
         qw = QueryWriter("solar_bill_data", wheres=wheres, order_bys=order_bys)
         query, params = qw.write_read_query()
 
-        dict_list = self.execute_fetch(query, params=params)
+        dict_list = self.execute_fetch(query, params=params, prepared=True)
         dict_list = self._help_read_fk(dict_list)
 
         bill_list = []
@@ -1058,7 +1557,7 @@ class MySQLAM(MySQLBase):
         qw = QueryWriter("electric_bill_data", wheres=wheres, order_bys=order_bys)
         query, params = qw.write_read_query()
 
-        dict_list = self.execute_fetch(query, params=params)
+        dict_list = self.execute_fetch(query, params=params, prepared=True)
         dict_list = self._help_read_fk(dict_list)
 
         bill_list = []
@@ -1120,7 +1619,7 @@ class MySQLAM(MySQLBase):
         qw = QueryWriter("electric_data", wheres=wheres, order_bys=order_bys)
         query, params = qw.write_read_query()
 
-        dict_list = self.execute_fetch(query, params=params)
+        dict_list = self.execute_fetch(query, params=params, prepared=True)
         dict_list = self._help_read_fk(dict_list)
 
         data_list = []
@@ -1155,7 +1654,7 @@ class MySQLAM(MySQLBase):
         qw = QueryWriter("estimate_notes", wheres=wheres, order_bys=order_bys)
         query, params = qw.write_read_query()
 
-        notes_list = self.execute_fetch(query, params=params)
+        notes_list = self.execute_fetch(query, params=params, prepared=True)
         notes_list = self._help_read_fk(notes_list)
 
         return notes_list
@@ -1175,7 +1674,7 @@ class MySQLAM(MySQLBase):
         qw = QueryWriter("natgas_bill_data", wheres=wheres, order_bys=order_bys)
         query, params = qw.write_read_query()
 
-        dict_list = self.execute_fetch(query, params=params)
+        dict_list = self.execute_fetch(query, params=params, prepared=True)
         dict_list = self._help_read_fk(dict_list)
 
         bill_list = []
@@ -1237,7 +1736,7 @@ class MySQLAM(MySQLBase):
         qw = QueryWriter("natgas_data", wheres=wheres, order_bys=order_bys)
         query, params = qw.write_read_query()
 
-        dict_list = self.execute_fetch(query, params=params)
+        dict_list = self.execute_fetch(query, params=params, prepared=True)
         dict_list = self._help_read_fk(dict_list)
 
         data_list = []
@@ -1309,7 +1808,7 @@ class MySQLAM(MySQLBase):
         qw = QueryWriter("simple_bill_data", wheres=wheres, order_bys=order_bys)
         query, params = qw.write_read_query()
 
-        dict_list = self.execute_fetch(query, params=params)
+        dict_list = self.execute_fetch(query, params=params, prepared=True)
         dict_list = self._help_read_fk(dict_list)
 
         bill_list = []
@@ -1370,7 +1869,7 @@ class MySQLAM(MySQLBase):
         qw = QueryWriter("mortgage_bill_data", wheres=wheres, order_bys=order_bys)
         query, params = qw.write_read_query()
 
-        dict_list = self.execute_fetch(query, params=params)
+        dict_list = self.execute_fetch(query, params=params, prepared=True)
         dict_list = self._help_read_fk(dict_list)
 
         bill_list = []
@@ -1432,7 +1931,7 @@ class MySQLAM(MySQLBase):
         qw = QueryWriter("depreciation_bill_data", wheres=wheres, order_bys=order_bys)
         query, params = qw.write_read_query()
 
-        dict_list = self.execute_fetch(query, params=params)
+        dict_list = self.execute_fetch(query, params=params, prepared=True)
         dict_list = self._help_read_fk(dict_list)
 
         bill_list = []
@@ -1442,4 +1941,27 @@ class MySQLAM(MySQLBase):
             bill_list.append(DepreciationBillData(None, None, None, datetime.date(2020, 1, 1),
                                                   datetime.date(2020, 12, 31), Decimal(0), None, db_dict=d))
 
-        return bill_list
\ No newline at end of file
+        return bill_list
+
+    def depreciation_bill_data_sum_by_rpv(self, real_estate_id, paid_date_before):
+        """ Sum total_cost of depreciation bills by real property value with one grouped query
+
+        Args:
+            real_estate_id (int): bills for this real estate
+            paid_date_before (datetime.date): bills paid before (not including) this date
+
+        Returns:
+            dict: int real_property_values_id keys and Decimal summed total_cost values. real property values without
+                bills are not included
+
+        Raises:
+            MySQLException: if database read issue occurs
+        """
+        dict_list = self.execute_fetch(
+            "SELECT real_property_values_id, SUM(total_cost) AS total_cost FROM depreciation_bill_data "
+            "WHERE real_estate_id = %(real_estate_id)s AND paid_date < %(paid_date_before)s "
+            "GROUP BY real_property_values_id",
+            {"real_estate_id": real_estate_id, "paid_date_before": paid_date_before},
+            fetch_cursor=FetchCursor.LIST_DICT)
+
+        return {d["real_property_values_id"]: d["total_cost"] for d in dict_list}
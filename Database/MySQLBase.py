@@ -1,6 +1,8 @@
 """Module for base class for MySQL database connections. """
 import mysql.connector
+import time
 import traceback
+import numpy as np
 import pandas as pd
 from abc import ABC, abstractmethod
 from typing import Optional, Union
@@ -8,6 +10,7 @@ from enum import Enum
 from Logging.Logger import Logger
 from Database.MySQLException import MySQLException
 from Database.QueryWriter import QueryWriter
+from Database.MySQLPool import get_pool
 
 
 class DictInsertable(ABC):
@@ -35,10 +38,14 @@ class FetchCursor(Enum):
     PD_DF: use pd.read_sql(). data returned as a pd.DataFrame. Empty dataframe will have column headers.
     LIST_DICT: return data as list(dict), directly from dictionary cursor. No data returns empty list.
     LIST_LIST: return data as list(list), directly from cursor. No data returns empty list.
+    NUMPY_COLUMNS: return data as dict of column name keys to typed np.ndarray values, filled column by column without
+        creating a dict per row. No data returns dict of empty arrays. See MySQLBase.fetch_numpy_columns() for types.
+        pd.DataFrame(data, copy=False) wraps the arrays without copying them.
     """
     PD_DF = "pandas_dataframe"
     LIST_DICT = "list_dict"
     LIST_LIST = "list_list"
+    NUMPY_COLUMNS = "numpy_columns"
 
 
 class MySQLBase(ABC):
@@ -48,6 +55,10 @@ class MySQLBase(ABC):
     creates a default cursor and a dictionary cursor. This class and subclasses can be instantiated as part of a
     context manager (i.e. with).
 
+    If use_pool is True, the database connection is borrowed from the process wide MySQLConnectionPool for the
+    connection parameters and given back to the pool by db_close() (called by __exit__) instead of being closed. A
+    pooled instance that is used again after db_close() borrows a connection again.
+
     Attributes:
         host (str): database host url.
         user (str): database user name.
@@ -58,9 +69,16 @@ class MySQLBase(ABC):
         logger (Logger.logger instance):.
         cursor (mysql.connector.CMySQLCursor): rows returned as list.
         dict_cursor (mysql.connector.CMySQLCursor): rows returned as dictionary.
+        _pool (Optional[MySQLConnectionPool]): pool connections are borrowed from. None if use_pool is False
+        prepared_hits (int): class attribute. number of execute_fetch(prepared=True) calls that reused a prepared cursor
+        prepared_misses (int): class attribute. number of execute_fetch(prepared=True) calls that created a prepared
+            cursor
     """
+    PREPARED_CURSORS_MAX_SIZE = 64
+    prepared_hits = 0
+    prepared_misses = 0
 
-    def __init__(self, host, user, password, db_name, fetch_cursor, ssl_ca_path=None):
+    def __init__(self, host, user, password, db_name, fetch_cursor, ssl_ca_path=None, use_pool=False):
         """Init MySQLBase. Create mysql database connection, cursor and dictionary cursor.
 
         Args:
@@ -70,6 +88,8 @@ class MySQLBase(ABC):
             db_name (str): database name.
             fetch_cursor (FetchCursor): how data loaded from tables is returned
             ssl_ca_path (Optional[str]): full path to ssl certificate authority file. Default None for no certificate
+            use_pool (boolean): True to borrow the connection from the process wide connection pool. Default False to
+                open and close a dedicated connection
 
         Raises:
             MySQLException: database connection or cursor creation error is logged then raised as MySQLException with
@@ -84,9 +104,11 @@ class MySQLBase(ABC):
 
         self.logger = Logger(self.__class__.__name__).logger
 
+        self._pool = get_pool(host, user, password, db_name, ssl_ca_path=ssl_ca_path) if use_pool else None
         self._DB = None
         self.cursor = None
         self.dict_cursor = None
+        self._max_allowed_packet = None
 
         self._db_initialize()
 
@@ -121,7 +143,19 @@ class MySQLBase(ABC):
                 MySQLException with is_logged=True
         """
         create_cursor = False
-        if self._DB is None or not self._DB.is_connected():
+        if self._pool is not None:
+            if self._DB is not None and not self._DB.is_connected():
+                # pool discards the disconnected connection
+                self._pool.give_back(self._DB)
+                self._DB = None
+            if self._DB is None:
+                try:
+                    self._DB = self._pool.borrow()
+                    create_cursor = True
+                except MySQLException as err:
+                    self.logger.exception("DB pool borrow exception")
+                    raise MySQLException(str(err) + " See log for full trace.") from err
+        elif self._DB is None or not self._DB.is_connected():
             try:
                 self._DB = mysql.connector.connect(host=self.host, user=self.user, passwd=self.password,
                                                    database=self.db_name, ssl_ca=self.ssl_ca_path,
@@ -183,7 +217,8 @@ class MySQLBase(ABC):
     def db_close(self):
         """Close cursor and dict_cursor and mysql database connection.
 
-        Close cursors then close database connection.
+        Close cursors then close database connection. If the connection is pooled, it is given back to the pool instead
+        of being closed.
         DB must be connected to close cursors. This usually isn't a problem, but calling this function from __del__
         causes an exception.
 
@@ -191,6 +226,23 @@ class MySQLBase(ABC):
             MySQLException: cursor or database close error is logged then raised as MySQLException with
                 is_logged=True.
         """
+        if self._pool is not None:
+            if self._DB is None:
+                return
+            try:
+                if self.cursor is not None:
+                    self.cursor.close()
+                if self.dict_cursor is not None:
+                    self.dict_cursor.close()
+            except mysql.connector.Error:
+                self.logger.exception("Pooled cursor close exception")
+            finally:
+                self._pool.give_back(self._DB)
+                self._DB = None
+                self.cursor = None
+                self.dict_cursor = None
+            return
+
         try:
             if self._DB is not None and self._DB.is_connected():
                 if self.cursor is not None:
@@ -203,27 +255,152 @@ class MySQLBase(ABC):
             self.logger.exception("DB and cursor close exception")
             raise MySQLException(str(err) + " See log for full trace.") from err
 
-    def execute_fetch(self, query, params=None, cursor=None):
+    @staticmethod
+    def fetch_numpy_columns(cursor, decimal_exact=False, batch_size=10000):
+        """ Fetch all rows of an executed query into one typed np.ndarray per column
+
+        Arrays are allocated once with the cursor row count and filled with column slices of each fetchmany() batch.
+        Column types are mapped from the cursor description:
+            DATE: datetime64[D]. DATETIME, TIMESTAMP: datetime64[us]. NULL values are NaT
+            DECIMAL: float64, or object (decimal.Decimal) if decimal_exact is True. NULL values are NaN or None
+            FLOAT, DOUBLE: float64. NULL values are NaN
+            integer types: int64 if the column is not nullable, else float64 with NULL values as NaN
+            all other types: object
+
+        Args:
+            cursor (mysql.connector.CMySQLCursor): buffered tuple cursor with an executed query
+            decimal_exact (boolean): True to keep DECIMAL values as decimal.Decimal. Default False for float64
+            batch_size (int): number of rows per fetchmany() call. Default 10000
+
+        Returns:
+            dict: column name keys to np.ndarray values in query column order
+        """
+        ft = mysql.connector.FieldType
+        int_types = (ft.TINY, ft.SHORT, ft.INT24, ft.LONG, ft.LONGLONG, ft.YEAR)
+        dec_types = (ft.DECIMAL, ft.NEWDECIMAL)
+
+        n = max(cursor.rowcount, 0)
+        names = list(cursor.column_names)
+        arrays = []
+        for desc in cursor.description:
+            type_code, null_ok = desc[1], desc[6]
+            if type_code in (ft.DATE, ft.NEWDATE):
+                dtype = "datetime64[D]"
+            elif type_code in (ft.DATETIME, ft.TIMESTAMP):
+                dtype = "datetime64[us]"
+            elif type_code in dec_types:
+                dtype = object if decimal_exact else np.float64
+            elif type_code in (ft.FLOAT, ft.DOUBLE):
+                dtype = np.float64
+            elif type_code in int_types:
+                dtype = np.float64 if null_ok else np.int64
+            else:
+                dtype = object
+            arrays.append(np.empty(n, dtype=dtype))
+
+        pos = 0
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if len(rows) == 0:
+                break
+            end = pos + len(rows)
+            if end > len(arrays[0]):
+                # row count not known ahead of the fetch (e.g. unbuffered cursor). grow arrays
+                arrays = [np.concatenate([arr, np.empty(max(end, 2 * len(arr)) - len(arr), dtype=arr.dtype)])
+                          for arr in arrays]
+            for arr, col in zip(arrays, zip(*rows)):
+                if arr.dtype == np.float64:
+                    arr[pos:end] = [np.nan if x is None else x for x in col]
+                else:
+                    arr[pos:end] = col
+            pos = end
+
+        return {name: arr[:pos] for name, arr in zip(names, arrays)}
+
+    def _prepared_cursor(self, query, dictionary):
+        """ Get the prepared cursor for query on the current connection, creating it if necessary
+
+        Prepared cursors are kept on the connection object, so they are reused for as long as the connection is open
+        (including across pooled MySQLBase instances). A prepared cursor only reuses its server side statement if it
+        executes the same str object again, which QueryWriter.write_read_query() provides for repeated query shapes.
+
+        Args:
+            query (str): SQL query with %s placeholders
+            dictionary (boolean): True for rows returned as dict
+
+        Returns:
+            mysql.connector.CMySQLCursorPrepared:
+        """
+        stmt_cursors = getattr(self._DB, "_prepared_cursors", None)
+        if stmt_cursors is None:
+            stmt_cursors = {}
+            setattr(self._DB, "_prepared_cursors", stmt_cursors)
+
+        key = (query, dictionary)
+        stmt_cursor = stmt_cursors.get(key, None)
+        if stmt_cursor is not None:
+            MySQLBase.prepared_hits += 1
+            return stmt_cursor
+
+        MySQLBase.prepared_misses += 1
+        if len(stmt_cursors) >= MySQLBase.PREPARED_CURSORS_MAX_SIZE:
+            # close the oldest prepared statement on this connection
+            old_key = next(iter(stmt_cursors))
+            stmt_cursors.pop(old_key).close()
+        stmt_cursor = self._DB.cursor(prepared=True, dictionary=dictionary)
+        stmt_cursors[key] = stmt_cursor
+        return stmt_cursor
+
+    @staticmethod
+    def prepared_statement_stats():
+        """ Prepared cursor counters for this process
+
+        Returns:
+            dict: keys hits (prepared cursor reused) and misses (prepared cursor created)
+        """
+        return {"hits": MySQLBase.prepared_hits, "misses": MySQLBase.prepared_misses}
+
+    def execute_fetch(self, query, params=None, cursor=None, fetch_cursor=None, decimal_exact=False, prepared=False):
         """Execute read query and return query results
 
         Args:
             query (str): SQL query.
             params (Optional[tuple, dict]): query parameters. Default None.
             cursor (Optional[boolean]): None to use self.dict_cursor. Any other value to use self.cursor. Default None.
+            fetch_cursor (Optional[FetchCursor]): how data is returned for this query only. Default None for
+                self._fetch_cursor
+            decimal_exact (boolean): FetchCursor.NUMPY_COLUMNS only. See fetch_numpy_columns(). Default False
+            prepared (boolean): FetchCursor.LIST_DICT and FetchCursor.LIST_LIST only. True to execute query with a
+                cached prepared cursor. query must use %s placeholders and params must be a tuple. Default False
 
         Returns:
-            Union[list[list], list[dict], pd.DataFrame]: Results of the query and fetch depending on self._fetch_cursor
+            Union[list[list], list[dict], pd.DataFrame, dict]: Results of the query and fetch depending on
+                self._fetch_cursor or fetch_cursor
 
         Raises:
             MySQLException: cursor execute mysql.connector.Error is logged then raised as MySQLException with
                 is_logged=True
         """
+        if fetch_cursor is None:
+            fetch_cursor = self._fetch_cursor
+
         # check db connection and cursor creation and recreate if not connected or created
         self._db_initialize()
 
         try:
-            if self._fetch_cursor == FetchCursor.PD_DF:
+            if fetch_cursor == FetchCursor.PD_DF:
                 df_or_list = pd.read_sql(query, self._DB, params=params)
+            elif fetch_cursor == FetchCursor.NUMPY_COLUMNS:
+                np_cursor = self._DB.cursor(buffered=True)
+                try:
+                    np_cursor.execute(query, params)
+                    df_or_list = self.fetch_numpy_columns(np_cursor, decimal_exact=decimal_exact)
+                finally:
+                    np_cursor.close()
+            elif prepared:  # FetchCursor.LIST_DICT or FetchCursor.LIST_LIST
+                stmt_cursor = self._prepared_cursor(query, cursor is None)
+                stmt_cursor.execute(query, params)
+                df_or_list = stmt_cursor.fetchall()
             else:  # FetchCursor.LIST_DICT or FetchCursor.LIST_LIST
                 cursor = self.dict_cursor if cursor is None else self.cursor
                 cursor.execute(query, params)
@@ -234,6 +411,56 @@ class MySQLBase(ABC):
 
         return df_or_list
 
+    def execute_fetch_iter(self, query, params=None, batch_size=None, cursor=None):
+        """Execute read query and yield query results in batches
+
+        Rows are read from the server with an unbuffered cursor and fetchmany(batch_size), so at most batch_size rows
+        are held in memory at a time. The connection can't be used for other queries until the generator is exhausted
+        or closed.
+
+        Args:
+            query (str): SQL query.
+            params (Optional[tuple, dict]): query parameters. Default None.
+            batch_size (Optional[int]): maximum number of rows per batch. Default None for 10000
+            cursor (Optional[boolean]): None to return rows as dict. Any other value to return rows as list. Only used
+                if self._fetch_cursor is not FetchCursor.PD_DF. Default None.
+
+        Yields:
+            Union[list[list], list[dict], pd.DataFrame]: batch of rows depending on self._fetch_cursor. pd.DataFrame
+                batches have the query column names as columns. No data yields nothing
+
+        Raises:
+            MySQLException: cursor execute or fetch mysql.connector.Error is logged then raised as MySQLException with
+                is_logged=True
+        """
+        if batch_size is None:
+            batch_size = 10000
+
+        # check db connection and cursor creation and recreate if not connected or created
+        self._db_initialize()
+
+        as_df = self._fetch_cursor == FetchCursor.PD_DF
+        stream_cursor = None
+        try:
+            stream_cursor = self._DB.cursor(buffered=False, dictionary=(cursor is None and not as_df))
+            stream_cursor.execute(query, params)
+            while True:
+                rows = stream_cursor.fetchmany(batch_size)
+                if len(rows) == 0:
+                    break
+                yield pd.DataFrame(rows, columns=stream_cursor.column_names) if as_df else rows
+        except mysql.connector.Error as err:
+            self.logger.exception("Execute fetch iter exception")
+            raise MySQLException(str(err) + " See log for full trace.") from err
+        finally:
+            if stream_cursor is not None:
+                try:
+                    # unread rows must be consumed before the connection can be used again
+                    self._DB.consume_results()
+                    stream_cursor.close()
+                except mysql.connector.Error:
+                    self.logger.exception("Stream cursor close exception")
+
     def execute_commit(self, query_list, params_list, execute_many: bool = False):
         """Execute one or more insert, update and/or delete then commit.
 
@@ -277,6 +504,164 @@ class MySQLBase(ABC):
             self.logger.exception("Execute commit exception: ")
             self.db_rollback(err1)
 
+    def bulk_insert_or_update(self, table, fields, rows, update_fields=None, chunk_size=None):
+        """ Insert or update (on duplicate key) rows with multi-row VALUES statements
+
+        Rows are split into chunks of chunk_size rows. Each chunk is sent as one 'INSERT ... VALUES (...), (...), ...
+        ON DUPLICATE KEY UPDATE ...' statement instead of one statement per row. All chunks are committed together
+        after the last chunk executes.
+
+        Args:
+            table (str): table to insert into or update
+            fields (list[str]): insert columns
+            rows (list[list]): each list has one value per field in the same order as fields
+            update_fields (Optional[list[str]]): columns set on duplicate key. Default None for fields
+            chunk_size (Optional[int]): maximum number of rows per statement. Default None for 1000
+
+        Returns:
+            list[dict]: one dict per chunk with keys chunk (int chunk number), rows (int rows sent), affected_rows
+                (int mysql affected rows, 1 per insert and 2 per changed update) and seconds (float execute time).
+                empty list if rows is empty
+
+        Raises:
+            MySQLException: execute or commit error is logged, a rollback is attempted and the mysql.connector.Error is
+                wrapped and returned.
+        """
+        if len(rows) == 0:
+            return []
+
+        if chunk_size is None:
+            chunk_size = 1000
+
+        # check db connection and cursor creation and recreate if not connected or created
+        self._db_initialize()
+
+        qw = QueryWriter(table, fields=fields, fields_extra=update_fields)
+        full_query = qw.write_insert_or_update_query(num_rows=chunk_size)
+
+        chunk_stats = []
+        try:
+            for i, start in enumerate(range(0, len(rows), chunk_size)):
+                chunk = rows[start:start + chunk_size]
+                query = full_query if len(chunk) == chunk_size else qw.write_insert_or_update_query(num_rows=len(chunk))
+                params = [val for row in chunk for val in row]
+
+                chunk_start = time.perf_counter()
+                self.cursor.execute(query, params)
+                chunk_stats.append({"chunk": i, "rows": len(chunk), "affected_rows": self.cursor.rowcount,
+                                    "seconds": time.perf_counter() - chunk_start})
+
+            self._DB.commit()
+        except mysql.connector.Error as err1:
+            self.logger.exception("Bulk insert or update exception: ")
+            self.db_rollback(err1)
+
+        return chunk_stats
+
+    def max_allowed_packet(self):
+        """ Server max_allowed_packet in bytes. Read from the server on first call then cached on this instance
+
+        Returns:
+            int: max_allowed_packet
+
+        Raises:
+            MySQLException: if database read issue occurs
+        """
+        if self._max_allowed_packet is None:
+            res = self.execute_fetch("SELECT @@max_allowed_packet", cursor=True, fetch_cursor=FetchCursor.LIST_LIST)
+            self._max_allowed_packet = int(res[0][0])
+
+        return self._max_allowed_packet
+
+    def bulk_insert(self, table, dict_list, max_chunk_rows=None, max_packet_bytes=None, continue_on_error=False,
+                    ignore=None):
+        """ Insert rows with multi-row VALUES statements, one commit per chunk
+
+        Enum and date conversions are applied by QueryWriter.write_insert_query(). Rows are then grouped into chunks of
+        at most max_chunk_rows rows whose estimated statement size is under max_packet_bytes. Each chunk is executed
+        as one statement and committed, so a failure only rolls back its own chunk. The start_row of the first failed
+        chunk can be used to restart a large import.
+
+        Args:
+            table (str): table to insert into
+            dict_list (list[dict]): each dict must have the same keys
+            max_chunk_rows (Optional[int]): maximum rows per chunk. Default None for 5000
+            max_packet_bytes (Optional[int]): maximum estimated statement size. Default None for 90% of the server
+                max_allowed_packet
+            continue_on_error (boolean): True to roll back a failed chunk, record the error and continue with the next
+                chunk. Default False to roll back the failed chunk and raise
+            ignore (Optional[boolean]): True to use insert ignore statement. Default None for False to use insert
+
+        Returns:
+            dict: keys rows (int rows in dict_list), inserted_rows (int rows in committed chunks), seconds (float),
+                rows_per_second (float), chunks (list[dict] with keys chunk, start_row, rows, seconds, error (str or
+                None)), failed_chunks (list[dict] of chunks with an error)
+
+        Raises:
+            ValueError: if any dict in dict_list does not have the same keys as the first dict
+            MySQLException: if a chunk fails and continue_on_error is False. The failed chunk is rolled back. Earlier
+                chunks remain committed
+        """
+        report = {"rows": len(dict_list), "inserted_rows": 0, "seconds": 0.0, "rows_per_second": 0.0, "chunks": [],
+                  "failed_chunks": []}
+        if len(dict_list) == 0:
+            return report
+
+        if max_chunk_rows is None:
+            max_chunk_rows = 5000
+        if max_packet_bytes is None:
+            max_packet_bytes = int(self.max_allowed_packet() * 0.9)
+
+        fields = list(dict_list[0].keys())
+        qw = QueryWriter(table, fields=fields)
+        _, dict_list = qw.write_insert_query(dict_list, ignore=ignore)
+        rows = [[d[f] for f in fields] for d in dict_list]
+
+        # statement size estimate: query text plus each value as a quoted and escaped literal
+        base_bytes = len(qw.write_multi_row_insert_query(1, ignore=ignore)) - 4 * len(fields)
+        chunk_bounds = []
+        start, chunk_bytes = 0, base_bytes
+        for i, row in enumerate(rows):
+            row_bytes = 4 + sum([4 + len(str(val)) for val in row])
+            if i > start and (i - start >= max_chunk_rows or chunk_bytes + row_bytes > max_packet_bytes):
+                chunk_bounds.append((start, i))
+                start, chunk_bytes = i, base_bytes
+            chunk_bytes += row_bytes
+        chunk_bounds.append((start, len(rows)))
+
+        # check db connection and cursor creation and recreate if not connected or created
+        self._db_initialize()
+
+        total_start = time.perf_counter()
+        for chunk_num, (start, end) in enumerate(chunk_bounds):
+            chunk_stats = {"chunk": chunk_num, "start_row": start, "rows": end - start, "seconds": 0.0, "error": None}
+            chunk_start = time.perf_counter()
+            try:
+                self.cursor.execute(qw.write_multi_row_insert_query(end - start, ignore=ignore),
+                                    [val for row in rows[start:end] for val in row])
+                self._DB.commit()
+                report["inserted_rows"] += end - start
+            except mysql.connector.Error as err1:
+                self.logger.exception("Bulk insert chunk " + str(chunk_num) + " exception: ")
+                if not continue_on_error:
+                    self.db_rollback(err1)  # always raises MySQLException
+                try:
+                    self._DB.rollback()
+                except mysql.connector.Error as err2:
+                    self.logger.exception("DB rollback exception")
+                    raise MySQLException(format(err1) + "\nRollback Failed\n" + format(err2))
+                chunk_stats["error"] = str(err1)
+                report["failed_chunks"].append(chunk_stats)
+            finally:
+                chunk_stats["seconds"] = time.perf_counter() - chunk_start
+                report["chunks"].append(chunk_stats)
+
+        report["seconds"] = time.perf_counter() - total_start
+        if report["seconds"] > 0:
+            report["rows_per_second"] = report["inserted_rows"] / report["seconds"]
+
+        return report
+
     def db_commit(self):
         """ Convenience function for self._DB.commit() """
         self._DB.commit()
@@ -320,6 +705,14 @@ class MySQLBase(ABC):
         self.execute_commit(query, params_list=di_list, execute_many=True)
 
 
+    def pool_stats(self):
+        """ Counters of the connection pool used by this instance
+
+        Returns:
+            Optional[dict]: see MySQLConnectionPool.stats(). None if this instance does not use a pool
+        """
+        return None if self._pool is None else self._pool.stats()
+
     @property
     def fetch_cursor(self):
         return self._fetch_cursor
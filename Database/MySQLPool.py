@@ -0,0 +1,250 @@
+""" Module for process wide MySQL connection pooling. """
+import os
+import threading
+import time
+import mysql.connector
+from Database.MySQLException import MySQLException
+
+
+class MySQLConnectionPool:
+    """ Thread safe pool of mysql database connections
+
+    Connections are created lazily up to max_size. A borrowed connection is returned to the pool by give_back() and
+    reused by the next borrow() instead of opening a new connection (TCP connect, authentication and SSL handshake).
+    Idle connections are evicted after max_idle_seconds and connections that have been idle longer than
+    ping_interval are health checked (ping) before being handed out.
+
+    Attributes:
+        host (str): database host url.
+        user (str): database user name.
+        password (str): database password.
+        db_name (str): database name.
+        ssl_ca_path (Optional[str]): full path to ssl certificate authority file. None for no certificate
+        max_size (int): maximum number of connections (idle and borrowed) held by the pool
+        max_idle_seconds (float): idle connections older than this are closed and removed from the pool
+        ping_interval (float): idle connections older than this are pinged before being returned by borrow()
+        wait_timeout (float): seconds borrow() waits for a connection when max_size connections are borrowed
+        hits (int): number of borrow() calls that reused an idle connection
+        misses (int): number of borrow() calls that opened a new connection
+        waits (int): number of borrow() calls that had to wait for a connection to be given back
+        wait_seconds (float): total time spent waiting in borrow()
+        evictions (int): number of idle connections closed for age or failed health check
+    """
+    def __init__(self, host, user, password, db_name, ssl_ca_path=None, max_size=None, max_idle_seconds=None,
+                 ping_interval=None, wait_timeout=None):
+        """ init MySQLConnectionPool. No connections are opened until borrow() is called
+
+        Args:
+            host (str): database host url.
+            user (str): database user name.
+            password (str): database password.
+            db_name (str): database name.
+            ssl_ca_path (Optional[str]): full path to ssl certificate authority file. Default None for no certificate
+            max_size (Optional[int]): Default None for 10
+            max_idle_seconds (Optional[float]): Default None for 300
+            ping_interval (Optional[float]): Default None for 10
+            wait_timeout (Optional[float]): Default None for 30
+        """
+        self.host = host
+        self.user = user
+        self.password = password
+        self.db_name = db_name
+        self.ssl_ca_path = ssl_ca_path
+        self.max_size = 10 if max_size is None else int(max_size)
+        self.max_idle_seconds = 300 if max_idle_seconds is None else float(max_idle_seconds)
+        self.ping_interval = 10 if ping_interval is None else float(ping_interval)
+        self.wait_timeout = 30 if wait_timeout is None else float(wait_timeout)
+
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.evictions = 0
+
+        self._idle = []  # list of [connection, time given back], most recently given back last
+        self._borrowed = 0
+        self._cond = threading.Condition()
+
+    def _connect(self):
+        """ Open a new database connection
+
+        Returns:
+            mysql.connector.MySQLConnection:
+
+        Raises:
+            mysql.connector.Error: if connection can't be opened
+        """
+        return mysql.connector.connect(host=self.host, user=self.user, passwd=self.password, database=self.db_name,
+                                       ssl_ca=self.ssl_ca_path, ssl_verify_cert=(self.ssl_ca_path is not None))
+
+    @staticmethod
+    def _close_quietly(conn):
+        """ Close connection and ignore any error """
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+    def _evict_idle(self, now):
+        """ Close and remove idle connections older than self.max_idle_seconds. Caller must hold self._cond """
+        keep = []
+        for conn, returned in self._idle:
+            if now - returned > self.max_idle_seconds:
+                self._close_quietly(conn)
+                self.evictions += 1
+            else:
+                keep.append([conn, returned])
+        self._idle = keep
+
+    def borrow(self):
+        """ Borrow a connection from the pool
+
+        An idle connection is reused if one passes its health check. Otherwise, a new connection is opened if fewer
+        than self.max_size connections exist. Otherwise, wait up to self.wait_timeout seconds for a connection to be
+        given back.
+
+        Returns:
+            mysql.connector.MySQLConnection: caller must return it with give_back()
+
+        Raises:
+            MySQLException: if no connection is available after self.wait_timeout seconds or a new connection can't
+                be opened. is_logged=False
+        """
+        waited = False
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._evict_idle(now)
+
+                while len(self._idle) > 0:
+                    conn, returned = self._idle.pop()
+                    if now - returned > self.ping_interval and not conn.is_connected():
+                        self._close_quietly(conn)
+                        self.evictions += 1
+                        continue
+                    self._borrowed += 1
+                    self.hits += 1
+                    if waited:
+                        self.wait_seconds += time.monotonic() - start
+                    return conn
+
+                if self._borrowed < self.max_size:
+                    # reserve the slot so connect can happen without holding the lock
+                    self._borrowed += 1
+                    self.misses += 1
+                    break
+
+                if not waited:
+                    waited = True
+                    self.waits += 1
+                remaining = self.wait_timeout - (now - start)
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    self.wait_seconds += time.monotonic() - start
+                    raise MySQLException("No pooled connection available after " + str(self.wait_timeout) +
+                                         " seconds. Pool max size: " + str(self.max_size), is_logged=False)
+
+            if waited:
+                self.wait_seconds += time.monotonic() - start
+
+        try:
+            return self._connect()
+        except mysql.connector.Error as err:
+            with self._cond:
+                self._borrowed -= 1
+                self._cond.notify()
+            raise MySQLException(str(err), is_logged=False) from err
+
+    def give_back(self, conn):
+        """ Return a borrowed connection to the pool
+
+        Any open transaction is rolled back so the next borrower starts clean. Connections that are disconnected or
+        fail to roll back are closed and discarded instead of returned to the idle list.
+
+        Args:
+            conn (mysql.connector.MySQLConnection): connection from borrow()
+        """
+        keep = False
+        try:
+            if conn.is_connected():
+                conn.rollback()
+                keep = True
+        except mysql.connector.Error:
+            keep = False
+
+        if not keep:
+            self._close_quietly(conn)
+
+        with self._cond:
+            self._borrowed -= 1
+            if keep:
+                self._idle.append([conn, time.monotonic()])
+            else:
+                self.evictions += 1
+            self._cond.notify()
+
+    def close_all(self):
+        """ Close all idle connections. Borrowed connections are closed when they are given back """
+        with self._cond:
+            for conn, _ in self._idle:
+                self._close_quietly(conn)
+            self._idle = []
+
+    def stats(self):
+        """ Pool counters for monitoring
+
+        Returns:
+            dict: keys hits, misses, waits, wait_seconds, evictions, borrowed, idle, max_size
+        """
+        with self._cond:
+            return {"hits": self.hits, "misses": self.misses, "waits": self.waits, "wait_seconds": self.wait_seconds,
+                    "evictions": self.evictions, "borrowed": self._borrowed, "idle": len(self._idle),
+                    "max_size": self.max_size}
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = os.getpid()
+
+
+def get_pool(host, user, password, db_name, ssl_ca_path=None):
+    """ Get the process wide pool for these connection parameters, creating it if necessary
+
+    Pool settings are read from environment variables MYSQL_POOL_SIZE, MYSQL_POOL_MAX_IDLE, MYSQL_POOL_PING_INTERVAL
+    and MYSQL_POOL_WAIT_TIMEOUT when the pool is created. Unset variables use MySQLConnectionPool defaults. Pools are
+    not shared across processes. A forked child process gets new, empty pools.
+
+    Args:
+        see MySQLConnectionPool.__init__()
+
+    Returns:
+        MySQLConnectionPool:
+    """
+    global _pools_pid
+    key = (host, user, db_name, ssl_ca_path)
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # connections inherited from a parent process must not be used by the child
+            _pools.clear()
+            _pools_pid = os.getpid()
+
+        pool = _pools.get(key, None)
+        if pool is None:
+            pool = MySQLConnectionPool(host, user, password, db_name, ssl_ca_path=ssl_ca_path,
+                                       max_size=os.getenv("MYSQL_POOL_SIZE"),
+                                       max_idle_seconds=os.getenv("MYSQL_POOL_MAX_IDLE"),
+                                       ping_interval=os.getenv("MYSQL_POOL_PING_INTERVAL"),
+                                       wait_timeout=os.getenv("MYSQL_POOL_WAIT_TIMEOUT"))
+            _pools[key] = pool
+
+    return pool
+
+
+def pool_stats():
+    """ Counters of every pool in this process
+
+    Returns:
+        dict: (host, user, db_name, ssl_ca_path) keys to MySQLConnectionPool.stats() values
+    """
+    with _pools_lock:
+        return {key: pool.stats() for key, pool in _pools.items()}
@@ -6,9 +6,21 @@ from enum import Enum
 class QueryWriter:
     """ Formatter for simple single table queries
 
+    Read query text is cached by query shape (table, fields, distinct, where clause structure, order bys and limit) so
+    repeated reads that only differ in where clause values reuse the same str object. Reusing the same str object also
+    lets a prepared cursor reuse its server side prepared statement. See MySQLBase.execute_fetch().
+
     Attributes:
         see __init__ docstring
+        read_query_cache (dict): class attribute. query shape keys to read query str values
+        read_query_cache_hits (int): class attribute. number of write_read_query() calls that used a cached query
+        read_query_cache_misses (int): class attribute. number of write_read_query() calls that compiled the query
     """
+    READ_QUERY_CACHE_MAX_SIZE = 1024
+    read_query_cache = {}
+    read_query_cache_hits = 0
+    read_query_cache_misses = 0
+
     def __init__(self, table, fields=None, distinct=None, wheres=None, order_bys=None, limit=None,
                  date_to_int_date=None, fields_extra=None):
         """ init QueryWriter
@@ -239,22 +251,108 @@ class QueryWriter:
 
         return ob_str
 
+    def _where_val(self, val):
+        """ Convert a where clause value the same way as where_clause()
+
+        Args:
+            val: where clause value (not a list or tuple)
+
+        Returns:
+            converted value
+        """
+        if isinstance(val, bool):
+            # True and False must be changed to 1 and 0 since mysql does not have bool type
+            return int(val)
+        elif self.date_to_int_date and isinstance(val, datetime.date):
+            return val.strftime("%Y%m%d")
+        elif isinstance(val, Enum):
+            return val.value
+        return val
+
+    def where_shape_params(self):
+        """ Where clause structure and parameters without compiling the where clause str
+
+        The structure includes everything where_clause() uses to compile the where clause str except parameter values,
+        so two QueryWriters with equal structure compile equal where clause strs. self.wheres is not changed
+
+        Returns:
+            Optional[tuple[tuple, tuple]]: (structure, params) or None if self.wheres can't be handled here (e.g. it is
+                not valid). params are equal to those returned by where_clause()
+        """
+        if isinstance(self.wheres, str):
+            return ("str", self.wheres), ()
+        if not isinstance(self.wheres, (list, tuple)):
+            return None
+
+        shape = []
+        params = ()
+        for cond in self.wheres:
+            if isinstance(cond, str):
+                shape.append(cond)
+            elif isinstance(cond, (list, tuple)):
+                comp = cond[1].lower()
+                if comp in ("in", "not in") and len(cond[2]) == 0:
+                    shape.append((cond[0], comp, 0))
+                elif comp in ("is", "is not"):
+                    if cond[2] is not None:
+                        return None
+                    shape.append((cond[0], comp))
+                elif isinstance(cond[2], str) and len(cond[2]) > 2 and cond[2][0] == "^" and cond[2][-1] == "^":
+                    shape.append((cond[0], comp, cond[2]))
+                elif isinstance(cond[2], (list, tuple)):
+                    shape.append((cond[0], comp, "list", len(cond[2])))
+                    params += tuple([self._where_val(el) for el in cond[2]])
+                else:
+                    shape.append((cond[0], comp, "val"))
+                    params += (str(self._where_val(cond[2])),)
+            else:
+                return None
+
+        return tuple(shape), params
+
     def write_read_query(self):
         """ Compile full read query as a str and query parameters as a tuple
 
         FROM and LIMIT statements are applied in this function.
+        The query str is taken from QueryWriter.read_query_cache if a query with the same shape was compiled before.
 
         Returns:
             tuple[str, tuple]: (query, params)
         """
+        shape_params = self.where_shape_params()
+        key = None
+        if shape_params is not None:
+            key = (self.table, repr(self.fields), self.distinct, shape_params[0], self.date_to_int_date,
+                   repr(self.order_bys), int(self.limit))
+            query = QueryWriter.read_query_cache.get(key, None)
+            if query is not None:
+                QueryWriter.read_query_cache_hits += 1
+                return query, shape_params[1]
+
+        QueryWriter.read_query_cache_misses += 1
         where_str, params = self.where_clause()
         query = self.select_stmt() + " FROM " + self.table + " " + where_str + " " + self.order_by_stmt()
         if int(self.limit) > 0:
             query += " LIMIT " + str(self.limit)
         query += ";"
 
+        if key is not None:
+            if len(QueryWriter.read_query_cache) >= QueryWriter.READ_QUERY_CACHE_MAX_SIZE:
+                QueryWriter.read_query_cache.clear()
+            QueryWriter.read_query_cache[key] = query
+
         return query, params
 
+    @staticmethod
+    def read_query_cache_stats():
+        """ Read query cache counters
+
+        Returns:
+            dict: keys hits, misses, size
+        """
+        return {"hits": QueryWriter.read_query_cache_hits, "misses": QueryWriter.read_query_cache_misses,
+                "size": len(QueryWriter.read_query_cache)}
+
     def write_insert_query(self, insert_list, ignore=None):
         """ Compile insert query
 
@@ -324,6 +422,30 @@ class QueryWriter:
 
         return query, insert_list
 
+    def write_multi_row_insert_query(self, num_rows, ignore=None):
+        """ Compile insert query with num_rows row placeholders in the VALUES statement
+
+        Parameters for this query are num_rows rows flattened in self.fields order. Use write_insert_query() to apply
+        enum and date conversions to the rows first.
+
+        Args:
+            num_rows (int): number of rows in VALUES statement
+            ignore (Optional[boolean]): True to use insert ignore statement. Default None for False to use insert
+
+        Returns:
+            str: query
+
+        Raises:
+            NotImplementedError: if self.fields is a str
+        """
+        if isinstance(self.fields, str):
+            raise NotImplementedError("self.fields as str not implemented")
+
+        row_str = "(" + ("%s, " * len(self.fields))[0:-2] + ")"
+
+        return "INSERT " + ("IGNORE" if ignore else "") + " INTO " + self.table + " (" + ", ".join(self.fields) + \
+            ") VALUES " + ", ".join([row_str] * num_rows)
+
     def write_update_query(self, set_params, where_params=None, objects=()):
         # TODO allow "in" and "not in" in where clause
         """ Compile update query with optional where clause and parameter lists
@@ -427,16 +549,24 @@ class QueryWriter:
 
         return query, final_params
 
-    def write_insert_or_update_query(self):
+    def write_insert_or_update_query(self, num_rows=None):
         """ Compile 'insert into ... on duplicate key update ...' query
 
         Insert into table if primary key and unique keys are all not found. Update if any are found.
         If self.fields_extra is None, use fields for both the insert and update statements
+        If num_rows is greater than 1, the VALUES statement has num_rows row placeholders so that num_rows rows are
+        inserted or updated by one statement. Parameters for this query are the rows flattened in order.
+
+        Args:
+            num_rows (Optional[int]): number of rows in VALUES statement. Default None for 1
 
         Returns:
             str: query
         """
-        insert_values_str = ("%s, " * len(self.fields))[0:-2]
+        if num_rows is None:
+            num_rows = 1
+
+        insert_values_str = ", ".join(["(" + ("%s, " * len(self.fields))[0:-2] + ")"] * num_rows)
 
         update_fields = self.fields if self.fields_extra is None else self.fields_extra
         update_values_str = ""
@@ -444,7 +574,7 @@ class QueryWriter:
             update_values_str += (field + "=VALUES(" + field + "), ")
         update_values_str = update_values_str[0:-2]
 
-        query = "INSERT INTO " + self.table + " (" + ", ".join(self.fields) + ") VALUES (" + insert_values_str + ") "
+        query = "INSERT INTO " + self.table + " (" + ", ".join(self.fields) + ") VALUES " + insert_values_str + " "
         query += ("ON DUPLICATE KEY UPDATE " + update_values_str + ";")
 
         return query
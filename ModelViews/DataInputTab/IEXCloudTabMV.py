@@ -244,7 +244,7 @@ class IEXCloudTabMV:
                 param_dict[key] = value
 
         data = self.ui.iexCloudEndpointCombo.currentData()
-        res = data["api_func"](param_dict)
+        res = self.iex_cloud_base_major_endpoint.call_endpoint(data, param_dict)
         if isinstance(res, str):
             GUIUtils.show_error_msg("API Call Error", res)
         else:
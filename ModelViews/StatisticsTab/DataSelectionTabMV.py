@@ -1,9 +1,10 @@
 from ModelViews import GUIUtils
 from PyQt5 import QtWidgets, QtCore
-from Statistics import Transform, StatsData, Equation, PreImpute
+from Statistics import Transform, StatsData, StatsDataPanel, Equation, ExpressionDAG, PreImpute
 import datetime
 import csv
 import pandas as pd
+from Database.MySQLBase import FetchCursor
 
 
 class DataSelectionTabMV:
@@ -11,6 +12,9 @@ class DataSelectionTabMV:
     def __init__(self, ui, db):
         self.ui = ui
         self.db = db
+        # subexpressions shared by interaction equations. memoized values are kept between apply interactions clicks
+        # until the transformed data series they were computed from change
+        self.expression_dag = ExpressionDAG.ExpressionDAG()
 
         self.init_class()
 
@@ -220,7 +224,8 @@ class DataSelectionTabMV:
              stats_data.column, stats_data.name_data_dict, None, stats_data.type_db_table_meta,
              stats_data.db_begin_date, stats_data.db_end_date])
         try:
-            stats_data.set_data_series(self.db.read_data_data_table(db_dict),
+            stats_data.set_data_series(self.db.read_data_data_table(db_dict,
+                                                                    fetch_cursor=FetchCursor.NUMPY_COLUMNS),
                                        db_type=self.ui.statsDataSelColumnCombo.currentData().get("Type", None))
         except Exception as e:
             GUIUtils.show_error_msg("Add Data Error", str(e))
@@ -431,12 +436,20 @@ class DataSelectionTabMV:
         if 0 in [len(dep_stats_data_list), len(indep_stats_data_list)]:
             error_msg_list.append('Dependent and Independent data tables must each have at least 1 row.')
 
+        # all checked variables aligned in one panel so checks and transforms run column-wise. None if they can't be
+        # aligned. other variables are not checked or transformed here, so they are not added (one that can't be
+        # aligned would send every variable to the per-variable checks)
+        panel = self.build_stats_data_panel(raa_stats_data_list + dep_stats_data_list + indep_stats_data_list)
+
         # check #obs is the same for dependent and independent data
-        obs_set = set()
+        if panel is None:
+            obs_set = {stats_data.num_obs_after_transform
+                       for stats_data in dep_stats_data_list + indep_stats_data_list}
+        else:
+            obs_set = set(panel.num_obs_after_transform(dep_stats_data_list + indep_stats_data_list).tolist())
         freq_set = set()
         req_raa = False
         for stats_data in dep_stats_data_list + indep_stats_data_list:
-            obs_set.add(stats_data.num_obs_after_transform)
             freq_set.add(stats_data.freq)
             if stats_data.transform.is_risk_adj_transform():
                 req_raa = True
@@ -451,7 +464,10 @@ class DataSelectionTabMV:
         else:
             err_list = []
 
-            if req_raa:
+            if req_raa and panel is not None:
+                err_list, sugg_list = panel.check_apply_transforms(raa_stats_data_list)
+                sugg_msg_list += sugg_list
+            elif req_raa:
                 for stats_data in raa_stats_data_list:
                     e_list, sugg_list = stats_data.check_apply_transform()
                     err_list += e_list
@@ -461,10 +477,16 @@ class DataSelectionTabMV:
             # do transforms after raa is correctly transformed
             if len(err_list) == 0:
                 force_match = self.ui.statsDataSelForceMatchCheckbox.isChecked()
-                for stats_data in dep_stats_data_list + indep_stats_data_list:
-                    err_list, sugg_list = stats_data.check_apply_transform(raa_stats_data_list, force_match)
+                if panel is not None:
+                    err_list, sugg_list = panel.check_apply_transforms(
+                        dep_stats_data_list + indep_stats_data_list, raa_stats_data_list, force_match)
                     error_msg_list += err_list
                     sugg_msg_list += sugg_list
+                else:
+                    for stats_data in dep_stats_data_list + indep_stats_data_list:
+                        err_list, sugg_list = stats_data.check_apply_transform(raa_stats_data_list, force_match)
+                        error_msg_list += err_list
+                        sugg_msg_list += sugg_list
 
             # detailed check dates after all transforms correctly applied
             if len(error_msg_list) == 0:
@@ -484,6 +506,15 @@ class DataSelectionTabMV:
 
         self.update_verify(data_check=len(error_msg_list) == 0)
 
+    # returns StatsDataPanel.StatsDataPanel of stats_data_list or None if the variables can't be aligned in a panel
+    # (e.g. non numeric data or time series mixed with non time series). the caller then checks each variable alone
+    @staticmethod
+    def build_stats_data_panel(stats_data_list):
+        try:
+            return StatsDataPanel.StatsDataPanel(stats_data_list)
+        except (ValueError, TypeError):
+            return None
+
     # Data Suggestions:
     #   TODO check for gaps within data rows - these are probably not intended but statistics can still be run if # obs
     #       is same across all data rows
@@ -527,9 +558,13 @@ class DataSelectionTabMV:
                 for r in range(lt[1].rowCount()):
                     lt[0].append(lt[1].item(r, 0).data(QtCore.Qt.UserRole).transformed_data_series)
 
+            self.expression_dag.invalidate(dep_series_data_list + indep_series_data_list)
+            for iv in [[dep_int_list, dep_series_data_list], [indep_int_list, indep_series_data_list]]:
+                for equation in iv[0]:
+                    self.expression_dag.add_equation(equation, iv[1])
             for iv in [[dep_int_list, dep_series_data_list], [indep_int_list, indep_series_data_list]]:
                 for equation in iv[0]:
-                    err_list = equation.evaluate_equation(iv[1], False, True)
+                    err_list = equation.evaluate_equation(iv[1], False, True, expression_dag=self.expression_dag)
                     error_msg_list += err_list
         else:
             error_msg_list.append("Data must be checked before interactions can be applied.")
@@ -383,6 +383,34 @@ create table iex_api_tokens(
     type enum("Secret", "Publishable"),
     env enum("Production", "Sandbox"));
 
+# high-water mark of the IEX Cloud price sync (DataProvider/IEXCloudSync.py)
+# last_date_time is the latest price date stored for the security and freq
+create table iex_price_sync (
+	id int not null auto_increment primary key,
+    securities_id int not null,
+    freq varchar(5) not null,
+    last_date_time datetime not null,
+    last_sync datetime not null,
+    constraint sid_freq unique (securities_id, freq),
+    foreign key (securities_id) references securities (id));
+
+create table regression_batch_results (
+	id int not null auto_increment primary key,
+    run_name varchar(50) not null,
+    securities_id int not null,
+    regr_type varchar(10) not null,
+    run_time datetime not null,
+    nobs int,
+    rsquared double,
+    params text,
+    bse text,
+    tvalues text,
+    summary mediumtext,
+    fit_seconds double,
+    error varchar(500),
+    constraint run_sid unique (run_name, securities_id),
+    foreign key (securities_id) references securities (id));
+
 create table real_estate (
 	id smallint not null auto_increment primary key,
     address varchar(70) not null unique,
@@ -420,6 +448,23 @@ create table mysunpower_hourly_data (
     home_kwh decimal(5,2)
 );
 
+# daily and monthly rollups of mysunpower_hourly_data (Solar.insert_sunpower_hourly_data_to_db() keeps them updated)
+# hours is the number of hourly rows. month is the first day of the month
+# fill from existing hourly data with MySQLAM.mysunpower_rollup_refresh() and no dates
+create table mysunpower_daily_data (
+	date date not null primary key,
+    solar_kwh decimal(7,2),
+    home_kwh decimal(7,2),
+    hours tinyint unsigned not null
+);
+
+create table mysunpower_monthly_data (
+	month date not null primary key,
+    solar_kwh decimal(9,2),
+    home_kwh decimal(9,2),
+    hours smallint unsigned not null
+);
+
 create table solar_bill_data (
 	id int not null auto_increment primary key,
     real_estate_id smallint not null,
@@ -353,6 +353,51 @@ class BillAndDataInput:
 
         return bill_list
 
+    def do_batch_bill_process(self):
+        """ Run process to read all pdf bills in a bill directory and store data to table in one batch
+
+        Returns:
+            list[SimpleServiceBillDataBase]: processed bills
+        """
+        print("######################################################################")
+        print("Choose a bill type to batch input from the following:\n")
+        print("1: Electric Bills")
+        print("2: Natural Gas Bills")
+        print("3: Mortgage Bills")
+        opt = input("\nSelection: ")
+
+        if opt == "1":
+            model = self.pseg_model
+        elif opt == "2":
+            model = self.ng_model
+        elif opt == "3":
+            model = self.mortgage_model
+        else:
+            print(opt + " is not a valid option.")
+            return []
+
+        print("\nReading all pdf bills in " + str(model.bill_file_path("")) + " ...")
+        bill_list, report = model.process_service_bills_batch()
+
+        print("\n**** Batch Bill Report ****")
+        for file_report in report["files"]:
+            extract = "-" if file_report["extract_seconds"] is None else "{:.2f}s".format(file_report["extract_seconds"])
+            process = "-" if file_report["process_seconds"] is None else "{:.2f}s".format(file_report["process_seconds"])
+            status = "OK" if file_report["error"] is None else colorama.Fore.RED + file_report["error"] + \
+                colorama.Style.RESET_ALL
+            extract = "cached" if file_report["cached"] else extract
+            print(file_report["filename"] + ": extract " + extract + ", process " + process + ": " + status)
+        if report["insert_error"] is None:
+            print("\nInserted " + str(report["inserted"]) + " bills. Cached files: " + str(report["cached"]) +
+                  ". Failed files: " + str(report["failed"]) + ". Total time: {:.2f}s".format(report["seconds"]))
+        else:
+            print(colorama.Fore.RED, "\nInsert failed. No bills inserted: " + report["insert_error"])
+            print(colorama.Style.RESET_ALL)
+
+        model.clear_model()
+
+        return bill_list
+
     def do_input_or_create_bill_process(self):
         """ Select and run bill or data input or create process through console """
 
@@ -367,6 +412,7 @@ class BillAndDataInput:
                 print("5: Input Mortgage Bill")
                 print("6: Input Missing Paid Dates")
                 print("7: Run Depreciation Bill Process")
+                print("8: Batch Input Bills From Directory")
                 print("0: Return to Main Menu")
                 opt = input("\nSelection: ")
 
@@ -384,6 +430,8 @@ class BillAndDataInput:
                     self.do_paid_date_process()
                 elif opt == "7":
                     self.do_depreciation_bill_process()
+                elif opt == "8":
+                    self.do_batch_bill_process()
                 elif opt == "0":
                     break
                 else:
@@ -10,7 +10,7 @@ from Database.POPO.RealEstate import Address, RealEstate
 from Database.POPO.RealPropertyValues import RealPropertyValues
 from Database.POPO.DepreciationBillData import DepreciationBillData
 from Services.Model.SimpleServiceModelBase import SimpleServiceModelBase
-from Services.Depreciation.Model.DepreciationTaxation import DepreciationTaxation
+from Services.Depreciation.Model.DepreciationTaxation import DepreciationSchedule, DepreciationTaxation
 
 
 class DepreciationModel(SimpleServiceModelBase):
@@ -263,10 +263,8 @@ class DepreciationModel(SimpleServiceModelBase):
         rpv_list = self.read_real_property_values_by_repy(real_estate, purchase_year_ub=year)
         bill_list = []
         nd_list = []
-        dep_tax = DepreciationTaxation()
-        for rpv in rpv_list:
-            dep_for_year, remain_dep, max_dep_for_year = dep_tax.calculate_depreciation_for_year(rpv, year)
-
+        dep_list = DepreciationTaxation().calculate_depreciation_for_year_batch(real_estate, rpv_list, year)
+        for rpv, (dep_for_year, remain_dep, max_dep_for_year) in zip(rpv_list, dep_list):
             if dep_for_year.is_zero():
                 nd_list.append(rpv)
             else:
@@ -287,6 +285,37 @@ class DepreciationModel(SimpleServiceModelBase):
 
         return bill_list, nd_list
 
+    def project_depreciation_schedule(self, real_estate, start_year, end_year, exact=False, from_bills=True):
+        """ Project yearly depreciation of all real property values of real estate assuming full period business usage
+
+        See DepreciationSchedule.project()
+
+        Args:
+            real_estate (RealEstate): real estate location of real property values
+            start_year (int): first projected tax year
+            end_year (int): last projected tax year. may be a future year
+            exact (boolean): True for Decimal values. Default False for float64 values. See DepreciationSchedule
+            from_bills (boolean): True to start from accumulated depreciation in depreciation bills paid before
+                start_year. False to assume depreciation was taken on schedule every year from the purchase year.
+                Default True
+
+        Returns:
+            (pd.DataFrame, list[RealPropertyValues]): (schedule, real property values). schedule has real property values
+                id index, int tax year columns and yearly depreciation values. real property values are those purchased
+                in or before end_year
+
+        Raises:
+            MySQLException: if issue with database read
+            NotImplementedError: if depreciation is not implemented for a depreciation class of real property values
+        """
+        rpv_list = self.read_real_property_values_by_repy(real_estate, purchase_year_ub=end_year)
+        accum_dep = None
+        if from_bills:
+            with MySQLAM() as mam:
+                accum_dep = mam.depreciation_bill_data_sum_by_rpv(real_estate.id, datetime.date(start_year, 1, 1))
+
+        return DepreciationSchedule(exact=exact).project(rpv_list, start_year, end_year, accum_dep=accum_dep), rpv_list
+
     def apply_period_usage_to_bills(self, bill_list):
         """ Apply period usage to bills in bill_list
 
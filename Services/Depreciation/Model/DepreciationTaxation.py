@@ -1,4 +1,6 @@
 import datetime
+import numpy as np
+import pandas as pd
 from typing import Optional
 from enum import Enum
 from decimal import Decimal
@@ -184,6 +186,161 @@ class DepreciationType:
         return rat_val
 
 
+class DepreciationSchedule:
+    """ Project yearly depreciation schedules for many depreciation items at once
+
+    Depreciation ratios only depend on the depreciation class, the purchase month, the year offset from the purchase
+    year and, in the disposal year, the disposal month. Ratio tables (purchase month x year offset, and disposal month)
+    are computed once per DepClass with DepreciationType.depreciation_ratio_for_tax_year(), so they match the one year
+    calculation exactly. A projection looks up the ratios of all items for all years with array indexing, then applies
+    the remaining depreciation limit one year at a time for all items at once.
+
+    Items are assumed to be used for business purposes for the full period of every projected year (see
+    DepreciationTaxation.calculate_depreciation_for_year()).
+
+    Attributes:
+        exact (boolean): True to compute with Decimal values (same results as
+            DepreciationTaxation.calculate_depreciation_for_year()). False to compute with float64 values, which is
+            faster but can round a yearly value differently when it is within float error of a half dollar
+    """
+    # ratio tables are computed for purchase dates in this year. any non leap year would do
+    TABLE_BASE_YEAR = 2001
+
+    def __init__(self, exact=False):
+        """ init function
+
+        Args:
+            exact (boolean): see class docstring. Default False
+        """
+        self.exact = exact
+        self._ratio_tables = {}
+
+    def ratio_tables(self, dep_class, num_offsets):
+        """ Depreciation ratio tables for a depreciation class
+
+        Args:
+            dep_class (DepClass): depreciation class
+            num_offsets (int): minimum number of year offsets (columns) in the purchase table
+
+        Returns:
+            (np.ndarray, np.ndarray): (purchase table, disposal ratios). purchase table has shape (12, >= num_offsets)
+                with the ratio for purchase month (row 0 for January) and year offset from the purchase year (column)
+                for an item not disposed. disposal ratios has shape (12,) with the ratio in the disposal year for
+                disposal month, for an item purchased in an earlier year. dtype is object (Decimal) if self.exact else
+                float64
+
+        Raises:
+            NotImplementedError: if ratios are not implemented for dep_class
+        """
+        tables = self._ratio_tables.get(dep_class)
+        if tables is not None and tables[0].shape[1] >= num_offsets:
+            return tables
+
+        dep_type = DepreciationType.from_dep_class(dep_class)
+        base_year = self.TABLE_BASE_YEAR
+        purchase = [[dep_type.depreciation_ratio_for_tax_year(datetime.date(base_year, month, 1), None,
+                                                              base_year + offset)
+                     for offset in range(num_offsets)] for month in range(1, 13)]
+        disposal = [dep_type.depreciation_ratio_for_tax_year(datetime.date(base_year - 1, 1, 1),
+                                                             datetime.date(base_year, month, 1), base_year)
+                    for month in range(1, 13)]
+
+        dtype = object if self.exact else np.float64
+        tables = (np.array(purchase, dtype=dtype), np.array(disposal, dtype=dtype))
+        self._ratio_tables[dep_class] = tables
+        return tables
+
+    def ratios(self, real_property_values, years):
+        """ Depreciation ratio of each depreciation item for each year
+
+        Args:
+            real_property_values (list[RealPropertyValues]): depreciation items
+            years (np.ndarray): int tax years
+
+        Returns:
+            np.ndarray: shape (len(real_property_values), len(years)). 0 for years before the purchase year and after
+                the disposal year, and for every year if the item was purchased and disposed in the same year
+
+        Raises:
+            NotImplementedError: if ratios are not implemented for a depreciation class of real_property_values
+        """
+        zero = Decimal(0) if self.exact else 0.0
+        ratios = np.full((len(real_property_values), len(years)), zero, dtype=object if self.exact else np.float64)
+
+        class_dict = {}
+        for i, rpv in enumerate(real_property_values):
+            class_dict.setdefault(rpv.dep_class, []).append(i)
+
+        for dep_class, idx in class_dict.items():
+            idx = np.array(idx)
+            rpvs = [real_property_values[i] for i in idx]
+            p_year = np.array([rpv.purchase_date.year for rpv in rpvs])
+            p_month = np.array([rpv.purchase_date.month for rpv in rpvs])
+            # items not disposed get a disposal year after every projected year
+            d_year = np.array([years[-1] + 1 if rpv.disposal_date is None else rpv.disposal_date.year for rpv in rpvs])
+            d_month = np.array([1 if rpv.disposal_date is None else rpv.disposal_date.month for rpv in rpvs])
+
+            offsets = years[np.newaxis, :] - p_year[:, np.newaxis]
+            purchase, disposal = self.ratio_tables(dep_class, max(int(offsets.max()) + 1, 1))
+            rat = purchase[p_month[:, np.newaxis] - 1, np.clip(offsets, 0, None)]
+            rat = np.where(years[np.newaxis, :] == d_year[:, np.newaxis], disposal[d_month - 1][:, np.newaxis], rat)
+            not_depreciable = (offsets < 0) | (years[np.newaxis, :] > d_year[:, np.newaxis]) | \
+                (p_year == d_year)[:, np.newaxis]
+            ratios[idx] = np.where(not_depreciable, zero, rat)
+
+        return ratios
+
+    def project(self, real_property_values, start_year, end_year, accum_dep=None):
+        """ Project yearly depreciation of depreciation items from start_year through end_year
+
+        Args:
+            real_property_values (list[RealPropertyValues]): depreciation items. may be items of many real estates
+            start_year (int): first projected tax year
+            end_year (int): last projected tax year
+            accum_dep (Optional[dict]): int real property values id keys and Decimal accumulated depreciation before
+                start_year values (see DepreciationTaxation.calculate_accumulated_depreciation_for_real_estate()).
+                items not in the dict have no accumulated depreciation. Default None to assume depreciation was taken
+                on schedule every year from the purchase year
+
+        Returns:
+            pd.DataFrame: real property values id index, int tax year columns and yearly depreciation values rounded to
+                the nearest ones digit (Decimal if self.exact else float64)
+
+        Raises:
+            NotImplementedError: if ratios are not implemented for a depreciation class of real_property_values
+        """
+        ids = [rpv.id for rpv in real_property_values]
+        years = np.arange(start_year, end_year + 1)
+        if len(real_property_values) == 0 or len(years) == 0:
+            return pd.DataFrame(index=ids, columns=years)
+
+        if accum_dep is None:
+            first_year = min([start_year] + [rpv.purchase_date.year for rpv in real_property_values])
+            accum_dep = {}
+        else:
+            first_year = start_year
+        all_years = np.arange(first_year, end_year + 1)
+
+        if self.exact:
+            cost = np.array([Decimal(rpv.cost_basis) for rpv in real_property_values], dtype=object)
+            remain = cost - np.array([Decimal(accum_dep.get(i, 0)) for i in ids], dtype=object)
+            zero = Decimal(0)
+            round_func = np.frompyfunc(lambda x: round(x, 0), 1, 1)
+        else:
+            cost = np.array([float(rpv.cost_basis) for rpv in real_property_values])
+            remain = cost - np.array([float(accum_dep.get(i, 0)) for i in ids])
+            zero = 0.0
+            round_func = np.round
+
+        max_dep = cost[:, np.newaxis] * self.ratios(real_property_values, all_years)
+        dep = np.empty_like(max_dep)
+        for j in range(len(all_years)):
+            dep[:, j] = round_func(np.maximum(zero, np.minimum(remain, max_dep[:, j])))
+            remain = remain - dep[:, j]
+
+        return pd.DataFrame(dep[:, start_year - first_year:], index=ids, columns=years)
+
+
 class DepreciationTaxation:
     """ Calculate depreciation costs depending on various criteria
 
@@ -229,7 +386,30 @@ class DepreciationTaxation:
         # empty bills list will return int 0 so need to cast to Decimal
         return Decimal(sum(b.total_cost for b in bills))
 
-    def calculate_depreciation_for_year(self, real_property_value, tax_year):
+    def calculate_accumulated_depreciation_for_real_estate(self, real_estate, tax_year):
+        """ Calculate accumulated depreciation for all depreciation items of real estate up to the specified tax year
+
+        Same as calculate_accumulated_depreciation() for every depreciation item of real estate with one grouped query
+
+        Args:
+            real_estate (RealEstate): real estate of the depreciation items
+            tax_year (int): calculate accumulated depreciation up to (not including) this tax year. must be a year
+                before the current year
+
+        Returns:
+            dict: int real property values id keys and Decimal accumulated depreciation values. items without
+                depreciation bills are not included
+
+        Raises:
+            ValueError: if tax_year is greater than or equal to the current year
+        """
+        if tax_year >= datetime.date.today().year:
+            raise ValueError(str(tax_year) + " is not a previous year. Must be a previous year.")
+
+        with MySQLAM() as mam:
+            return mam.depreciation_bill_data_sum_by_rpv(real_estate.id, datetime.date(tax_year, 1, 1))
+
+    def calculate_depreciation_for_year(self, real_property_value, tax_year, accum_dep=None):
         """ Calculate depreciation for depreciation item for the specified tax year assuming full period usage
 
         "full period" used here instead of "full year" to indicate that first, last and disposal years may be partial
@@ -238,6 +418,8 @@ class DepreciationTaxation:
         Args:
             real_property_value (RealPropertyValues): depreciation item
             tax_year (int): calculate depreciation for this tax year. must be a year before the current year
+            accum_dep (Optional[Decimal]): accumulated depreciation for the item up to tax_year. Default None to read it
+                with calculate_accumulated_depreciation()
 
         Returns:
             (Decimal, Decimal, Decimal): (calculated depreciation, remaining depreciation for item before this tax
@@ -251,7 +433,8 @@ class DepreciationTaxation:
             raise ValueError(str(tax_year) + " is not a previous year. Must be a previous year.")
 
         dep_type = DepreciationType.from_dep_class(real_property_value.dep_class)
-        accum_dep = self.calculate_accumulated_depreciation(real_property_value, tax_year)
+        if accum_dep is None:
+            accum_dep = self.calculate_accumulated_depreciation(real_property_value, tax_year)
         remain_dep = real_property_value.cost_basis - accum_dep
 
         # this algorithm accounts for non depreciable property, property that has been fully depreciated
@@ -263,4 +446,27 @@ class DepreciationTaxation:
         # if there is a slight numerical issue
         year_dep = round(max(Decimal(0), min(remain_dep, max_year_dep)), 0)
 
-        return year_dep, round(remain_dep, 0), round(max_year_dep, 0)
\ No newline at end of file
+        return year_dep, round(remain_dep, 0), round(max_year_dep, 0)
+
+    def calculate_depreciation_for_year_batch(self, real_estate, real_property_values, tax_year):
+        """ Calculate depreciation for many depreciation items of real estate for the specified tax year
+
+        Same as calculate_depreciation_for_year() for each item, but accumulated depreciation for all items is read with
+        one query (see calculate_accumulated_depreciation_for_real_estate())
+
+        Args:
+            real_estate (RealEstate): real estate of the depreciation items
+            real_property_values (list[RealPropertyValues]): depreciation items of real_estate
+            tax_year (int): calculate depreciation for this tax year. must be a year before the current year
+
+        Returns:
+            list[(Decimal, Decimal, Decimal)]: see calculate_depreciation_for_year(). one tuple for each item in
+                real_property_values, in the same order
+
+        Raises:
+            ValueError: if tax_year is greater than or equal to the current year
+        """
+        accum_dep_dict = self.calculate_accumulated_depreciation_for_real_estate(real_estate, tax_year)
+
+        return [self.calculate_depreciation_for_year(rpv, tax_year, accum_dep=accum_dep_dict.get(rpv.id, Decimal(0)))
+                for rpv in real_property_values]
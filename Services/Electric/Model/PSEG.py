@@ -1,7 +1,4 @@
 import datetime
-import os
-import pathlib
-import tabula
 import pandas as pd
 from typing import Optional, Union
 from decimal import Decimal
@@ -15,6 +12,9 @@ from Services.Model.ComplexServiceModelBase import ComplexServiceModelBase
 
 class PSEG(ComplexServiceModelBase):
     """ Perform data operations and calculations on PSEG data """
+    BILL_DIR_ENV = "FI_PSEG_DIR"
+    READ_PDF_KWARGS = {"pages": "all", "password": "11720", "guess": False}
+
     def __init__(self):
         """ init function """
         super().__init__()
@@ -27,19 +27,23 @@ class PSEG(ComplexServiceModelBase):
         """
         return [ServiceProviderEnum.PSEG_UTI]
 
-    def process_service_bill(self, filename):
+    def process_service_bill(self, filename, df_list=None, force_extract=False):
         """ Open, process and return pseg monthly bill
 
         Returned instance of ElectricBillData is added to self.asb_dict
 
         Args:
             filename (str): name of file in directory specified by FI_PSEG_DIR in .env
+            df_list (Optional[list[pd.DataFrame]]): tables already extracted from the file (see
+                read_service_bill_tables()). Default None to extract them or load them from the extracted table cache
+            force_extract (boolean): if df_list is None, extract tables even if cached tables exist for the file.
+                Default False
 
         Returns:
             ElectricBillData: with all required fields populated and as many non required fields as available populated
         """
-        df_list = tabula.read_pdf(pathlib.Path(__file__).parent.parent.parent.parent /
-                                  (os.getenv("FI_PSEG_DIR") + filename), pages="all", password="11720", guess=False)
+        if df_list is None:
+            df_list = self.read_service_bill_tables(filename, force_extract=force_extract)
         bill_data = ElectricBillData(None, None, None, None, None, 0, 0, None, None, None, None, None, True)
 
         # get start date and end date from 1st page
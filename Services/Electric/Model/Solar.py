@@ -12,7 +12,21 @@ from Services.Model.SimpleServiceModelBase import SimpleServiceModelBase
 
 
 class Solar(SimpleServiceModelBase):
-    """ Perform data operations and calculations on Solar data """
+    """ Perform data operations and calculations on Solar data
+
+    Attributes:
+        SUNPOWER_COLUMNS (dict): class attribute. mySunpower hourly file column name to data frame column name
+        SUNPOWER_PERIOD_REGEX (str): class attribute. pulls date and time out of mySunpower Period values
+        SUNPOWER_DATE_FORMAT (str): class attribute. format of date pulled out of Period values
+        SUNPOWER_TIME_FORMAT (str): class attribute. format of time pulled out of Period values
+        SUNPOWER_CHUNK_ROWS (int): class attribute. default raw rows per chunk in iter_sunpower_hourly_file()
+    """
+    SUNPOWER_COLUMNS = {"Period": "dt", "Solar Production (kWh)": "solar_kwh", "Home Usage (kWh)": "home_kwh"}
+    SUNPOWER_PERIOD_REGEX = r"^[^ ]* ([^ ]*) [^ ]* ([^ ]*)"
+    SUNPOWER_DATE_FORMAT = "%m/%d/%Y"
+    SUNPOWER_TIME_FORMAT = "%I:%M%p"
+    SUNPOWER_CHUNK_ROWS = 24 * 366
+
     def __init__(self):
         """ init function """
         super().__init__()
@@ -193,48 +207,179 @@ class Solar(SimpleServiceModelBase):
 
         return bill_list
 
-    def process_sunpower_hourly_file(self, filename):
-        """ Open, process and return mySunpower hourly file
+    @staticmethod
+    def sunpower_hourly_file_path(filename):
+        """ Full path to a mySunpower hourly file
+
+        Args:
+            filename (str): name of file in directory specified by FI_SUNPOWER_DIR in .env
+
+        Returns:
+            pathlib.Path: full path
+        """
+        return pathlib.Path(__file__).parent.parent.parent.parent / (os.getenv("FI_SUNPOWER_DIR") + filename)
+
+    @classmethod
+    def parse_sunpower_hourly_frame(cls, df):
+        """ Rename columns and parse Period column of mySunpower hourly data
+
+        Period values look like "Mon 1/2/2023 - 1:00pm". The date and time are pulled out with one regex. Each date
+        repeats 24 times and there are only 24 distinct times, so dates are parsed with cache=True and each distinct
+        time is parsed once and added to its dates as an offset.
 
         Args:
-            filename (str): name of file in SunpowerFiles directory
+            df (pd.DataFrame): with mySunpower hourly file columns Period, Solar Production (kWh), Home Usage (kWh)
 
         Returns:
             pd.DataFrame: with columns dt (datetime64), solar_kwh (float64) and home_kwh (float64)
 
+        Raises:
+            ValueError: if a Period value does not have a date and time or they don't match the expected formats
+        """
+        df = df.rename(columns=cls.SUNPOWER_COLUMNS)
+        parts = df["dt"].astype(str).str.extract(cls.SUNPOWER_PERIOD_REGEX)
+        if parts.isna().any(axis=None):
+            raise ValueError("mySunpower file has issues: unrecognized Period values " +
+                             str(df.loc[parts.isna().any(axis=1), "dt"].head(5).tolist()))
+
+        dates = pd.to_datetime(parts[0], format=cls.SUNPOWER_DATE_FORMAT, cache=True)
+        times = parts[1].astype("category")
+        offsets = pd.to_datetime(times.cat.categories, format=cls.SUNPOWER_TIME_FORMAT) - pd.Timestamp("1900-01-01")
+        dt = dates + pd.Series(offsets.take(times.cat.codes.to_numpy()), index=dates.index)
+        return pd.DataFrame({"dt": dt, "solar_kwh": df["solar_kwh"].astype("float64"),
+                             "home_kwh": df["home_kwh"].astype("float64")})
+
+    @staticmethod
+    def check_sunpower_hourly_frame(df):
+        """ Check that each date in mySunpower hourly data has 24 entries
+
+        Args:
+            df (pd.DataFrame): see parse_sunpower_hourly_frame()
+
         Raises:
             ValueError: if a date does not have 24 entries (1 per hour)
         """
-        df = pd.read_excel(pathlib.Path(__file__).parent.parent.parent.parent /
-                           (os.getenv("FI_SUNPOWER_DIR") + filename))
-        df = df.rename(columns={"Period": "dt", "Solar Production (kWh)": "solar_kwh", "Home Usage (kWh)": "home_kwh"})
-        df["dt"] = df["dt"].str.split(" ").map(lambda x: x[1] + " " + x[3])
-        df["dt"] = pd.to_datetime(df["dt"], format="%m/%d/%Y %I:%M%p")
-        df["date"] = df["dt"].dt.date
-
-        v_df = df.groupby(by=["date"], as_index=False).agg({"dt": "count"})
-        v_df = v_df[v_df["dt"] != 24]
-        if len(v_df) > 0:
+        counts = df["dt"].dt.normalize().value_counts(sort=False).sort_index()
+        counts = counts[counts != 24]
+        if len(counts) > 0:
             msg = "mySunpower file has issues: "
-            for ind, row in v_df.iterrows():
-                msg += str(row["date"]) + " has " + str(row["dt"]) + " entries. "
+            for date, count in counts.items():
+                msg += str(date.date()) + " has " + str(count) + " entries. "
             raise ValueError(msg)
 
-        return df[["dt", "solar_kwh", "home_kwh"]]
+    def process_sunpower_hourly_file(self, filename):
+        """ Open, process and return mySunpower hourly file
+
+        Loads the whole file. See iter_sunpower_hourly_file() for multi-year files
+
+        Args:
+            filename (str): name of file in directory specified by FI_SUNPOWER_DIR in .env. .xlsx or .csv
+
+        Returns:
+            pd.DataFrame: with columns dt (datetime64), solar_kwh (float64) and home_kwh (float64)
+
+        Raises:
+            ValueError: if a date does not have 24 entries (1 per hour)
+        """
+        path = self.sunpower_hourly_file_path(filename)
+        df = pd.read_csv(path) if path.suffix.lower() == ".csv" else pd.read_excel(path)
+        df = self.parse_sunpower_hourly_frame(df)
+        self.check_sunpower_hourly_frame(df)
+
+        return df
+
+    def iter_sunpower_hourly_file(self, filename, chunk_rows=None):
+        """ Open, process and yield mySunpower hourly file in chunks
+
+        Streaming version of process_sunpower_hourly_file() for multi-year files. Only about chunk_rows raw rows are
+        held at a time: .csv files are read with pd.read_csv(chunksize) and .xlsx files with a read only openpyxl
+        workbook. Chunks end on a date boundary so every date is checked for 24 entries in one chunk. Rows must be in
+        date order, as exported by mySunpower. Each chunk can be passed to insert_sunpower_hourly_data_to_db()
+
+        Args:
+            filename (str): name of file in directory specified by FI_SUNPOWER_DIR in .env. .xlsx or .csv
+            chunk_rows (Optional[int]): raw rows read per chunk. Default None for SUNPOWER_CHUNK_ROWS (about a year)
 
-    def insert_sunpower_hourly_data_to_db(self, data_df):
+        Yields:
+            pd.DataFrame: with columns dt (datetime64), solar_kwh (float64) and home_kwh (float64)
+
+        Raises:
+            ValueError: if a date does not have 24 entries (1 per hour)
+        """
+        chunk_rows = self.SUNPOWER_CHUNK_ROWS if chunk_rows is None else chunk_rows
+        path = self.sunpower_hourly_file_path(filename)
+
+        if path.suffix.lower() == ".csv":
+            raw_chunks = pd.read_csv(path, chunksize=chunk_rows)
+        else:
+            raw_chunks = self._iter_excel_chunks(path, chunk_rows)
+
+        carry = None
+        for raw_df in raw_chunks:
+            df = self.parse_sunpower_hourly_frame(raw_df)
+            if carry is not None:
+                df = pd.concat([carry, df], ignore_index=True)
+            if len(df) == 0:
+                continue
+
+            # rows of the last date may continue in the next chunk
+            last_date_mask = (df["dt"].dt.normalize() == df["dt"].iloc[-1].normalize()).to_numpy()
+            carry = df[last_date_mask]
+            df = df[~last_date_mask].reset_index(drop=True)
+            if len(df) > 0:
+                self.check_sunpower_hourly_frame(df)
+                yield df
+
+        if carry is not None and len(carry) > 0:
+            carry = carry.reset_index(drop=True)
+            self.check_sunpower_hourly_frame(carry)
+            yield carry
+
+    @staticmethod
+    def _iter_excel_chunks(path, chunk_rows):
+        import openpyxl
+
+        wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == chunk_rows:
+                    yield pd.DataFrame(chunk, columns=header)
+                    chunk = []
+            if len(chunk) > 0:
+                yield pd.DataFrame(chunk, columns=header)
+        finally:
+            wb.close()
+
+    def insert_sunpower_hourly_data_to_db(self, data_df, continue_on_error=False):
         """ write sunpower hourly data to table
 
         Should be called with pd.DataFrame return from process_sunpower_hourly_file()
+        Data is inserted in chunks with one commit per chunk, so a failed import can be restarted from the start_row
+        of the first failed chunk in the returned report
+        The daily and monthly rollup tables are refreshed for the dates in data_df by
+        MySQLAM.mysunpower_hourly_data_insert(), also if the insert fails
 
         Args:
             data_df (pd.DataFrame): must have columns dt, solar_kwh, home_kwh
+            continue_on_error (boolean): True to skip chunks that fail (e.g. primary key violation) and continue.
+                Default False
+
+        Returns:
+            dict: insert report. see Database.MySQLBase.MySQLBase.bulk_insert()
 
         Raises:
-            MySQLException: if issue with database insert (probably primary key violation)
+            MySQLException: if issue with database insert (probably primary key violation) and continue_on_error is
+                False, or issue with rollup refresh
         """
         with MySQLAM() as mam:
-            mam.mysunpower_hourly_data_insert(data_df.to_dict(orient="records"))
+            return mam.mysunpower_hourly_data_insert(data_df.to_dict(orient="records"),
+                                                     continue_on_error=continue_on_error)
 
     def read_sunpower_hourly_data_from_db_between_dates(self, start_date, end_date, must_have_all_data=False):
         """ Read sunpower hourly data from mysunpower_hourly_data table
@@ -281,10 +426,24 @@ class Solar(SimpleServiceModelBase):
             dict: {solar_kwh: total solar kwh generated Decimal, home_kwh: total home kwh usage Decimal}
 
         Raises:
-            ValueError: see self.read_sunpower_hourly_data_from_db_between_dates()
+            ValueError: if any hourly data is missing
         """
-        data_df = self.read_sunpower_hourly_data_from_db_between_dates(start_date, end_date, must_have_all_data=True)
-        kwh_dict = {"solar_kwh": decimal.Decimal(data_df["solar_kwh"].sum()),
-                    "home_kwh": decimal.Decimal(data_df["home_kwh"].sum())}
+        days = (end_date - start_date).days + 1
+        exp_records = days * 24
+
+        # totals come from the daily and monthly rollup tables. if they don't have every hour (e.g. rollups not yet
+        # filled for older hourly data), the hourly table is summed on the server instead
+        with MySQLAM() as mam:
+            totals = mam.mysunpower_rollup_totals(start_date, end_date)
+            if totals["hours"] != exp_records:
+                totals = mam.mysunpower_hourly_data_totals(start_date, end_date)
+        solar_kwh, home_kwh, act_records = totals["solar_kwh"], totals["home_kwh"], totals["hours"]
+
+        if exp_records != act_records:
+            raise ValueError("Missing hourly data: " + str(start_date) + " - " + str(end_date) + " has " + str(days)
+                             + " days and should have " + str(exp_records) + " hourly records but only has "
+                             + str(act_records) + " records.")
+
+        kwh_dict = {"solar_kwh": decimal.Decimal(solar_kwh), "home_kwh": decimal.Decimal(home_kwh)}
 
         return kwh_dict
\ No newline at end of file
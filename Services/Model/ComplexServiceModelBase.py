@@ -34,13 +34,20 @@ class ComplexServiceModelBase(SimpleServiceModelBase):
         self.esb_dict.clear()
 
     @abstractmethod
-    def process_service_bill(self, filename):
+    def process_service_bill(self, filename, df_list=None, force_extract=False):
         """ Open, process and return service bill
 
         Returned instance of ComplexServiceBillDataBase subclass is added to self.asb_dict
+        df_list and force_extract are used by subclasses that read pdf bills (BILL_DIR_ENV set). Those subclasses must
+        accept them since process_service_bills_batch() calls process_service_bill(filename, df_list=df_list).
+        Subclasses that do not read pdf bills may omit them
 
         Args:
             filename (str): name of file in directory specified by subclass
+            df_list (Optional[list[pd.DataFrame]]): tables already extracted from the file (see
+                read_service_bill_tables()). Default None to extract them or load them from the extracted table cache
+            force_extract (boolean): if df_list is None, extract tables even if cached tables exist for the file.
+                Default False
 
         Returns:
             ComplexServiceBillDataBase: subclass with all required fields populated and as many non required fields as
@@ -176,10 +183,10 @@ class ComplexServiceModelBase(SimpleServiceModelBase):
         """
         with MySQLAM() as mam:
             if isinstance(provider, ServiceProviderEnum):
-                service_provider = mam.service_provider_read(wheres=[["provider", "=", provider]])
-                if len(service_provider) == 0:
+                service_provider = mam.service_provider_by_enum(provider)
+                if service_provider is None:
                     raise ValueError("No Service Provider found for Service Provider Enum: " + str(provider.value))
-                provider = service_provider[0]
+                provider = service_provider
             notes_list = mam.estimate_notes_read(
                 wheres=[["real_estate_id", "=", real_estate.id], ["service_provider_id", "=", provider.id]],
                 order_bys=["note_order"])
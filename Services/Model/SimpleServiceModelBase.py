@@ -1,8 +1,15 @@
+import concurrent.futures
 import datetime
+import hashlib
+import os
+import pathlib
+import pickle
+import time
 import pandas as pd
 from abc import ABC, abstractmethod
 from typing import Optional, Union
 from Database.MySQLAM import MySQLAM
+from Database.MySQLException import MySQLException
 from Database.POPO.SimpleServiceBillDataBase import SimpleServiceBillDataBase
 from Database.POPO.RealEstate import Address, RealEstate
 from Database.POPO.ServiceProvider import ServiceProvider, ServiceProviderEnum
@@ -62,6 +69,30 @@ class BillDict(dict):
         return ret_list
 
 
+def read_pdf_tables(path, read_pdf_kwargs):
+    """ Extract tables from a pdf file with tabula
+
+    Module level function so it can be run in a process pool worker. tabula is imported here so the parent process
+    does not need to start a JVM for batch extraction.
+
+    Args:
+        path (Union[str, pathlib.Path]): full path to pdf file
+        read_pdf_kwargs (dict): keyword arguments for tabula.read_pdf()
+
+    Returns:
+        tuple[Optional[list[pd.DataFrame]], float, Optional[str]]: (extracted tables, seconds, None) on success or
+            (None, seconds, error message) on failure
+    """
+    import tabula
+
+    start = time.perf_counter()
+    try:
+        df_list = tabula.read_pdf(path, **read_pdf_kwargs)
+    except Exception as ex:
+        return None, time.perf_counter() - start, type(ex).__name__ + ": " + str(ex)
+    return df_list, time.perf_counter() - start, None
+
+
 class SimpleServiceModelBase(ABC):
     """ Base model for simple service model classes
 
@@ -69,9 +100,25 @@ class SimpleServiceModelBase(ABC):
     minimal data is required to be stored. Subclasses can override process_simple_service_bill(filename) function, or
     use the function as implemented in this class.
 
+    Subclasses that read pdf bills with tabula set BILL_DIR_ENV and READ_PDF_KWARGS, get their tables from
+    read_service_bill_tables() and accept an already extracted df_list in process_service_bill(filename, df_list=None).
+    These subclasses can load a directory of bills with process_service_bills_batch().
+
+    Extracted tables are cached in a TABLE_CACHE_DIR subdirectory of the bill directory, one pickle file per pdf named
+    by the hash of the pdf content and READ_PDF_KWARGS. A bill that has not changed is not extracted again unless
+    force_extract is True.
+
     Attributes:
         asb_dict (BillDict): actual service bills
+        BILL_DIR_ENV (Optional[str]): class attribute. name of .env variable with the bill directory. None if the
+            subclass does not read pdf bills
+        READ_PDF_KWARGS (dict): class attribute. keyword arguments for tabula.read_pdf()
+        TABLE_CACHE_DIR (str): class attribute. name of extracted table cache directory in the bill directory
     """
+    BILL_DIR_ENV = None
+    READ_PDF_KWARGS = {"pages": "all"}
+    TABLE_CACHE_DIR = ".tabula_cache"
+
     @abstractmethod
     def __init__(self):
         """ init function """
@@ -91,13 +138,20 @@ class SimpleServiceModelBase(ABC):
         self.asb_dict.clear()
 
     @abstractmethod
-    def process_service_bill(self, filename):
+    def process_service_bill(self, filename, df_list=None, force_extract=False):
         """ Open, process and return service bill
 
         Returned instance of SimpleServiceBillDataBase subclass is added to self.asb_dict
+        df_list and force_extract are used by subclasses that read pdf bills (BILL_DIR_ENV set). Those subclasses must
+        accept them since process_service_bills_batch() calls process_service_bill(filename, df_list=df_list).
+        Subclasses that do not read pdf bills may omit them
 
         Args:
             filename (str): name of file in directory specified by subclass
+            df_list (Optional[list[pd.DataFrame]]): tables already extracted from the file (see
+                read_service_bill_tables()). Default None to extract them or load them from the extracted table cache
+            force_extract (boolean): if df_list is None, extract tables even if cached tables exist for the file.
+                Default False
 
         Returns:
             SimpleServiceBillDataBase: subclass with all required fields populated and as many non required fields as
@@ -108,6 +162,176 @@ class SimpleServiceModelBase(ABC):
         """
         raise NotImplementedError("process_service_bill() not implemented by subclass")
 
+    def bill_file_path(self, filename):
+        """ Full path to a bill file
+
+        Args:
+            filename (str): name of file in directory specified by BILL_DIR_ENV in .env
+
+        Returns:
+            pathlib.Path: full path
+        """
+        return pathlib.Path(__file__).parent.parent.parent / (os.getenv(self.BILL_DIR_ENV) + filename)
+
+    def table_cache_path(self, filename):
+        """ Full path to the extracted table cache file for the current content of a bill file
+
+        Args:
+            filename (str): name of file in directory specified by BILL_DIR_ENV in .env
+
+        Returns:
+            pathlib.Path: full path. the file may not exist
+
+        Raises:
+            FileNotFoundError: if bill file not found
+        """
+        path = self.bill_file_path(filename)
+        digest = hashlib.sha256(path.read_bytes())
+        digest.update(repr(sorted(self.READ_PDF_KWARGS.items())).encode("utf-8"))
+        return path.parent / self.TABLE_CACHE_DIR / (digest.hexdigest() + ".pkl")
+
+    @staticmethod
+    def load_cached_tables(cache_path):
+        """ Load extracted tables from cache file
+
+        Args:
+            cache_path (pathlib.Path): see table_cache_path()
+
+        Returns:
+            Optional[list[pd.DataFrame]]: None if the cache file does not exist or can't be read
+        """
+        try:
+            with open(cache_path, "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    @staticmethod
+    def store_cached_tables(cache_path, df_list):
+        """ Store extracted tables to cache file
+
+        Cache write failures are ignored since the cache is only an optimization
+
+        Args:
+            cache_path (pathlib.Path): see table_cache_path()
+            df_list (list[pd.DataFrame]): extracted tables
+        """
+        try:
+            cache_path.parent.mkdir(exist_ok=True)
+            tmp_path = cache_path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(df_list, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+
+    def read_service_bill_tables(self, filename, force_extract=False):
+        """ Extract tables from a pdf bill with tabula or load them from the extracted table cache
+
+        Args:
+            filename (str): name of file in directory specified by BILL_DIR_ENV in .env
+            force_extract (boolean): extract tables even if cached tables exist for the file. Default False
+
+        Returns:
+            list[pd.DataFrame]: one DataFrame per table found
+
+        Raises:
+            FileNotFoundError: if file not found
+        """
+        cache_path = self.table_cache_path(filename)
+        df_list = None if force_extract else self.load_cached_tables(cache_path)
+        if df_list is None:
+            import tabula
+
+            df_list = tabula.read_pdf(self.bill_file_path(filename), **self.READ_PDF_KWARGS)
+            self.store_cached_tables(cache_path, df_list)
+        return df_list
+
+    def process_service_bills_batch(self, filenames=None, max_workers=None, force_extract=False):
+        """ Extract, process and insert many pdf service bills
+
+        Tables are loaded from the extracted table cache or extracted in a process pool (each worker keeps its own
+        tabula/JVM for all the files it extracts). Tables are then processed with process_service_bill() in this
+        process and all successfully processed bills are inserted with one call to insert_service_bills_to_db() (one
+        transaction). A file that fails extraction or processing is reported and skipped. If the insert fails, no bill
+        is inserted.
+
+        Args:
+            filenames (Optional[list[str]]): names of files in directory specified by BILL_DIR_ENV in .env. Default None
+                for all pdf files in that directory, sorted by name
+            max_workers (Optional[int]): process pool size. Default None for concurrent.futures default
+            force_extract (boolean): extract tables even if cached tables exist for a file. Default False
+
+        Returns:
+            tuple[list[SimpleServiceBillDataBase], dict]: (processed bills, report). report keys: files (list of dict
+                with keys filename, cached (boolean), extract_seconds, process_seconds, error (None if processed)),
+                failed (int), cached (int), inserted (int), insert_seconds (float), insert_error (None if insert
+                succeeded) and seconds (float total time)
+
+        Raises:
+            NotImplementedError: if subclass does not read pdf bills
+        """
+        if self.BILL_DIR_ENV is None:
+            raise NotImplementedError(type(self).__name__ + " does not read pdf bills")
+
+        start = time.perf_counter()
+        if filenames is None:
+            directory = self.bill_file_path("")
+            filenames = sorted(f.name for f in directory.iterdir() if f.suffix.lower() == ".pdf")
+
+        files = [{"filename": fn, "cached": False, "extract_seconds": None, "process_seconds": None, "error": None}
+                 for fn in filenames]
+        df_lists = [None] * len(files)
+        cache_paths = [None] * len(files)
+        for i, file_report in enumerate(files):
+            try:
+                cache_paths[i] = self.table_cache_path(file_report["filename"])
+            except OSError as ex:
+                file_report["error"] = type(ex).__name__ + ": " + str(ex)
+                continue
+            if not force_extract:
+                df_lists[i] = self.load_cached_tables(cache_paths[i])
+                file_report["cached"] = df_lists[i] is not None
+
+        extract_idx = [i for i, f in enumerate(files) if f["error"] is None and not f["cached"]]
+        if len(extract_idx) > 0:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = executor.map(read_pdf_tables,
+                                       [self.bill_file_path(files[i]["filename"]) for i in extract_idx],
+                                       [self.READ_PDF_KWARGS] * len(extract_idx))
+                for i, (df_list, extract_seconds, error) in zip(extract_idx, results):
+                    files[i]["extract_seconds"] = extract_seconds
+                    files[i]["error"] = error
+                    if error is None:
+                        df_lists[i] = df_list
+                        self.store_cached_tables(cache_paths[i], df_list)
+
+        bill_list = []
+        for file_report, df_list in zip(files, df_lists):
+            if file_report["error"] is not None:
+                continue
+
+            process_start = time.perf_counter()
+            try:
+                bill_list.append(self.process_service_bill(file_report["filename"], df_list=df_list))
+            except Exception as ex:
+                file_report["error"] = type(ex).__name__ + ": " + str(ex)
+            file_report["process_seconds"] = time.perf_counter() - process_start
+
+        insert_start = time.perf_counter()
+        insert_error = None
+        try:
+            self.insert_service_bills_to_db(bill_list)
+        except MySQLException as ex:
+            insert_error = str(ex)
+
+        report = {"files": files, "failed": sum(1 for f in files if f["error"] is not None),
+                  "cached": sum(1 for f in files if f["cached"]),
+                  "inserted": 0 if insert_error is not None else len(bill_list),
+                  "insert_seconds": time.perf_counter() - insert_start, "insert_error": insert_error,
+                  "seconds": time.perf_counter() - start}
+        return bill_list, report
+
     @abstractmethod
     def insert_service_bills_to_db(self, bill_list):
         """ Insert service bills to table
@@ -192,9 +416,7 @@ class SimpleServiceModelBase(ABC):
             MySQLException: if issue with database read
         """
         with MySQLAM() as mam:
-            re_list = mam.real_estate_read(wheres=[["address", "=", address]])
-
-        return None if len(re_list) == 0 else re_list[0]
+            return mam.real_estate_by_address(address)
 
     def read_all_real_estate(self):
         """ Read all real estate records from real_estate table
@@ -206,9 +428,7 @@ class SimpleServiceModelBase(ABC):
             MySQLException: if issue with database read
         """
         with MySQLAM() as mam:
-            re_list = mam.real_estate_read()
-
-        return {re.id: re for re in re_list}
+            return dict(mam.real_estate_map())
 
     def read_valid_service_providers(self):
         """ Read all valid service providers for this model from service_providers table
@@ -219,10 +439,9 @@ class SimpleServiceModelBase(ABC):
         Raises:
             MySQLException: if issue with database read
         """
+        valid_providers = self.valid_providers()
         with MySQLAM() as mam:
-            sp_list = mam.service_provider_read(wheres=[["provider", "in", self.valid_providers()]])
-
-        return {sp.id: sp for sp in sp_list}
+            return {sp_id: sp for sp_id, sp in mam.service_provider_map().items() if sp.provider in valid_providers}
 
     def read_service_provider_by_enum(self, provider):
         """ Read service provider from service_provider table by provider
@@ -237,6 +456,4 @@ class SimpleServiceModelBase(ABC):
             MySQLException: if issue with database read
         """
         with MySQLAM() as mam:
-            re_list = mam.service_provider_read(wheres=[["provider", "=", provider]])
-
-        return None if len(re_list) == 0 else re_list[0]
\ No newline at end of file
+            return mam.service_provider_by_enum(provider)
\ No newline at end of file
@@ -1,8 +1,5 @@
 import decimal
-import os
-import pathlib
 import datetime
-import tabula
 import pandas as pd
 from decimal import Decimal
 from Database.MySQLAM import MySQLAM
@@ -18,6 +15,9 @@ class MS(SimpleServiceModelBase):
     Attributes:
         see superclass docstring
     """
+    BILL_DIR_ENV = "FI_MORGANSTANLEY_DIR"
+    READ_PDF_KWARGS = {"pages": "all"}
+
     def __init__(self):
         """ init function """
         super().__init__()
@@ -30,21 +30,25 @@ class MS(SimpleServiceModelBase):
         """
         return [ServiceProviderEnum.MS_MI]
 
-    def process_service_bill(self, filename):
+    def process_service_bill(self, filename, df_list=None, force_extract=False):
         """ Open, process and return Morgan Stanley mortgage bill
 
         Returned instance of MortgageBillData is added to self.asb_dict
 
         Args:
             filename (str): name of file in directory specified by FI_MORGANSTANLEY_DIR in .env
+            df_list (Optional[list[pd.DataFrame]]): tables already extracted from the file (see
+                read_service_bill_tables()). Default None to extract them or load them from the extracted table cache
+            force_extract (boolean): if df_list is None, extract tables even if cached tables exist for the file.
+                Default False
 
         Returns:
             MortgageBillData: with all required fields populated and as many non required fields as available populated
         """
         bill_data = MortgageBillData(None, None, None, None, None, None, None, None, None, None, None)
 
-        df_list = tabula.read_pdf(pathlib.Path(__file__).parent.parent.parent.parent /
-                                  (os.getenv("FI_MORGANSTANLEY_DIR") + filename), pages="all")
+        if df_list is None:
+            df_list = self.read_service_bill_tables(filename, force_extract=force_extract)
 
         df = df_list[0]
         df.loc[len(df)] = df.columns
@@ -1,8 +1,5 @@
 import datetime
-import os
-import pathlib
 import pandas as pd
-import tabula
 from typing import Optional
 from decimal import Decimal
 from Database.MySQLAM import MySQLAM
@@ -15,6 +12,9 @@ from Services.Model.ComplexServiceModelBase import ComplexServiceModelBase
 
 class NG(ComplexServiceModelBase):
     """ Perform data operations and calculations on NationalGrid data """
+    BILL_DIR_ENV = "FI_NATIONALGRID_DIR"
+    READ_PDF_KWARGS = {"pages": "all", "password": "11720", "guess": False}
+
     def __init__(self):
         """ init function """
         super().__init__()
@@ -27,19 +27,23 @@ class NG(ComplexServiceModelBase):
         """
         return [ServiceProviderEnum.NG_UTI]
 
-    def process_service_bill(self, filename):
+    def process_service_bill(self, filename, df_list=None, force_extract=False):
         """ Open, process and return national grid monthly bill
 
         Returned instance of NatGasBillData is added to self.asb_dict
 
         Args:
             filename (str): name of file in directory specified by FI_NATIONALGRID_DIR in .env
+            df_list (Optional[list[pd.DataFrame]]): tables already extracted from the file (see
+                read_service_bill_tables()). Default None to extract them or load them from the extracted table cache
+            force_extract (boolean): if df_list is None, extract tables even if cached tables exist for the file.
+                Default False
 
         Returns:
             NatGasBillData: with all required fields populated and as many non required fields as available populated
         """
-        df_list = tabula.read_pdf(pathlib.Path(__file__).parent.parent.parent.parent /
-                            (os.getenv("FI_NATIONALGRID_DIR") + filename), pages="all", password="11720", guess=False)
+        if df_list is None:
+            df_list = self.read_service_bill_tables(filename, force_extract=force_extract)
         bill_data = NatGasBillData(None, None, None, None, None, 0, None, None, None, None,
                                    None, None, None, None, None, None, None, True)
 
@@ -0,0 +1,248 @@
+import concurrent.futures
+import datetime
+import json
+import math
+import os
+import time
+import pandas as pd
+from Database.MySQLException import MySQLException
+from Statistics.Regression import RegrType
+from Statistics.LeastSquaresReg.LSRegression import LSRegression
+from Statistics.RobustReg.QuantRegression import QuantRegression
+from Statistics.RobustReg.RLMRegression import RLMRegression
+
+
+# regression object of regr_type with model and fit params set from param dicts (key -> value, see Params.set_value())
+# can raise ValueError
+def regression_obj(regr_type, model_param_dict=None, fit_param_dict=None):
+    if regr_type in [RegrType.OLS, RegrType.WLS, RegrType.GLS, RegrType.GLSAR]:
+        reg = LSRegression(regr_type)
+    elif regr_type == RegrType.QUANT_REG:
+        reg = QuantRegression(regr_type)
+    elif regr_type == RegrType.RLM:
+        reg = RLMRegression(regr_type)
+    else:
+        raise ValueError(str(regr_type) + " not valid")
+
+    for params, param_dict in [[reg.model_params, model_param_dict], [reg.fit_params, fit_param_dict]]:
+        for key, value in ({} if param_dict is None else param_dict).items():
+            params.set_value(key, value)
+    return reg
+
+
+# fit one regression of endog (series) on exog (dataframe). runs in process pool workers, so arguments and the returned
+# dict are picklable. any exception is caught and returned as the error
+# returns dict with keys nobs, rsquared (prsquared for quantile regression, None if not available, e.g. RLM), params,
+# bse and tvalues (dicts of exog variable name to value), summary (str or None), fit_seconds and error (None if fit)
+def fit_regression(regr_type, model_param_dict, fit_param_dict, endog, exog, add_const=True, summary=True):
+    start = time.perf_counter()
+    res = {"nobs": len(endog), "rsquared": None, "params": None, "bse": None, "tvalues": None, "summary": None,
+           "error": None}
+    try:
+        reg = regression_obj(regr_type, model_param_dict, fit_param_dict)
+        reg.prepare_sm_model(endog, exog, add_const)
+        reg.fit_sm_model()
+
+        sm_res = reg.sm_results
+        rsquared = getattr(sm_res, "prsquared" if regr_type == RegrType.QUANT_REG else "rsquared", None)
+        res["nobs"] = int(sm_res.nobs)
+        res["rsquared"] = None if rsquared is None else float(rsquared)
+        for key in ["params", "bse", "tvalues"]:
+            res[key] = {str(k): float(v) for k, v in getattr(sm_res, key).items()}
+        if summary:
+            res["summary"] = str(reg.sm_results_summary())
+    except Exception as ex:
+        res["error"] = type(ex).__name__ + ": " + str(ex)
+    res["fit_seconds"] = time.perf_counter() - start
+    return res
+
+
+########################################################################################################################
+# class BatchRegression
+# Headless cross-sectional regression runner: the same regression specification (regression type, model and fit
+# params, exog) fit for every security of a type, e.g. the daily returns of every stock in read_stocks() on the
+# returns of a market ETF.
+#
+# Prices of all securities are read with one query (MySQLAM.read_sei_price_many()) and converted to returns. Each
+# security's returns are aligned with exog (dates where both have values) and fit in a process pool. Results can be
+# written to the regression_batch_results table (one row per security, params, bse and tvalues as json) and to a
+# parquet file (pandas DataFrame.to_parquet(), requires pyarrow or fastparquet).
+#
+# Returns are computed on the dates of all the securities read, so a security's return after a date it has no price
+# for is NaN (returns do not span missing prices).
+########################################################################################################################
+class BatchRegression:
+
+    SECURITIES_TYPES = ["Stocks", "ETFs"]
+
+    # db: MySQLAM. regr_type: RegrType. model_param_dict, fit_param_dict: key -> value for the regression's model and
+    # fit params (see Params.set_value()). add_const: add a constant to exog. summary: include the statsmodels summary
+    # text in results. max_workers: process pool size, default None for concurrent.futures default. chunksize:
+    # securities sent to a worker at a time, default None for about 4 chunks per worker
+    def __init__(self, db, regr_type, model_param_dict=None, fit_param_dict=None, add_const=True, summary=True,
+                 max_workers=None, chunksize=None):
+        self.db = db
+        self.regr_type = regr_type
+        self.model_param_dict = {} if model_param_dict is None else model_param_dict
+        self.fit_param_dict = {} if fit_param_dict is None else fit_param_dict
+        self.add_const = add_const
+        self.summary = summary
+        self.max_workers = max_workers
+        self.chunksize = chunksize
+
+    def read_securities(self, securities_type, tickers=None):
+        if securities_type == "Stocks":
+            securities = self.db.read_stocks()
+        elif securities_type == "ETFs":
+            securities = self.db.read_etfs()
+        else:
+            raise ValueError("Securities type not supported by batch regression: " + str(securities_type))
+
+        if tickers is not None:
+            securities = [sec for sec in securities if sec["ticker"] in tickers]
+        return securities
+
+    @staticmethod
+    def returns(prices):
+        return prices.pct_change(fill_method=None).iloc[1:]
+
+    # returns dataframe of returns (pct change of field) with date_time index and a column for each of securities
+    # (list of dict with keys securities_id and ticker) named by ticker. prices are read with one query
+    # can raise ValueError, MySQLException
+    def read_returns(self, securities_type, freq, securities, begin_time=None, end_time=None, field="adj_close"):
+        sid_ticker_dict = {sec["securities_id"]: sec["ticker"] for sec in securities}
+        cols = self.db.read_sei_price_many(securities_type, freq, list(sid_ticker_dict.keys()), begin_time, end_time,
+                                           (field,))
+        prices = pd.DataFrame(cols, copy=False).pivot(index="date_time", columns="securities_id", values=field)
+        prices = prices.reindex(columns=list(sid_ticker_dict.keys())).rename(columns=sid_ticker_dict)
+        prices.columns.name = None
+        return self.returns(prices)
+
+    # returns of tickers to use as exog (e.g. market ETF returns), see read_returns()
+    # can raise ValueError, MySQLException
+    def read_exog_returns(self, securities_type, freq, tickers, begin_time=None, end_time=None, field="adj_close"):
+        securities = self.read_securities(securities_type, tickers)
+        missing = [t for t in tickers if t not in [sec["ticker"] for sec in securities]]
+        if len(missing) > 0:
+            raise ValueError("Tickers not found in " + securities_type + ": " + str(missing))
+        return self.read_returns(securities_type, freq, securities, begin_time, end_time, field)
+
+    # prints progress line. can be passed as run() progress
+    @staticmethod
+    def print_progress(done, total, ticker, fit_seconds, error):
+        print(str(done) + "/" + str(total) + " " + ticker + " " + "{:.3f}s".format(fit_seconds) +
+              ("" if error is None else " error: " + error))
+
+    # fit every security of securities_type (or only tickers) on exog
+    # exog: dataframe (or series) of exog variables with a date_time index like read_returns() (e.g. from
+    #   read_exog_returns()). NaN rows are not used
+    # begin_time, end_time: date range of securities prices. Default None for all
+    # min_nobs: securities with fewer aligned observations are not fit. Default None for number of exog variables + 2
+    # run_name: if not None, results are written to the regression_batch_results table with this run name (results of
+    #   a previous run with the same name and security are replaced)
+    # results_path: if not None, results dataframe is written to this parquet file
+    # progress: None or function called after each security with (done count, total count, ticker, fit seconds, error).
+    #   securities with fewer than min_nobs observations are reported first, with fit seconds 0 and their error
+    # returns tuple (results dataframe, report dict)
+    #   results dataframe: a row per security with columns securities_id, ticker, nobs, rsquared, param_<var>,
+    #       bse_<var>, tvalue_<var> for each exog variable (and const), summary, fit_seconds and error (None if fit)
+    #   report dict keys: securities (int), fitted (int), failed (int), read_seconds, fit_seconds (pool wall time),
+    #       write_seconds, write_error (None if written or not written), seconds (total time)
+    # can raise ValueError, MySQLException (reading prices)
+    def run(self, exog, securities_type="Stocks", freq="1D", tickers=None, begin_time=None, end_time=None,
+            min_nobs=None, run_name=None, results_path=None, progress=None):
+        start = time.perf_counter()
+        run_time = datetime.datetime.now()
+        exog = exog.to_frame() if isinstance(exog, pd.Series) else exog
+        exog = exog.dropna()
+        min_nobs = exog.shape[1] + 2 if min_nobs is None else min_nobs
+
+        securities = self.read_securities(securities_type, tickers)
+        endog_df = self.read_returns(securities_type, freq, securities, begin_time, end_time)
+        endog_df = endog_df.loc[endog_df.index.intersection(exog.index)]
+        exog = exog.loc[endog_df.index]
+        read_seconds = time.perf_counter() - start
+
+        results = [{"securities_id": sec["securities_id"], "ticker": sec["ticker"]} for sec in securities]
+        fit_idx = []
+        fit_args = []
+        done = 0
+        for i, sec in enumerate(securities):
+            endog = endog_df[sec["ticker"]]
+            mask = endog.notna().to_numpy()
+            if mask.sum() < min_nobs:
+                results[i].update({"nobs": int(mask.sum()), "fit_seconds": 0.0,
+                                   "error": "Fewer than " + str(min_nobs) + " observations"})
+                done += 1
+                if progress is not None:
+                    progress(done, len(results), sec["ticker"], 0.0, results[i]["error"])
+                continue
+            fit_idx.append(i)
+            fit_args.append((endog[mask], exog[mask]))
+
+        fit_start = time.perf_counter()
+        if len(fit_idx) > 0:
+            chunksize = self.chunksize
+            if chunksize is None:
+                workers = self.max_workers if self.max_workers is not None else (os.cpu_count() or 1)
+                chunksize = max(1, len(fit_idx) // (4 * workers))
+            n = len(fit_idx)
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                fit_results = executor.map(fit_regression, [self.regr_type] * n, [self.model_param_dict] * n,
+                                           [self.fit_param_dict] * n, [a[0] for a in fit_args],
+                                           [a[1] for a in fit_args], [self.add_const] * n, [self.summary] * n,
+                                           chunksize=chunksize)
+                for i, res in zip(fit_idx, fit_results):
+                    results[i].update(res)
+                    done += 1
+                    if progress is not None:
+                        progress(done, len(results), results[i]["ticker"], res["fit_seconds"], res["error"])
+        fit_seconds = time.perf_counter() - fit_start
+
+        write_start = time.perf_counter()
+        write_error = None
+        if run_name is not None:
+            try:
+                self.db.insert_or_update_regression_batch_results(
+                    [self.result_db_dict(run_name, run_time, res) for res in results])
+            except MySQLException as ex:
+                write_error = str(ex)
+        results_df = self.results_df(results)
+        if results_path is not None:
+            results_df.to_parquet(results_path)
+        write_seconds = time.perf_counter() - write_start
+
+        failed = sum(res.get("error") is not None for res in results)
+        report = {"securities": len(results), "fitted": len(results) - failed, "failed": failed,
+                  "read_seconds": read_seconds, "fit_seconds": fit_seconds, "write_seconds": write_seconds,
+                  "write_error": write_error, "seconds": time.perf_counter() - start}
+        return results_df, report
+
+    # result dict of run() as a regression_batch_results row dict. non finite params, bse and tvalues are null in json
+    def result_db_dict(self, run_name, run_time, res):
+        db_dict = {"run_name": run_name, "securities_id": res["securities_id"], "regr_type": self.regr_type.name,
+                   "run_time": run_time, "nobs": res.get("nobs"), "rsquared": res.get("rsquared"),
+                   "summary": res.get("summary"), "fit_seconds": res.get("fit_seconds"), "error": res.get("error")}
+        for key in ["params", "bse", "tvalues"]:
+            # NaN / inf (e.g. bse of a constant price security) written as null, since json has no NaN
+            db_dict[key] = None if res.get(key) is None else json.dumps(
+                {var: val if math.isfinite(val) else None for var, val in res[key].items()}, allow_nan=False)
+        if db_dict["error"] is not None:
+            db_dict["error"] = db_dict["error"][0:500]
+        return db_dict
+
+    # result dicts of run() as a dataframe with params, bse and tvalues dicts expanded to columns
+    @staticmethod
+    def results_df(results):
+        rows = []
+        for res in results:
+            row = {key: res.get(key) for key in ["securities_id", "ticker", "nobs", "rsquared"]}
+            for key, prefix in [["params", "param_"], ["bse", "bse_"], ["tvalues", "tvalue_"]]:
+                row.update({prefix + var: val for var, val in ({} if res.get(key) is None else res[key]).items()})
+            row.update({key: res.get(key) for key in ["summary", "fit_seconds", "error"]})
+            rows.append(row)
+
+        df = pd.DataFrame(rows)
+        # keep summary, fit_seconds and error as the last columns
+        last = ["summary", "fit_seconds", "error"]
+        return df[[c for c in df.columns if c not in last] + [c for c in last if c in df.columns]]
@@ -22,6 +22,11 @@ import pandas as pd
 # TODO dataframe variables and related operations
 class Equation:
 
+    # numpy functions for binary operators in compiled evaluation
+    BINARY_UFUNCS = {"+": np.add, "-": np.subtract, "*": np.multiply, "/": np.divide, "^": np.power}
+    # array ** scalar exponents that numpy evaluates with a faster ufunc (np.power is much slower for these)
+    POWER_UFUNCS = {2: np.square, 0.5: np.sqrt}
+
     def __init__(self, equation_name=None, r0_allowed=True):
         self.equation_name = equation_name
         self.r0_allowed = r0_allowed
@@ -31,6 +36,7 @@ class Equation:
         self.constant_list = None
         self.variable_list = None
         self.evaluated_result = None
+        self.compiled_postfix = None
 
     @staticmethod
     def is_unary_operator(s):
@@ -86,6 +92,7 @@ class Equation:
 
     def infix_str_to_postfix_list(self, infix_str):
         self.postfix_list = None
+        self.compiled_postfix = None
         operator_stack = []
         output_list = []
 
@@ -228,9 +235,14 @@ class Equation:
 
     # elements of variable_value_list can be scalars or pandas series. they do not all have to be the same type
     # variable r0 assumed to refer to variable_value_list[0], r1 refers to variable_value_list[1], etc.
-    # if r0 is not allowed, None is prepended to variable_value_list to keep the numbering
+    # if r0 is not allowed, r1 refers to variable_value_list[0], etc. (variable_value_list is not changed)
+    # compiled: if any variable in the equation is a pandas series, evaluate with the compiled postfix (see
+    #   compile_postfix()). inf and nan are then only checked in the final result, not after every operation
+    # expression_dag: ExpressionDAG shared by several equations, to evaluate compiled with subexpression results
+    #   memoized across the equations (see evaluate_compiled()). Default None for no memoization
     # can raise ValueError
-    def evaluate_equation(self, variable_value_list=[], inf_allowed=True, nan_allowed=True):
+    def evaluate_equation(self, variable_value_list=(), inf_allowed=True, nan_allowed=True, compiled=True,
+                          expression_dag=None):
         error_msg_list = []
 
         if self.postfix_list is None:
@@ -240,10 +252,13 @@ class Equation:
             if error_msg is not None:
                 error_msg_list.append(error_msg)
 
+        if len(error_msg_list) == 0:
+            variable_value_list = list(variable_value_list) if self.r0_allowed else [None] + list(variable_value_list)
+            if compiled and any(isinstance(variable_value_list[n], pd.Series) for n in self.variable_numbers()):
+                return self.evaluate_compiled(variable_value_list, inf_allowed, nan_allowed, expression_dag)
+
         data_postfix_list = []
         if len(error_msg_list) == 0:
-            if not self.r0_allowed:
-                variable_value_list.insert(0, None)
 
             for term in self.postfix_list:
                 if self.is_constant(term):
@@ -280,6 +295,119 @@ class Equation:
 
         return self.prepend_id_data(error_msg_list)
 
+    # expression tree of self.postfix_list. nodes are tuples:
+    #   ("c", constant value (int or float))
+    #   ("v", variable number)
+    #   (operator str, operand node) for unary operators, (operator str, left node, right node) for binary operators
+    # constants are parsed once here instead of on every evaluation
+    def postfix_to_tree(self):
+        node_stack = []
+        for term in self.postfix_list:
+            if self.is_unary_operator(term):
+                node_stack.append((term, node_stack.pop()))
+            elif self.is_binary_operator(term):
+                right = node_stack.pop()
+                node_stack.append((term, node_stack.pop(), right))
+            elif self.is_constant(term):
+                try:
+                    node_stack.append(("c", int(term)))
+                except ValueError:
+                    node_stack.append(("c", float(term)))
+            else:
+                node_stack.append(("v", int(term[1:])))
+        return node_stack[0]
+
+    # operator_str applied to scalars or float64 numpy arrays (op2 is None for unary operators). operators on two
+    # scalars use python operators, the same as do_operation(). out: array to write the result to (must have the
+    # result dtype), or None to allocate a new array
+    # LN raises ValueError for non-positive operands, like do_operation(). there are no other checks
+    @classmethod
+    def apply_operator(cls, operator_str, op1, op2=None, out=None):
+        if cls.is_unary_operator(operator_str):
+            if np.any(op1 <= 0):
+                raise ValueError("Non-positive number found before " + operator_str + " operation")
+            return np.log(op1, out=out) if isinstance(op1, np.ndarray) else np.log(op1)
+
+        if not isinstance(op1, np.ndarray) and not isinstance(op2, np.ndarray):
+            return (op1 + op2 if operator_str == "+" else op1 - op2 if operator_str == "-" else
+                    op1 * op2 if operator_str == "*" else op1 / op2 if operator_str == "/" else op1 ** op2)
+        if operator_str == "^" and not isinstance(op2, np.ndarray) and op2 in cls.POWER_UFUNCS:
+            return cls.POWER_UFUNCS[op2](op1, out=out)
+        return cls.BINARY_UFUNCS[operator_str](op1, op2, out=out)
+
+    # returns function of a list of variable values (scalars or float64 numpy arrays of equal length) that returns
+    # (value, owned). owned is True if value is an array created during evaluation, which later operations write over
+    # (ufunc out argument) instead of allocating a new array. variable arrays are never written over
+    @classmethod
+    def compile_tree(cls, node):
+        if node[0] == "c":
+            value = node[1]
+            return lambda values: (value, False)
+        if node[0] == "v":
+            var_num = node[1]
+            return lambda values: (values[var_num], False)
+
+        operator_str = node[0]
+        if cls.is_unary_operator(operator_str):
+            operand_func = cls.compile_tree(node[1])
+
+            def unary(values):
+                op1, owned = operand_func(values)
+                return (cls.apply_operator(operator_str, op1, out=op1 if owned else None),
+                        isinstance(op1, np.ndarray))
+            return unary
+
+        left_func = cls.compile_tree(node[1])
+        right_func = cls.compile_tree(node[2])
+
+        def binary(values):
+            op1, owned1 = left_func(values)
+            op2, owned2 = right_func(values)
+            out = None
+            if isinstance(op1, np.ndarray) or isinstance(op2, np.ndarray):
+                # write over an owned operand only if it has the result dtype (e.g. not for complex scalar operands)
+                out = next((op for op, owned in [(op1, owned1), (op2, owned2)]
+                            if owned and op.dtype == np.result_type(op1, op2)), None)
+            result = cls.apply_operator(operator_str, op1, op2, out)
+            return result, isinstance(result, np.ndarray)
+        return binary
+
+    def compile_postfix(self):
+        if self.compiled_postfix is None and self.postfix_list is not None:
+            self.compiled_postfix = self.compile_tree(self.postfix_to_tree())
+        return self.compiled_postfix
+
+    # evaluate with compile_postfix() on the values of the pandas series in variable_value_list (indexes are ignored)
+    # and a single inf and nan check of the result. the result series has the index and name of the first series
+    # variable in the equation (the visually leftmost series, as in do_operation())
+    # variable_value_list must have all required variables (see check_variable_count()) and at least one series
+    # expression_dag: if not None, evaluate with ExpressionDAG.evaluate() instead of compile_postfix()
+    def evaluate_compiled(self, variable_value_list, inf_allowed=True, nan_allowed=True, expression_dag=None):
+        error_msg_list = []
+        self.evaluated_result = None
+
+        values = [v.to_numpy(dtype=np.float64) if isinstance(v, pd.Series) else v for v in variable_value_list]
+        first_series = next(variable_value_list[int(term[1:])] for term in self.postfix_list
+                            if self.is_variable(term) and isinstance(variable_value_list[int(term[1:])], pd.Series))
+
+        try:
+            with np.errstate(all="ignore"):
+                if expression_dag is None:
+                    result, owned = self.compile_postfix()(values)
+                else:
+                    result = expression_dag.evaluate(self.postfix_to_tree(), variable_value_list, values)
+        except ValueError as e:
+            return self.prepend_id_data([str(e)])
+
+        if not inf_allowed and np.isinf(result).any():
+            error_msg_list.append("Infinity not allowed in equation result")
+        elif not nan_allowed and np.isnan(result).any():
+            error_msg_list.append("NaN not allowed in equation result")
+        else:
+            self.evaluated_result = pd.Series(result, index=first_series.index, name=first_series.name)
+
+        return self.prepend_id_data(error_msg_list)
+
     # implemented for unary and binary only
     # operands can be can be scalars or pandas series
     # operand_list contains the operands in prefix visual order
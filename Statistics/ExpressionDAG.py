@@ -0,0 +1,117 @@
+import collections
+import numpy as np
+import pandas as pd
+from Statistics.Equation import Equation
+
+
+# Expression trees (Equation.postfix_to_tree()) of several equations merged into a DAG, so subexpressions shared by
+# the equations (e.g. LN[r1] or r1*r2 in several interaction equations) are computed once.
+#
+# Tree nodes are merged by key: the node with variables replaced by the identity of the pandas series they refer to
+# (scalar variables are replaced by their value). Equations that use different variable numbers for the same series
+# (e.g. dependent and independent interactions) share nodes.
+#
+# Usage: invalidate() with the current series, add_equation() for every equation, then Equation.evaluate_equation()
+# with expression_dag for every equation. Nodes added more than once (and with at least one series variable) are
+# memoized; the other nodes are evaluated like Equation.compile_tree(), writing over intermediate arrays.
+#
+# Memoized values are only valid as long as the series they were computed from are not changed. StatsData replaces
+# transformed_data_series with a new series when it changes, so invalidate() drops nodes computed from any series not
+# in the current series. series changed in place are not detected.
+class ExpressionDAG:
+
+    def __init__(self):
+        # node key -> number of times the node was added with add_equation()
+        self.node_counts = collections.Counter()
+        # node key -> (value, frozenset of ids of the series the value was computed from)
+        self.node_values = {}
+        # series id -> series. holds a reference to each series used in a key so its id is not reused
+        self.series_dict = {}
+        self.hits = 0
+        self.misses = 0
+
+    # drop memoized values computed from series not in current_series_list and reset added equations. memoized values
+    # of nodes that are shared again are kept
+    def invalidate(self, current_series_list=()):
+        current_ids = {id(s) for s in current_series_list if isinstance(s, pd.Series)}
+        self.node_counts = collections.Counter()
+        self.node_values = {key: val for key, val in self.node_values.items() if val[1] <= current_ids}
+        self.series_dict = {sid: s for sid, s in self.series_dict.items() if sid in current_ids}
+
+    def clear(self):
+        self.invalidate()
+        self.hits = 0
+        self.misses = 0
+
+    # variable_value_list as in Equation.evaluate_equation(). equations without a postfix list or with too few
+    # variables are not added (evaluate_equation() reports them)
+    def add_equation(self, equation, variable_value_list):
+        if equation.postfix_list is None or equation.check_variable_count(len(variable_value_list)) is not None:
+            return
+        variable_value_list = list(variable_value_list) if equation.r0_allowed else [None] + list(variable_value_list)
+        self.add_node(equation.postfix_to_tree(), variable_value_list)
+
+    # returns (key, frozenset of series ids in key) of node and counts node and its subexpressions in node_counts
+    def add_node(self, node, variable_value_list):
+        key, series_ids = self.node_key(node, variable_value_list)
+        if node[0] not in ["c", "v"]:
+            for child in node[1:]:
+                self.add_node(child, variable_value_list)
+            if len(series_ids) > 0:
+                self.node_counts[key] += 1
+        return key, series_ids
+
+    # returns (key, frozenset of series ids in key) of node. variable_value_list is the list the node's variable
+    # numbers refer to
+    def node_key(self, node, variable_value_list):
+        if node[0] == "c":
+            return node, frozenset()
+        if node[0] == "v":
+            value = variable_value_list[node[1]]
+            if isinstance(value, pd.Series):
+                self.series_dict[id(value)] = value
+                return ("s", id(value)), frozenset([id(value)])
+            return ("c", value), frozenset()
+
+        child_keys = [self.node_key(child, variable_value_list) for child in node[1:]]
+        return ((node[0],) + tuple(ck[0] for ck in child_keys),
+                frozenset().union(*[ck[1] for ck in child_keys]))
+
+    # value of node with values (variable_value_list with series converted to float64 numpy arrays). returns
+    # (value, owned, key, series ids). owned as in Equation.compile_tree(). memoized values are never owned
+    # can raise ValueError (see Equation.apply_operator())
+    def evaluate_node(self, node, variable_value_list, values):
+        if node[0] in ["c", "v"]:
+            key, series_ids = self.node_key(node, variable_value_list)
+            return (node[1] if node[0] == "c" else values[node[1]]), False, key, series_ids
+
+        operand_list = [self.evaluate_node(child, variable_value_list, values) for child in node[1:]]
+        key = (node[0],) + tuple(op[2] for op in operand_list)
+        series_ids = frozenset().union(*[op[3] for op in operand_list])
+
+        if key in self.node_values:
+            self.hits += 1
+            return self.node_values[key][0], False, key, series_ids
+
+        op_values = [op[0] for op in operand_list]
+        memoize = len(series_ids) > 0 and self.node_counts[key] > 1
+        out = None
+        if not memoize and any(isinstance(op, np.ndarray) for op in op_values):
+            # write over an owned operand only if it has the result dtype, as in Equation.compile_tree()
+            result_type = np.result_type(*op_values)
+            out = next((op[0] for op in operand_list if op[1] and op[0].dtype == result_type), None)
+        value = Equation.apply_operator(node[0], *op_values, out=out)
+
+        if memoize:
+            self.misses += 1
+            self.node_values[key] = (value, series_ids)
+            return value, False, key, series_ids
+        return value, isinstance(value, np.ndarray), key, series_ids
+
+    # value of the expression tree root (see Equation.postfix_to_tree()). values: variable_value_list with series
+    # converted to float64 numpy arrays. memoized array results are copied, so they can be changed without changing
+    # memoized values
+    # can raise ValueError
+    def evaluate(self, root, variable_value_list, values):
+        value, owned = self.evaluate_node(root, variable_value_list, values)[0:2]
+        return value.copy() if isinstance(value, np.ndarray) and not owned else value
@@ -5,13 +5,22 @@ from Statistics.LeastSquaresReg.GLSModelParams import GLSModelParams
 from Statistics.LeastSquaresReg.GLSARModelParams import GLSARModelParams
 from Statistics.LeastSquaresReg.LSFitParams import LSFitParams
 
+import numpy as np
+import pandas as pd
 import statsmodels.api as sm
+from statsmodels.regression.rolling import RollingWLS
 
 
 class LSRegression(Regression):
 
+    # LSFitParams cov_type -> statsmodels RollingWLS cov_type. RollingWLS only has nonrobust and HC0 covariance
+    ROLLING_COV_TYPE_DICT = {"nonrobust": "nonrobust", "HCO": "HCCM"}
+    # OLSModelParams missing -> statsmodels RollingWLS missing. windows containing nan values are nan for "none"
+    ROLLING_MISSING_DICT = {"none": "skip", "drop": "drop", "raise": "raise"}
+
     def __init__(self, regr_type):
         self.fit = None
+        self.rolling_results = None
 
         if regr_type == RegrType.OLS:
             model_params = OLSModelParams()
@@ -29,6 +38,7 @@ class LSRegression(Regression):
     def prepare_sm_model(self, endog, exog, add_const=False):
         super().prepare_sm_model(endog, exog, add_const)
 
+        self.rolling_results = None
         mp = self.model_params
         num_obs = self.exog.shape[0]
         if self.reg_type == RegrType.OLS:
@@ -62,5 +72,50 @@ class LSRegression(Regression):
             num_groups = None
             self.sm_results = self.sm_model.fit(fp.fit_method(), fp.cov_type(), fp.cov_kwds_check(num_groups), fp.use_t())
 
+    # OLS or WLS fit of every window of window observations (rolling) or of all observations up to each observation
+    # (expanding, window=None) in one pass with statsmodels RollingWLS, which updates X'X and X'y as the window moves
+    # instead of fitting each window. expanding with window fills the first observations with expanding fits until
+    # window observations are available, then rolls. min_nobs: minimum observations for a fit. Default None for the
+    # number of exog variables. reset: refit from scratch every reset observations to limit rounding error
+    # model params missing and weights and fit params cov_type ("nonrobust" or "HCO") and use_t are used
+    # call prepare_sm_model() first. sm_model and sm_results are not changed. rolling_results is set to the statsmodels
+    # RollingRegressionResults
+    # returns dict with keys
+    #   "params": DataFrame with a column of coefficients for each exog variable
+    #   "bse": DataFrame with a column of coefficient standard errors for each exog variable
+    #   "rsquared": Series of R squared
+    # each indexed like exog with NaN rows for observations without a fit (fewer than min_nobs observations)
+    # can raise ValueError
+    def fit_rolling_sm_model(self, window=None, expanding=False, min_nobs=None, reset=None):
+        if self.endog is None or self.exog is None:
+            raise ValueError("endog and/or exog not set")
+
+        if self.reg_type not in [RegrType.OLS, RegrType.WLS]:
+            raise ValueError("Rolling fit only allowed for OLS and WLS")
+        if window is None and not expanding:
+            raise ValueError("window required for rolling fit")
+
+        mp = self.model_params
+        fp = self.fit_params
+        num_obs = self.exog.shape[0]
+        cov_type = self.ROLLING_COV_TYPE_DICT.get(fp.cov_type())
+        if cov_type is None:
+            raise ValueError("Rolling fit cov_type must be one of " + str(list(self.ROLLING_COV_TYPE_DICT.keys())))
+
+        weights = None
+        if self.reg_type == RegrType.WLS:
+            weights = mp.weights(num_obs)
+            # the same weight for every observation gives the same fit as no weights
+            weights = weights if isinstance(weights, np.ndarray) else None
+
+        model = RollingWLS(self.endog, self.exog, num_obs if window is None else window, weights=weights,
+                           min_nobs=min_nobs, missing=self.ROLLING_MISSING_DICT[mp.missing()], expanding=expanding)
+        use_t = fp.use_t()
+        self.rolling_results = model.fit(cov_type=cov_type, reset=reset, use_t=False if use_t is None else use_t)
+
+        res = self.rolling_results
+        return {"params": pd.DataFrame(res.params), "bse": pd.DataFrame(res.bse),
+                "rsquared": pd.Series(res.rsquared, name="rsquared")}
+
     def sm_results_summary(self):
         return super().sm_results_summary()
\ No newline at end of file
@@ -1,4 +1,5 @@
 from Statistics import Transform, PreImpute
+import numpy as np
 import pandas as pd
 
 
@@ -78,9 +79,11 @@ class StatsData:
     def is_raa(self):
         return self.transform.is_for_raa
 
-    # data_coll can be a pandas series, list of dicts or list of lists
+    # data_coll can be a pandas series, dict of numpy arrays, list of dicts or list of lists
     # pandas series index can be pandas datetimeindex or default index. if it is datetimeindex: freq, begin_date
     #   end_date, variables should have been set in init (indicating a time series)
+    # dict of numpy arrays is the FetchCursor.NUMPY_COLUMNS format. it must have column key. if it has a 'date_time'
+    #   key, it is used as the datetimeindex. arrays are used directly without per element conversion
     # each dict must have column key. if it has a 'date_time' key, freq, begin_date and end_date variables should have
     #   been set in init (indicating a time series)
     # each list must either be 1 or 2 elements. the first element is the date_time, second element is data
@@ -92,21 +95,35 @@ class StatsData:
     # transformed variables will be set to None at the end of this function
     # can throw ValueError, TypeError, IndexError
     def set_data_series(self, data_coll, python_type='', db_type=None):
+        if db_type is not None:
+            if "decimal" in db_type or "float" in db_type or "double" in db_type:
+                python_type = "float"
+            elif "int" in db_type:
+                python_type = "int"
+            elif "char" in db_type:
+                python_type = "str"
+            else:
+                python_type = db_type
+
         if isinstance(data_coll, pd.Series):
             self.original_data_series = data_coll
+        elif isinstance(data_coll, dict):
+            if python_type not in ['', 'float', 'int', 'str']:
+                raise ValueError(str(python_type) + " not in " + str(['', 'float', 'int', 'str']))
+
+            data_arr = np.asarray(data_coll[self.column])
+            if python_type == "float" or (python_type == "int" and data_arr.dtype.kind not in "iuf"):
+                data_arr = pd.to_numeric(data_arr, errors="coerce").astype(np.float64)
+            elif python_type == "str":
+                data_arr = data_arr.astype(str).astype(object)
+
+            if 'date_time' in data_coll:
+                self.original_data_series = pd.Series(data_arr, index=pd.DatetimeIndex(data_coll['date_time']))
+            else:
+                self.original_data_series = pd.Series(data_arr)
         elif len(data_coll) == 0:
             self.original_data_series = pd.Series([])
         else:
-            if db_type is not None:
-                if "decimal" in db_type or "float" in db_type or "double" in db_type:
-                    python_type = "float"
-                elif "int" in db_type:
-                    python_type = "int"
-                elif "char" in db_type:
-                    python_type = "str"
-                else:
-                    python_type = db_type
-
             if python_type not in ['', 'float', 'int', 'str']:
                 raise ValueError(str(python_type) + " not in " + str(['', 'float', 'int', 'str']))
 
@@ -0,0 +1,256 @@
+from Statistics import Transform
+import numpy as np
+import pandas as pd
+
+
+'''
+Aligned panel of StatsData variables for column-wise pre-impute, transforms and missing value checks.
+
+The original data series of all variables are aligned on one shared index (union of the variable indexes) and stored
+in one 2-D float64 array (rows: index, columns: variables) with a boolean array marking which rows belong to each
+variable's own index. Pre-impute, return, risk adjust, LN and SQRT transforms and the checks before and after each
+transform are applied to all columns with the same transform in one array operation. Returns are computed between a
+variable's own consecutive index values, so variables with different indexes give the same results as
+StatsData.check_apply_transform().
+
+check_apply_transforms() writes the transformed series back to each StatsData (transformed_data_series,
+transformed_raa_series, transformed dates), so StatsData users are not affected by whether a panel or
+StatsData.check_apply_transform() was used. Transformed series are float64.
+
+Variables must all be time series or all be non time series, must have ascending index values without duplicates and
+must have numeric data. Otherwise ValueError or TypeError is raised on init.
+'''
+class StatsDataPanel:
+
+    def __init__(self, stats_data_list):
+        self.stats_data_list = list(stats_data_list)
+        self.column_dict = {id(sd): j for j, sd in enumerate(self.stats_data_list)}
+
+        series_list = [sd.original_data_series for sd in self.stats_data_list]
+        is_ts_set = {isinstance(s.index, pd.DatetimeIndex) for s in series_list}
+        if len(is_ts_set) > 1:
+            raise ValueError("Panel variables must all be time series or all be non time series")
+        if any(not s.index.is_unique for s in series_list):
+            raise ValueError("Panel variable index has duplicate values")
+        # the shared index is sorted, so a variable in another order would get returns and fills in a different order
+        # than StatsData.check_apply_transform()
+        if any(not s.index.is_monotonic_increasing for s in series_list):
+            raise ValueError("Panel variable index is not in ascending order")
+
+        index = series_list[0].index if len(series_list) > 0 else pd.Index([])
+        for s in series_list[1:]:
+            if not s.index.equals(index):
+                index = index.union(s.index)
+        self.index = index
+
+        self.values = np.full((len(index), len(series_list)), np.nan)
+        self.present = np.zeros((len(index), len(series_list)), dtype=bool)
+        for j, s in enumerate(series_list):
+            pos = np.arange(len(index)) if s.index.equals(index) else index.get_indexer(s.index)
+            self.values[pos, j] = pd.to_numeric(s, errors="raise").to_numpy(dtype=np.float64, na_value=np.nan)
+            self.present[pos, j] = True
+
+        self.transforms = np.array([sd.transform.transform for sd in self.stats_data_list], dtype=object)
+        self.costs = np.array([sd.transform.transform_cost() for sd in self.stats_data_list], dtype=int)
+        self.pre_imputed_values = self.pre_impute()
+
+        # set by check_apply_transforms() for the columns transformed without errors
+        self.transformed_values = np.full_like(self.values, np.nan)
+        self.transformed_present = np.zeros_like(self.present)
+        self.transformed = np.zeros(len(self.stats_data_list), dtype=bool)
+
+    def columns(self, stats_data_list):
+        return np.array([self.column_dict[id(sd)] for sd in stats_data_list], dtype=int)
+
+    def num_obs(self):
+        return self.present.sum(axis=0)
+
+    def num_obs_after_transform(self, stats_data_list=None):
+        cols = slice(None) if stats_data_list is None else self.columns(stats_data_list)
+        return self.num_obs()[cols] + self.costs[cols]
+
+    # True where a variable has an index value but its value is missing
+    def missing_mask(self, for_transformed_data=True):
+        if for_transformed_data:
+            return self.transformed_present & np.isnan(self.transformed_values)
+        return self.present & np.isnan(self.pre_imputed_values)
+
+    # same results as PreImpute.apply_pre_impute() for each column. missing values are only filled on rows in the
+    # column's own index
+    def pre_impute(self):
+        values = self.values.copy()
+        missing = self.present & np.isnan(values)
+        methods = np.array([sd.pre_impute.pre_impute for sd in self.stats_data_list], dtype=object)
+
+        cols = np.flatnonzero(methods == "Forward Fill")
+        if len(cols) > 0:
+            filled = pd.DataFrame(values[:, cols]).ffill().bfill().to_numpy()
+            values[:, cols] = np.where(self.present[:, cols], filled, np.nan)
+
+        cols = np.flatnonzero(methods == "Backward Fill")
+        if len(cols) > 0:
+            filled = pd.DataFrame(values[:, cols]).bfill().ffill().to_numpy()
+            values[:, cols] = np.where(self.present[:, cols], filled, np.nan)
+
+        for method, func in [["Mean", pd.DataFrame.mean], ["Median", pd.DataFrame.median]]:
+            cols = np.flatnonzero(methods == method)
+            if len(cols) > 0:
+                fill = func(pd.DataFrame(values[:, cols])).to_numpy()
+                values[:, cols] = np.where(missing[:, cols], fill[np.newaxis, :], values[:, cols])
+
+        cols = np.flatnonzero(methods == "Value")
+        if len(cols) > 0:
+            fill = np.array([float(self.stats_data_list[j].pre_impute.special_value) for j in cols])
+            values[:, cols] = np.where(missing[:, cols], fill[np.newaxis, :], values[:, cols])
+
+        return values
+
+    # returns (values, present) with returns between each column's consecutive own index values. the last index
+    # value of each column is dropped. same as Transform.apply_return() for each column
+    @staticmethod
+    def apply_return(values, present):
+        num_rows = values.shape[0]
+        row_idx = np.where(present, np.arange(num_rows)[:, np.newaxis], num_rows)
+        # next own index row after each row (num_rows if none)
+        next_idx = np.minimum.accumulate(row_idx[::-1], axis=0)[::-1]
+        next_idx = np.vstack([next_idx[1:], np.full((1, values.shape[1]), num_rows)])
+
+        padded = np.vstack([values, np.full((1, values.shape[1]), np.nan)])
+        next_values = np.take_along_axis(padded, next_idx, axis=0)
+        ret_present = present & (next_idx < num_rows)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ret_values = np.where(ret_present, next_values / values - 1, np.nan)
+        return ret_values, ret_present
+
+    # cols: panel columns of risk adjust variables. values, present: their current (return transformed) data, one column
+    # per element of cols
+    # returns column dict of (raa column or None, error message or None) for cols. same matching as
+    # StatsData.match_data_series_raa_series_indexes() with force match False
+    def match_raa_columns(self, cols, values, present, raa_stats_data_list):
+        raa_cols = self.columns(raa_stats_data_list)
+        match_dict = {}
+        for j in cols:
+            freq = self.stats_data_list[j].freq
+            raa_col = next((r for r, sd in zip(raa_cols, raa_stats_data_list) if sd.freq == freq), None)
+            if raa_col is None or not self.transformed[raa_col]:
+                match_dict[j] = (None, "No RAA with matching frequency found. Include an RAA with matching frequency or "
+                                       "use force match.")
+            else:
+                match_dict[j] = (raa_col, None)
+
+        # every non-missing data value must have an index value in its raa's transformed index
+        matched = np.array([i for i, j in enumerate(cols) if match_dict[j][0] is not None], dtype=int)
+        if len(matched) > 0:
+            raa_present = self.transformed_present[:, [match_dict[cols[i]][0] for i in matched]]
+            not_found = (present[:, matched] & ~np.isnan(values[:, matched]) & ~raa_present).any(axis=0)
+            for i in matched[not_found]:
+                match_dict[cols[i]] = (None, "Data series non-missing values have index value(s) that are not found "
+                                             "in the RAA's index. Include an RAA with required index values or use "
+                                             "force match.")
+        return match_dict
+
+    # column-wise version of StatsData.check_apply_transform() for each stats data in stats_data_list. all stats data
+    # must be in the panel. raa stats data must be in the panel and transformed (with this function) first
+    # returns error_msg_list, sugg_msg_list in the same order as calling StatsData.check_apply_transform() for each
+    # stats data. force_match is not implemented (same as StatsData.match_data_series_raa_series_indexes())
+    def check_apply_transforms(self, stats_data_list, raa_stats_data_list=(), force_match=False):
+        T = Transform.Transform
+        cols = self.columns(stats_data_list)
+        errors = {j: [] for j in cols}
+        suggs = {j: [] for j in cols}
+
+        def add_msgs(msg_dict, mask_cols, mask, msg, prepend_transform=True):
+            for j in mask_cols[mask]:
+                msg_dict[j].append(self.stats_data_list[j].transform.prepend_id_data(msg) if prepend_transform else msg)
+
+        for sd in stats_data_list:
+            sd.reset_transform_vars()
+        self.transformed_present[:, cols] = False
+        self.transformed_values[:, cols] = np.nan
+        self.transformed[cols] = False
+
+        values = self.pre_imputed_values[:, cols].copy()
+        present = self.present[:, cols].copy()
+        num_obs = present.sum(axis=0)
+        transforms = self.transforms[cols]
+
+        # return transforms (columns with no data are not transformed and not checked)
+        ret = np.isin(transforms, T.RETURN_TRANSFORMS) & (num_obs > 0)
+        ret_cols = cols[ret]
+        if len(ret_cols) > 0:
+            v, p = values[:, ret], present[:, ret]
+            not_enough = num_obs[ret] < 2
+            has_zero = ~not_enough & (p & (v == 0)).any(axis=0)
+            add_msgs(errors, ret_cols, not_enough, "not enough data provided")
+            add_msgs(errors, ret_cols, has_zero, "0 found before return calculation")
+            add_msgs(suggs, ret_cols, ~not_enough & (p & (v < 0)).any(axis=0),
+                     "negative number found before return calculation. Is this intended?")
+            add_msgs(suggs, ret_cols, ~not_enough & (p & np.isnan(v)).any(axis=0),
+                     "missing value(s) found before return calculation.")
+
+            ok = ~(not_enough | has_zero)
+            ret_values, ret_present = self.apply_return(v[:, ok], p[:, ok])
+            idx = np.flatnonzero(ret)[ok]
+            values[:, idx], present[:, idx] = ret_values, ret_present
+
+        def no_errors():
+            return np.array([len(errors[j]) == 0 for j in cols], dtype=bool)
+
+        # risk adjust asset match
+        raa_values = np.full_like(values, np.nan)
+        raa_present = np.zeros_like(present)
+        raa_match = {}
+        risk = np.isin(transforms, T.RISK_ADJUST_TRANSFORMS) & no_errors()
+        if risk.any():
+            raa_match = self.match_raa_columns(cols[risk], values[:, risk], present[:, risk], raa_stats_data_list)
+            for i in np.flatnonzero(risk):
+                raa_col, err = raa_match[cols[i]]
+                if err is not None:
+                    errors[cols[i]].append(err)
+                else:
+                    # raa series reindexed to the data series index
+                    raa_present[:, i] = present[:, i]
+                    raa_values[:, i] = np.where(present[:, i] & self.transformed_present[:, raa_col],
+                                                self.transformed_values[:, raa_col], np.nan)
+
+        # remaining transforms (columns with no data are not transformed and not checked)
+        remaining = no_errors() & (present.sum(axis=0) > 0)
+        risk = remaining & np.isin(transforms, T.RISK_ADJUST_TRANSFORMS)
+        values[:, risk] = values[:, risk] - raa_values[:, risk]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for transform_list, bad_func, msg, func in [
+                    [T.LN_TRANSFORMS, lambda x: x <= 0, "non-positive number found before LN calculation (after "
+                                                        "previous transforms, if any)", np.log],
+                    [T.SQRT_TRANSFORMS, lambda x: x < 0, "negative number found before SQRT calculation (after previous "
+                                                         "transforms, if any)", np.sqrt]]:
+                sel = remaining & np.isin(transforms, transform_list)
+                if sel.any():
+                    bad = (present[:, sel] & bad_func(values[:, sel])).any(axis=0)
+                    add_msgs(errors, cols[sel], bad, msg)
+                    idx = np.flatnonzero(sel)[~bad]
+                    values[:, idx] = np.where(present[:, idx], func(values[:, idx]), np.nan)
+
+        add_msgs(suggs, cols[remaining], (present[:, remaining] & np.isnan(values[:, remaining])).any(axis=0),
+                 "missing value(s) found after transform completed.")
+
+        # write back columns without errors
+        error_msg_list = []
+        sugg_msg_list = []
+        for i, j in enumerate(cols):
+            sd = self.stats_data_list[j]
+            if len(errors[j]) == 0:
+                self.transformed_values[:, j] = values[:, i]
+                self.transformed_present[:, j] = present[:, i]
+                self.transformed[j] = True
+                sd.transformed_data_series = pd.Series(values[present[:, i], i], index=self.index[present[:, i]],
+                                                       name=sd.original_data_series.name)
+                if j in raa_match:
+                    sd.transformed_raa_series = pd.Series(raa_values[present[:, i], i],
+                                                          index=self.index[present[:, i]])
+                    sd.transformed_raa_series_freq = sd.freq
+                sd.set_transformed_dates()
+            error_msg_list += sd.prepend_id_data(errors[j])
+            sugg_msg_list += sd.prepend_id_data(suggs[j])
+
+        return error_msg_list, sugg_msg_list